@@ -5,18 +5,36 @@ Main application file for emotion detection, harassment detection, and AI respon
 
 import os
 import time
+import uuid
+import asyncio
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional
-from collections import defaultdict
 import uvicorn
 from dotenv import load_dotenv
 
-from models.emotion_model import EmotionModel
-from models.harassment_model import HarassmentModel
-from utils.generate_response import ResponseGenerator
+from models.analysis import analyze_message_batched
+from models.batching import MicroBatcher
 from utils.logger import HarassmentLogger, log_user_interaction
+from utils.conversation_store import create_conversation_store
+from utils.pipeline import StageGraph
+from utils.legal_index import LegalIndex
+from utils.legal_retrieval import create_legal_retriever
+from utils.readiness import Readiness
+from utils.metrics import REGISTRY, end_trace, server_timing, span, start_trace
+from utils.llm_client import ReplyUnavailable
+from utils.notifier import close_event_bus, get_event_bus, trigger_alert
+from utils.admission import (
+    RATE_LIMITED, SHED, client_address, create_address_rate_limiter, create_admission_controller,
+    create_batch_rate_limiter, create_rate_limiter, retry_after_header
+)
+from utils.cache import LRUCache
+from utils.local_replies import local_reply, support_message
+from utils.severity import SEVERITY_RANK
 import json
 
 print(">>> APP LOADING from:", __file__)
@@ -40,15 +58,115 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request metrics; METRICS_DEBUG_HEADER=1 returns a Server-Timing header to requests sending X-Debug-Timing
+METRICS_DEBUG_HEADER = os.getenv("METRICS_DEBUG_HEADER", "0") == "1"
+HTTP_IN_FLIGHT = REGISTRY.gauge("empathai_http_requests_in_flight", "Requests currently being handled")
+HTTP_DURATION = REGISTRY.histogram("empathai_http_request_duration_seconds", "Time until the response headers are ready")
+HTTP_REQUESTS = REGISTRY.counter("empathai_http_requests_total", "Handled requests by route, method and status")
+
+
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    """Count, time and trace every request; attach the span breakdown when asked to."""
+    HTTP_IN_FLIGHT.inc()
+    token = start_trace()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        spans = end_trace(token)
+        HTTP_IN_FLIGHT.dec()
+        # Label by route template so path parameters and unknown URLs do not explode the series
+        route = request.scope.get("route")
+        label = getattr(route, "path", None) or "other"
+        HTTP_DURATION.observe(time.perf_counter() - started, path=label)
+        HTTP_REQUESTS.inc(path=label, method=request.method, status=str(status))
+    if METRICS_DEBUG_HEADER and "x-debug-timing" in request.headers and spans:
+        response.headers["Server-Timing"] = server_timing(spans)
+    return response
+
 # Initialize models (cached for performance)
 emotion_model = None
 harassment_model = None
 response_generator = None
 harassment_logger = None
-ipc_data = []
+legal_index = None
+legal_retriever = None
+# Background loading task in fast startup mode
+load_task = None
+# (emotion, harassment) loaded by the prefork launcher before forking workers
+preloaded_models = None
+LEGAL_RELOAD_INTERVAL_S = float(os.getenv("LEGAL_RELOAD_INTERVAL_S", 5))
+
+# Micro-batchers that coalesce concurrent classifier calls into one forward pass
+emotion_batcher = None
+harassment_batcher = None
+INFERENCE_BATCH_MAX_SIZE = int(os.getenv("INFERENCE_BATCH_MAX_SIZE", 32))
+INFERENCE_BATCH_WAIT_MS = float(os.getenv("INFERENCE_BATCH_WAIT_MS", 5))
+
+# Bounded pool that runs torch inference off the event loop
+inference_executor = None
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 2))
+# Optional cap on torch intra-op threads per forward pass (0 = torch default)
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", 0))
+
+# "eager" finishes loading before serving; "fast" serves /health at once and loads in the background
+STARTUP_MODE = os.getenv("STARTUP_MODE", "eager").lower()
+# Load state and timings of each startup component, reported by /health
+readiness = Readiness(("emotion_model", "harassment_model", "response_generator", "legal"))
+# Serve with the classifiers only (no Gemini, replies from local templates); for local testing
+CLASSIFIER_ONLY = os.getenv("CLASSIFIER_ONLY", "0") == "1"
+# Components that must be loaded before the server reports ready
+REQUIRED_COMPONENTS = ("emotion_model", "harassment_model") + (() if CLASSIFIER_ONLY else ("response_generator",))
+
+# Per-request deadline and per-stage timeouts for /api/chat (seconds)
+CHAT_DEADLINE_S = float(os.getenv("CHAT_DEADLINE_S", 25))
+STAGE_TIMEOUT_CLASSIFY_S = float(os.getenv("STAGE_TIMEOUT_CLASSIFY_S", 5))
+STAGE_TIMEOUT_HISTORY_S = float(os.getenv("STAGE_TIMEOUT_HISTORY_S", 2))
+STAGE_TIMEOUT_WEB_S = float(os.getenv("STAGE_TIMEOUT_WEB_S", 6))
+STAGE_TIMEOUT_REPLY_S = float(os.getenv("STAGE_TIMEOUT_REPLY_S", 20))
+STAGE_TIMEOUT_LEGAL_S = float(os.getenv("STAGE_TIMEOUT_LEGAL_S", 8))
+
+# Reply budget: past it, answer with the local emotion × severity reply (0 = wait up to STAGE_TIMEOUT_REPLY_S)
+REPLY_BUDGET_S = float(os.getenv("REPLY_BUDGET_MS", 0)) / 1000
+# Keep generating after a missed budget and serve the Gemini reply at /api/chat/followup/{id}
+REPLY_FOLLOWUP = os.getenv("REPLY_FOLLOWUP", "0") == "1"
+# followup_id -> task producing (reply, web_enabled)
+pending_followups = LRUCache(
+    max_entries=int(os.getenv("REPLY_FOLLOWUP_MAX", 1000)),
+    ttl_s=float(os.getenv("REPLY_FOLLOWUP_TTL_S", 300))
+)
+DEGRADED_REPLIES = REGISTRY.counter("empathai_degraded_replies_total", "Chat replies answered from local templates, by reason")
+
+
+@dataclass
+class ChatReply:
+    """Outcome of the reply stage."""
+
+    text: str
+    web_enabled: bool = False
+    # Local template reply instead of Gemini's
+    degraded: bool = False
+    # Set when Gemini's reply can still be fetched from /api/chat/followup/{id}
+    followup_id: Optional[str] = None
+
+# Per-client token buckets and global admission control for the expensive endpoints
+rate_limiter = create_rate_limiter()
+address_limiter = create_address_rate_limiter()
+batch_limiter = create_batch_rate_limiter()
+admission = create_admission_controller()
 
-# Conversation memory: stores chat history per user_id
-conversation_history = defaultdict(list)
+# Conversation memory: bounded per-user chat history (backend chosen by CONVERSATION_STORE)
+conversation_store = create_conversation_store()
+
+
+async def run_store(method, *args):
+    """Call a conversation store method, off the event loop for blocking backends."""
+    if conversation_store.blocking:
+        return await asyncio.to_thread(method, *args)
+    return method(*args)
 
 @app.get("/api/debug-response")
 async def debug_response():
@@ -62,64 +180,193 @@ async def debug_response():
     return {
         "has_generate_method": has_generate,
         "available_methods": methods,
-        "gemini_available": getattr(response_generator, 'available', 'Unknown')
+        "gemini_available": getattr(response_generator, 'available', 'Unknown'),
+        "response_cache": response_generator.cache_stats(),
+        "gemini_client": response_generator.client_stats(),
+        "prompt_tokens": response_generator.prompt_token_stats(),
+        "events": get_event_bus().stats(),
+        "admission": {**admission.stats(), "inference_queue": inference_queue_depth()},
+        "classifier_cache": {
+            name: model.result_cache.stats()
+            for name, model in (("emotion", emotion_model), ("harassment", harassment_model))
+            if model is not None and model.result_cache is not None
+        }
     }
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize models on server startup for faster response times."""
-    global emotion_model, harassment_model, response_generator, harassment_logger, ipc_data
-    
-    print("🚀 Initializing EmpathAI models...")
-    
-    try:
-        emotion_model = EmotionModel()
-        print("✅ Emotion model loaded")
-    except Exception as e:
-        print(f"❌ Error loading emotion model: {e}")
-        raise
-    
+def load_emotion_model():
+    """Load the emotion classifier (torch/transformers are imported on first load)."""
+    if preloaded_models is not None:
+        return preloaded_models[0]
+    from models.emotion_model import EmotionModel
+    return EmotionModel()
+
+
+def load_harassment_model():
+    """Load the harassment classifier (torch/transformers are imported on first load)."""
+    if preloaded_models is not None:
+        return preloaded_models[1]
+    from models.harassment_model import HarassmentModel
+    return HarassmentModel()
+
+
+def preload_models():
+    """
+    Load both classifiers before workers fork (used by serve.py), so every worker
+    shares the weights copy-on-write. Nothing else is preloaded: the Gemini client,
+    thread pools and batchers are not fork-safe and are created in each worker.
+    """
+    global preloaded_models
+    preloaded_models = (load_emotion_model(), load_harassment_model())
+    return preloaded_models
+
+
+def load_response_generator():
+    """Configure the Gemini client."""
+    from utils.generate_response import ResponseGenerator
+    return ResponseGenerator()
+
+
+def load_legal():
+    """
+    Load the IPC law database into the section/keyword index and build the semantic retriever.
+    A missing or unreadable database raises, so /health reports legal as failed.
+    """
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    ipc_path = os.getenv("LEGAL_SECTIONS_PATH") or os.path.join(base_dir, "legal", "indian_laws.json")
+    index = LegalIndex(ipc_path, reload_interval_s=LEGAL_RELOAD_INTERVAL_S)
+    print(f"✅ Loaded {index.load()} IPC sections")
+
+    # Semantic section retrieval (embeddings cached on disk); Gemini suggestion is the fallback
+    retriever = None
     try:
-        harassment_model = HarassmentModel()
-        print("✅ Harassment model loaded")
+        retriever = create_legal_retriever(index)
+        if retriever is not None:
+            print("✅ Legal section retriever ready")
     except Exception as e:
-        print(f"❌ Error loading harassment model: {e}")
-        raise
+        print(f"⚠️  Warning: Legal retriever unavailable, using Gemini suggestions: {e}")
+    return index, retriever
+
+
+async def load_components():
+    """
+    Load both classifiers, the Gemini client and the legal index concurrently in
+    worker threads. Globals are only published once a component is usable, so
+    endpoints keep answering 503 until then.
+    """
+    global emotion_model, harassment_model, response_generator, harassment_logger, legal_index, legal_retriever
+    global emotion_batcher, harassment_batcher, inference_executor
     
-    try:
-        response_generator = ResponseGenerator()
-        print("✅ Response generator initialized")
-    except Exception as e:
-        print(f"❌ CRITICAL: Response generator failed: {e}")
-        print("🚨 Gemini is REQUIRED. Server cannot start without it.")
-        raise  # This will stop the server if Gemini fails
+    print(f"🚀 Initializing EmpathAI models ({STARTUP_MODE} startup)...")
     
     try:
         harassment_logger = HarassmentLogger()
         print("✅ Harassment logger initialized")
     except Exception as e:
         print(f"⚠️  Warning: Logger error: {e}")
+    
+    if CLASSIFIER_ONLY:
+        readiness.skip("response_generator")
+    emotion, harassment, generator, legal = await asyncio.gather(
+        readiness.load("emotion_model", load_emotion_model),
+        readiness.load("harassment_model", load_harassment_model),
+        asyncio.sleep(0) if CLASSIFIER_ONLY else readiness.load("response_generator", load_response_generator),
+        readiness.load("legal", load_legal),
+        return_exceptions=True
+    )
+    
+    if isinstance(legal, BaseException):
+        print(f"⚠️  Error loading legal sections: {legal}")
+    else:
+        legal_index, legal_retriever = legal
+    
+    if CLASSIFIER_ONLY:
+        print("🧪 Classifier-only mode: Gemini is not loaded, replies use local templates")
+    elif isinstance(generator, BaseException):
+        print(f"❌ CRITICAL: Response generator failed: {generator}")
+        print("🚨 Gemini is REQUIRED. Set CLASSIFIER_ONLY=1 to start without it for local testing.")
+    else:
+        response_generator = generator
+        print("✅ Response generator initialized")
+    
+    for name, result in (("emotion", emotion), ("harassment", harassment)):
+        if isinstance(result, BaseException):
+            print(f"❌ Error loading {name} model: {result}")
+        else:
+            print(f"✅ {name.capitalize()} model loaded ({readiness.components[name + '_model'].load_ms} ms)")
+    
+    failed = [result for result in (emotion, harassment, generator) if isinstance(result, BaseException)]
+    if failed:
+        raise failed[0]
+    
+    if TORCH_NUM_THREADS > 0:
+        import torch
+        torch.set_num_threads(TORCH_NUM_THREADS)
+    
+    inference_executor = ThreadPoolExecutor(
+        max_workers=INFERENCE_WORKERS,
+        thread_name_prefix="inference"
+    )
+    emotion_batcher = MicroBatcher(
+        emotion.detect_batch,
+        max_batch_size=INFERENCE_BATCH_MAX_SIZE,
+        max_wait_ms=INFERENCE_BATCH_WAIT_MS,
+        executor=inference_executor,
+        name="emotion"
+    )
+    harassment_batcher = MicroBatcher(
+        harassment.detect_batch,
+        max_batch_size=INFERENCE_BATCH_MAX_SIZE,
+        max_wait_ms=INFERENCE_BATCH_WAIT_MS,
+        executor=inference_executor,
+        name="harassment"
+    )
+    emotion_batcher.start()
+    harassment_batcher.start()
+    print(f"✅ Inference batching enabled (max {INFERENCE_BATCH_MAX_SIZE} items / {INFERENCE_BATCH_WAIT_MS} ms, {INFERENCE_WORKERS} workers)")
+    
+    emotion_model = emotion
+    harassment_model = harassment
+    print(f"🎉 EmpathAI backend ready! ({round((time.time() - readiness.started_at) * 1000)} ms)")
+
 
-    # Load IPC law database
+async def load_components_in_background():
+    """Fast-start loader: failures are reported by /health instead of stopping the server."""
     try:
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        ipc_path = os.path.join(base_dir, "legal", "indian_laws.json")
-        with open(ipc_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, list):
-            ipc_data = data
-            print(f"✅ Loaded {len(ipc_data)} IPC sections")
-        elif isinstance(data, dict):
-            ipc_data = [{"section": key, **value} for key, value in data.items()]
-            print(f"✅ Loaded {len(ipc_data)} IPC sections (dict mode)")
-        else:
-            print("⚠️  IPC data format unknown; skipping load")
-    except FileNotFoundError as e:
-        print(f"⚠️  Could not load IPC laws (missing): {e}")
+        await load_components()
     except Exception as e:
-        print(f"⚠️  Error reading IPC laws: {e}")
+        print(f"❌ Background model loading failed: {e}")
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Load models concurrently; in fast mode, return at once and keep loading in the background."""
+    global load_task
+    # Open the alert/interaction sinks now rather than on the first escalated message
+    get_event_bus()
+    if STARTUP_MODE == "fast":
+        load_task = asyncio.create_task(load_components_in_background())
+    else:
+        await load_components()  # Raising here stops the server if a required model or Gemini fails
+
 
-    print("🎉 EmpathAI backend ready!")
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background loading, inference batchers, the inference pool, log writers and alert sinks."""
+    if load_task is not None and not load_task.done():
+        load_task.cancel()
+    for batcher in (emotion_batcher, harassment_batcher):
+        if batcher is not None:
+            await batcher.stop()
+    if inference_executor is not None:
+        inference_executor.shutdown(wait=False, cancel_futures=True)
+    if harassment_logger is not None:
+        harassment_logger.close()
+    close_event_bus()
+
+
+async def analyze_text(text: str):
+    """Run both classifiers for one message through the shared micro-batchers."""
+    return await analyze_message_batched(text, emotion_batcher, harassment_batcher, harassment_model)
 
 
 # Request/Response Models
@@ -138,21 +385,104 @@ class ChatResponse(BaseModel):
 class HealthResponse(BaseModel):
     status: str
     models_loaded: bool
+    live: bool = Field(True, description="The process is up and serving requests")
+    ready: bool = Field(False, description="Both models and Gemini are loaded")
+    uptime_s: float = Field(0.0, description="Seconds since startup began")
+    components: dict = Field(default_factory=dict, description="Per-component load status and load_ms")
 
 
 # Endpoints
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Health check endpoint to verify server and model status."""
+    """
+    Health check endpoint to verify server and model status.
+    `live` is true whenever the process answers; `ready` only once the required
+    components are loaded (use it as the readiness probe during rolling deploys).
+    """
     models_loaded = (
         emotion_model is not None and
         harassment_model is not None
     )
+    ready = models_loaded and readiness.is_ready(REQUIRED_COMPONENTS)
+    
+    if ready:
+        status = "healthy"
+    elif any(readiness.components[name].status == "failed" for name in REQUIRED_COMPONENTS):
+        status = "degraded"
+    else:
+        status = "starting"
     
     return HealthResponse(
-        status="healthy" if models_loaded else "degraded",
-        models_loaded=models_loaded
+        status=status,
+        models_loaded=models_loaded,
+        live=True,
+        ready=ready,
+        uptime_s=round(time.time() - readiness.started_at, 2),
+        components=readiness.snapshot()
     )
+
+
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness probe: 200 as soon as the process serves requests."""
+    return {"live": True}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: 503 until both models and Gemini are loaded."""
+    if emotion_model is None or harassment_model is None or not readiness.is_ready(REQUIRED_COMPONENTS):
+        raise HTTPException(status_code=503, detail={"ready": False, "components": readiness.snapshot()})
+    return {"ready": True, "components": readiness.snapshot()}
+
+
+CIRCUIT_STATES = ("closed", "half_open", "open")
+
+
+def collect_component_metrics():
+    """Scrape-time samples from the Gemini client, batchers, prompt builder and startup loader."""
+    for name in readiness.components:
+        yield ("empathai_component_ready", "gauge", "Startup component loaded (1) or not (0)",
+               {"component": name}, 1 if readiness.is_ready([name]) else 0)
+    for name, batcher in (("emotion", emotion_batcher), ("harassment", harassment_batcher)):
+        if batcher is None:
+            continue
+        yield ("empathai_batcher_batches_total", "counter", "Forward passes run by the micro-batcher",
+               {"model": name}, batcher.batches_run)
+        yield ("empathai_batcher_items_total", "counter", "Messages classified through the micro-batcher",
+               {"model": name}, batcher.items_processed)
+        yield ("empathai_batcher_queue_size", "gauge", "Messages waiting for the next batch",
+               {"model": name}, batcher.queue_size)
+    yield ("empathai_llm_in_flight", "gauge", "Gemini calls holding an admission slot", {}, admission.llm_in_flight)
+    yield ("empathai_inference_queue_depth", "gauge", "Classifier inputs waiting across batchers", {}, inference_queue_depth())
+    if response_generator is None:
+        return
+    client = response_generator.client_stats()
+    for key in ("calls", "successes", "failures", "timeouts", "retries", "hedges", "hedge_wins", "short_circuited"):
+        if key in client:
+            yield (f"empathai_gemini_{key}_total", "counter", f"Gemini client {key.replace('_', ' ')}", {}, client[key])
+    yield ("empathai_gemini_circuit_opened_total", "counter", "Times the Gemini circuit breaker opened",
+           {}, client["circuit_opened"])
+    for state in CIRCUIT_STATES:
+        yield ("empathai_gemini_circuit_state", "gauge", "Gemini circuit breaker state (1 = current)",
+               {"state": state}, 1 if client["circuit"] == state else 0)
+    prompts = response_generator.prompt_token_stats()
+    yield ("empathai_prompts_built_total", "counter", "Gemini prompts built", {}, prompts["prompts"])
+    yield ("empathai_prompt_estimated_tokens_avg", "gauge", "Mean estimated prompt tokens",
+           {}, prompts["estimated_tokens_avg"])
+    yield ("empathai_prompt_reported_tokens_avg", "gauge", "Mean prompt tokens reported by Gemini",
+           {}, prompts["reported_tokens_avg"])
+
+
+REGISTRY.add_collector(collect_component_metrics)
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus scrape endpoint: request and span histograms plus component counters."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api/test-gemini")
 async def test_gemini():
     """Test Gemini connection and safety settings."""
@@ -162,11 +492,11 @@ async def test_gemini():
     try:
         # Test with a safe message first
         test_message = "I'm feeling stressed about work"
-        result = response_generator.generate(
+        result, _ = await response_generator.agenerate(
             user_message=test_message,
             emotion="anxiety", 
             is_harassment=False,
-            ore=0.1
+            harassment_score=0.1
         )
         return {
             "status": "success", 
@@ -178,14 +508,177 @@ async def test_gemini():
 
 
 
-@app.post("/api/chat")
-async def chat_endpoint(request: Request):
+async def fetch_web_context(user_message: str, enable_web: bool) -> str:
+    """Web search stage: snippets for factual queries when web search is enabled."""
+    if not enable_web or response_generator is None:
+        return ""
+    return await response_generator.afetch_web_context(user_message)
+
+
+def degraded_reply(analysis, endpoint: str, reason: str) -> str:
+    """Local emotion × severity reply, counted by why Gemini was not used."""
+    DEGRADED_REPLIES.inc(endpoint=endpoint, reason=reason)
+    return local_reply(analysis.emotion, analysis.harassment_label)
+
+
+def skip_llm_reason() -> Optional[str]:
+    """Why the reply cannot come from Gemini right now, or None if it can."""
+    if response_generator is None:
+        return "classifier_only" if CLASSIFIER_ONLY else "no_generator"
+    if response_generator.circuit_open():
+        return "circuit_open"
+    return None
+
+
+async def generate_reply(user_message: str, analysis, user_history: list, enable_web: bool, web_context: str) -> ChatReply:
     """
-    Main chat endpoint that:
-    1. Detects emotion in user message
-    2. Detects harassment/toxicity
-    3. Generates empathetic AI response
+    Reply stage: Gemini response using the analysis, memory and prefetched web
+    context. Past REPLY_BUDGET_MS, or when Gemini gives no reply, the local reply
+    is returned instead; with REPLY_FOLLOWUP a call that is only late keeps
+    running for /api/chat/followup/{id}.
     """
+    reason = skip_llm_reason()
+    if reason is not None:
+        return ChatReply(degraded_reply(analysis, "chat", reason), degraded=True)
+    if not admission.try_acquire_llm():
+        # Saturated: answer locally rather than queue behind other Gemini calls
+        SHED.inc(endpoint="chat", reason="llm_in_flight", action="fallback")
+        return ChatReply(degraded_reply(analysis, "chat", "shed"), degraded=True)
+    
+    task = asyncio.ensure_future(response_generator.agenerate(
+        user_message=user_message,
+        emotion=analysis.emotion,
+        is_harassment=analysis.is_harassment,
+        harassment_score=analysis.harassment_score,
+        conversation_history=user_history,
+        enable_web=enable_web,
+        web_context=web_context
+    ))
+    # The slot is held until Gemini answers, including for a follow-up
+    task.add_done_callback(lambda _: admission.release_llm())
+    deferred = False
+    try:
+        ai_text, web_enabled = await asyncio.wait_for(asyncio.shield(task), REPLY_BUDGET_S or None)
+        return ChatReply(ai_text, web_enabled)
+    except ReplyUnavailable as e:
+        return ChatReply(degraded_reply(analysis, "chat", e.reason), degraded=True)
+    except asyncio.TimeoutError:
+        reply = ChatReply(degraded_reply(analysis, "chat", "budget"), degraded=True)
+        if REPLY_FOLLOWUP:
+            reply.followup_id = uuid.uuid4().hex
+            pending_followups.put(reply.followup_id, task)
+            deferred = True
+        return reply
+    finally:
+        if not deferred and not task.done():
+            task.cancel()
+
+
+async def match_legal_sections(user_message: str, analysis) -> list:
+    """Legal stage (Medium/High harassment): match IPC sections by keywords in message."""
+    if not (analysis.is_escalated and legal_index is not None and len(legal_index)):
+        return []
+    
+    # Indexed keyword -> section lookup with precomputed citation lines
+    legal_sections = legal_index.match_citations(user_message)
+    
+    # No keyword hit: rank sections by embedding similarity (one matrix-vector product)
+    if not legal_sections and legal_retriever is not None:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(inference_executor, legal_retriever.search_citations, user_message)
+        except Exception as retrieval_error:
+            print(f"⚠️ Legal retrieval error: {retrieval_error}")
+    
+    # If no direct match and Gemini is available (and not saturated), ask for suggestion
+    if not legal_sections and response_generator is not None:
+        with admission.llm_slot("chat") as admitted:
+            if admitted:
+                try:
+                    law_prompt = (
+                        f"Which Indian IPC sections (354A, 354D, 499, 503, 504, 506, 509) might apply to this situation: '{user_message}'? "
+                        "Respond with only the section number(s) and brief title, e.g., '354A: Sexual harassment'."
+                    )
+                    # Held to the reply budget too, so a slow suggestion cannot hold up a fast reply
+                    suggestion = await asyncio.wait_for(response_generator.acomplete(law_prompt), REPLY_BUDGET_S or None)
+                    if suggestion:
+                        legal_sections.append(f"⚖️ Suggested IPC: {suggestion}")
+                except asyncio.TimeoutError:
+                    print("⚠️ IPC suggestion skipped: over the reply budget")
+                except Exception as law_error:
+                    print(f"⚠️ IPC suggestion error: {law_error}")
+    
+    return legal_sections
+
+
+def address_key(request: Request) -> str:
+    """Per-address rate limit key; forwarded headers count only from TRUSTED_PROXIES."""
+    peer = request.client.host if request.client else None
+    return "ip:" + client_address(peer, request.headers.get("x-forwarded-for"), request.headers.get("x-real-ip"))
+
+
+def client_key(request: Request, user_id: Optional[str] = None) -> str:
+    """Per-user rate limit key: the user ID when the client sends one, else the client address."""
+    if user_id and user_id != "anonymous":
+        return f"user:{user_id}"
+    return address_key(request)
+
+
+def check_rate_limit(request: Request, endpoint: str, user_id: Optional[str] = None, items: Optional[int] = None):
+    """
+    Raise 429 with Retry-After when the client's token buckets are empty.
+
+    Requests draw from the per-user bucket and, when RATE_LIMIT_IP_PER_MIN is
+    set, the per-address bucket (one token per request). Without a user ID only
+    the address bucket applies, or the per-user limit on the address when the
+    address limiter is off. Batches pass their item count as `items` and draw
+    from the batch bucket instead of the per-user one.
+    """
+    address = address_key(request)
+    client = client_key(request, user_id)
+    checks = []
+    if address_limiter.enabled:
+        checks.append((address_limiter, address, 1))
+    if items is not None:
+        checks.append((batch_limiter, client, items))
+    elif client != address or not checks:
+        checks.append((rate_limiter, client, 1))
+
+    allowed, retry_after = True, 0.0
+    taken = []
+    for limiter, key, cost in checks:
+        allowed, retry_after = limiter.allow(key, cost)
+        if not allowed:
+            for refund_limiter, refund_key, refund_cost in taken:
+                refund_limiter.refund(refund_key, refund_cost)
+            break
+        taken.append((limiter, key, cost))
+    if not allowed:
+        RATE_LIMITED.inc(endpoint=endpoint)
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests. Please slow down.",
+            headers=retry_after_header(retry_after)
+        )
+
+
+def inference_queue_depth() -> int:
+    """Classifier inputs waiting in the micro-batchers."""
+    return sum(batcher.queue_size for batcher in (emotion_batcher, harassment_batcher) if batcher is not None)
+
+
+def reject_overloaded(endpoint: str, reason: str):
+    """Shed a request with 503 + Retry-After."""
+    SHED.inc(endpoint=endpoint, reason=reason, action="reject")
+    raise HTTPException(
+        status_code=503,
+        detail="Server is busy. Please retry shortly.",
+        headers=retry_after_header(1)
+    )
+
+
+async def read_chat_request(request: Request, endpoint: str = "chat") -> tuple:
+    """Validate a chat body and admit it, returning (user_message, user_id, enable_web)."""
     if emotion_model is None or harassment_model is None:
         raise HTTPException(
             status_code=503,
@@ -202,66 +695,96 @@ async def chat_endpoint(request: Request):
             detail="Message cannot be empty"
         )
     
+    check_rate_limit(request, endpoint, user_id)
+    # A chat reply needs the classifiers, so a full inference queue always rejects
+    if admission.inference_overloaded(inference_queue_depth()):
+        reject_overloaded(endpoint, "inference_queue")
+    if admission.rejects and admission.llm_saturated():
+        reject_overloaded(endpoint, "llm_in_flight")
+    
     # Get optional parameters
     enable_web = body.get("enable_web", False)
-    
-    # Start timing
-    start_time = time.time()
-    
-    try:
-        # Step 1: Detect emotion
-        emotion_result = emotion_model.detect(user_message)
-        detected_emotion = emotion_result["emotion"]
-        
-        # Step 2: Detect harassment/toxicity
-        harassment_result = harassment_model.detect(user_message)
-        harassment_score = harassment_result.get("score", 0.0)
-        severity_level = harassment_result.get("label", "Low")
-        is_harassment = harassment_score >= 0.55
-
-        # Extract keywords separately (if analyze exists)
-        keywords = []
-        if hasattr(harassment_model, "analyze"):
-            try:
-                _, keywords = harassment_model.analyze(user_message)
-            except Exception:
-                keywords = []
+    return user_message, user_id, enable_web
 
-        # Step 3: Generate AI response with conversation memory and optional web search
-        ai_text = ""
-        web_enabled = False
-        gemini_model = None
 
-        # Get conversation history for this user (last 6 turns)
-        user_history = conversation_history[user_id][-6:] if user_id in conversation_history else []
+def build_chat_graph(user_message: str, user_id: str, enable_web: bool, with_reply: bool = True) -> StageGraph:
+    """
+    Stage graph for one chat request: classifiers, history and web search run
+    concurrently; the reply and legal matching both wait only on what they need
+    and run in parallel. The streaming endpoint leaves out the reply stage.
+    """
+    graph = StageGraph(deadline_s=CHAT_DEADLINE_S)
+    graph.add(
+        "analysis",
+        lambda r: analyze_text(user_message),
+        timeout_s=STAGE_TIMEOUT_CLASSIFY_S
+    )
+    # Conversation history for this user (last 6 turns)
+    graph.add(
+        "history",
+        lambda r: run_store(conversation_store.get_history, user_id, 6),
+        timeout_s=STAGE_TIMEOUT_HISTORY_S,
+        fallback=[]
+    )
+    graph.add(
+        "web",
+        lambda r: fetch_web_context(user_message, enable_web),
+        timeout_s=STAGE_TIMEOUT_WEB_S,
+        fallback=""
+    )
+    if with_reply:
+        graph.add(
+            "reply",
+            lambda r: generate_reply(user_message, r["analysis"], r["history"], enable_web, r["web"]),
+            deps=("analysis", "history", "web"),
+            timeout_s=STAGE_TIMEOUT_REPLY_S,
+            fallback=lambda r: ChatReply(degraded_reply(r["analysis"], "chat", "stage_fallback"), degraded=True)
+        )
+    graph.add(
+        "legal",
+        lambda r: match_legal_sections(user_message, r["analysis"]),
+        deps=("analysis",),
+        timeout_s=STAGE_TIMEOUT_LEGAL_S,
+        fallback=[]
+    )
+    return graph
 
-        if response_generator is not None:
-            ai_text, web_enabled = response_generator.generate(
-                user_message=user_message,
-                emotion=detected_emotion,
-                is_harassment=is_harassment,
-                harassment_score=harassment_score,
-                conversation_history=user_history,
-                enable_web=enable_web
-            )
-            # Get the model for legal reasoning - use the new attribute name
-            gemini_model = response_generator.model
-        else:
-            print("❌ CRITICAL: No response generator loaded!")
-            ai_text = "I'm here to support you. Could you tell me more about how you're feeling?"
-        
-        # Update conversation history after generating response
-        conversation_history[user_id].append(f"User: {user_message}")
-        conversation_history[user_id].append(f"EmpathAI: {ai_text}")
-        
-        # Keep only last 20 turns to prevent memory bloat
-        if len(conversation_history[user_id]) > 20:
-            conversation_history[user_id] = conversation_history[user_id][-20:]
-        
-        # Calculate response time
-        response_time_ms = (time.time() - start_time) * 1000
-        
-        # Step 4: Log analytics (emotion, harassment, response time)
+
+def analysis_fields(analysis) -> dict:
+    """Classifier fields shared by the chat response and the streamed `analysis` event."""
+    return {
+        "emotion": analysis.emotion,
+        "harassment_level": analysis.harassment_label,
+        "harassment_detected": analysis.is_harassment,
+        "harassment_confidence": round(analysis.harassment_score, 3),
+        "keywords": list(analysis.keywords),
+    }
+
+
+def unmentioned_legal_sections(ai_text: str, legal_sections: list) -> list:
+    """Sections whose number Gemini did not already cite in the reply."""
+    unmentioned = []
+    for section in legal_sections:
+        section_num = section.split(":")[0].replace("⚖️ IPC Section", "").replace("⚖️ Suggested IPC", "").strip()
+        if section_num not in ai_text:
+            unmentioned.append(section)
+    return unmentioned
+
+
+async def record_chat(user_id: str, user_message: str, analysis, ai_text: str, response_time_ms: float):
+    """Store the turn in conversation memory, log analytics and raise an alert if escalated."""
+    detected_emotion = analysis.emotion
+    harassment_score = analysis.harassment_score
+    severity_level = analysis.harassment_label
+    is_harassment = analysis.is_harassment
+    
+    # Update conversation history after generating response (store trims old turns)
+    await run_store(
+        conversation_store.append, user_id, f"User: {user_message}", f"EmpathAI: {ai_text}"
+    )
+    
+    with span("logging"):
+        # Log analytics (emotion, harassment, response time)
         if harassment_logger:
             # Log analytics for all requests
             harassment_logger.log_analytics(
@@ -279,88 +802,59 @@ async def chat_endpoint(request: Request):
                     response_time_ms=response_time_ms,
                     harassment_detected=True
                 )
-        
-        # Legal reasoning (if harassment Medium/High): match IPC sections by keywords in message
-        legal_sections = []
-        if severity_level.lower() in ["medium", "high"] and ipc_data:
-            message_lower = user_message.lower()
-            
-            # IPC section keywords mapping
-            ipc_keywords = {
-                "354A": ["sexual", "harassment", "unwelcome", "advances", "favours", "explicit"],
-                "354D": ["stalk", "stalking", "follow", "following", "repeatedly"],
-                "499": ["defame", "defamation", "reputation", "false", "statement"],
-                "503": ["threat", "threaten", "intimidate", "injury", "alarm"],
-                "504": ["insult", "provoke", "breach", "peace", "intentionally"],
-                "506": ["criminal", "intimidation", "punishment"],
-                "509": ["modesty", "woman", "word", "gesture", "insult"]
-            }
-            
-            # Check if message matches IPC section keywords
-            matched_sections = []
-            for section_num, keywords in ipc_keywords.items():
-                if any(kw in message_lower for kw in keywords):
-                    # Find the section in ipc_data
-                    if isinstance(ipc_data, list):
-                        section_data = next((law for law in ipc_data if law.get("section") == section_num), None)
-                    else:
-                        section_data = ipc_data.get(section_num)
-                    
-                    if section_data:
-                        if isinstance(section_data, dict):
-                            title = section_data.get("title", "")
-                            description = section_data.get("description", "")
-                            matched_sections.append(f"⚖️ IPC Section {section_num}: {title} — {description}")
-            
-            legal_sections = matched_sections
-            
-            # If no direct match and Gemini is available, ask for suggestion
-            if not legal_sections and gemini_model is not None:
-                try:
-                    law_prompt = (
-                        f"Which Indian IPC sections (354A, 354D, 499, 503, 504, 506, 509) might apply to this situation: '{user_message}'? "
-                        "Respond with only the section number(s) and brief title, e.g., '354A: Sexual harassment'."
-                    )
-                    law_response = gemini_model.generate_content(law_prompt)
-                    suggestion = (law_response.text or "").strip()
-                    if suggestion:
-                        legal_sections.append(f"⚖️ Suggested IPC: {suggestion}")
-                except Exception as law_error:
-                    print(f"⚠️ IPC suggestion error: {law_error}")
 
         # Log message-level interaction per requirement
         try:
-            log_user_interaction(user_id, user_message, emotion_model.predict(user_message), severity_level)
+            log_user_interaction(user_id, user_message, analysis.emotion_label, severity_level)
         except Exception:
             pass
 
-        # Step 5: Format response (new response schema)
-        # Note: Gemini may already include IPC sections in its response, but we append additional ones if found
-        if legal_sections:
-            # Only append if not already mentioned in ai_text
-            for section in legal_sections:
-                section_num = section.split(":")[0].replace("⚖️ IPC Section", "").replace("⚖️ Suggested IPC", "").strip()
-                if section_num not in ai_text:
-                    ai_text = f"{ai_text}\n\n{section}"
-
-        # Step 5b: Trigger alert if needed
-        if severity_level.lower() in ["medium", "high"]:
-            try:
-                from utils.notifier import trigger_alert
+    # Queue an alert if needed (delivered by the event bus, never on the reply path)
+    if analysis.is_escalated:
+        try:
+            trigger_alert(user_id, user_message, severity_level, harassment_score)
+        except Exception as alert_error:
+            print(f"⚠️ Alert trigger failed: {alert_error}")
 
-                trigger_alert(user_id, user_message, severity_level, harassment_score)
-            except Exception as alert_error:
-                print(f"⚠️ Alert trigger failed: {alert_error}")
+
+@app.post("/api/chat")
+async def chat_endpoint(request: Request):
+    """
+    Main chat endpoint that:
+    1. Detects emotion in user message
+    2. Detects harassment/toxicity
+    3. Generates empathetic AI response
+    """
+    user_message, user_id, enable_web = await read_chat_request(request)
+    
+    # Start timing
+    start_time = time.time()
+    
+    try:
+        results = await build_chat_graph(user_message, user_id, enable_web).run()
+        
+        analysis = results["analysis"]
+        reply = results["reply"]
+        ai_text = reply.text
+        legal_sections = results["legal"]
+        
+        # Calculate response time
+        response_time_ms = (time.time() - start_time) * 1000
+        
+        await record_chat(user_id, user_message, analysis, ai_text, response_time_ms)
+
+        # Format response
+        # Note: Gemini may already include IPC sections in its response, but we append additional ones if found
+        for section in unmentioned_legal_sections(ai_text, legal_sections):
+            ai_text = f"{ai_text}\n\n{section}"
 
         return {
             "reply": ai_text.strip(),
-            "emotion": detected_emotion,
-            "harassment_level": severity_level,
-            "harassment_detected": is_harassment,
-            "harassment_confidence": round(harassment_score, 3),
-            "keywords": keywords,
+            **analysis_fields(analysis),
             "response_time_ms": round(response_time_ms, 2),
-            "web_enabled": web_enabled,
+            "web_enabled": reply.web_enabled,
+            "degraded": reply.degraded,
+            **({"followup_id": reply.followup_id} if reply.followup_id else {}),
         }
     
     except Exception as e:
@@ -371,14 +865,173 @@ async def chat_endpoint(request: Request):
         )
 
 
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def stream_reply(user_message: str, analysis, user_history: list, web_context: str):
+    """
+    (event, text) pairs: ("token", chunk) as Gemini generates the reply, and
+    ("fallback", local reply) when Gemini is skipped, shed or fails before its
+    first chunk, or has not sent it within REPLY_BUDGET_MS (its tokens then follow).
+    """
+    reason = skip_llm_reason()
+    if reason is not None:
+        yield ("fallback", degraded_reply(analysis, "chat-stream", reason))
+        return
+    # The slot is held for the whole stream
+    with admission.llm_slot("chat-stream") as admitted:
+        if not admitted:
+            yield ("fallback", degraded_reply(analysis, "chat-stream", "shed"))
+            return
+        replies = response_generator.astream(
+            user_message=user_message,
+            emotion=analysis.emotion,
+            is_harassment=analysis.is_harassment,
+            harassment_score=analysis.harassment_score,
+            conversation_history=user_history,
+            web_context=web_context
+        )
+        first = asyncio.ensure_future(replies.__anext__())
+        late = False
+        try:
+            if REPLY_BUDGET_S:
+                done, _ = await asyncio.wait({first}, timeout=REPLY_BUDGET_S)
+                if not done:
+                    late = True
+                    yield ("fallback", degraded_reply(analysis, "chat-stream", "budget"))
+            try:
+                yield ("token", await first)
+            except StopAsyncIteration:
+                return
+            except ReplyUnavailable as e:
+                # A late reply that then failed already sent its local fallback
+                if not late:
+                    yield ("fallback", degraded_reply(analysis, "chat-stream", e.reason))
+                return
+            async for chunk in replies:
+                yield ("token", chunk)
+        finally:
+            if not first.done():
+                first.cancel()
+                await asyncio.gather(first, return_exceptions=True)
+            await replies.aclose()
+
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: Request):
+    """
+    Streaming variant of /api/chat over Server-Sent Events.
+    Sends `analysis` as soon as the classifiers finish, then `token` events as
+    Gemini generates the reply, then `legal` (sections not already cited in the
+    reply) and `done`. A `fallback` event carries the local reply when Gemini is
+    unavailable or misses the reply budget; in the latter case Gemini's tokens
+    still follow. A failure after the stream has started is sent as `error`.
+    """
+    user_message, user_id, enable_web = await read_chat_request(request, "chat-stream")
+    start_time = time.time()
+    
+    graph = build_chat_graph(user_message, user_id, enable_web, with_reply=False)
+    graph.start()
+    
+    async def events():
+        try:
+            analysis = await graph.result("analysis")
+            yield sse_event("analysis", analysis_fields(analysis))
+            
+            user_history = await graph.result("history")
+            web_context = await graph.result("web")
+            parts = []
+            fallback_text = None
+            async for event, text in stream_reply(user_message, analysis, user_history, web_context):
+                if event == "fallback":
+                    fallback_text = text
+                else:
+                    parts.append(text)
+                yield sse_event(event, {"text": text})
+            ai_text = "".join(parts).strip() or fallback_text or ""
+            
+            legal_sections = unmentioned_legal_sections(ai_text, await graph.result("legal"))
+            if legal_sections:
+                yield sse_event("legal", {"sections": legal_sections})
+            
+            response_time_ms = (time.time() - start_time) * 1000
+            await record_chat(user_id, user_message, analysis, ai_text, response_time_ms)
+            yield sse_event("done", {
+                "response_time_ms": round(response_time_ms, 2),
+                "web_enabled": bool(web_context),
+                "degraded": fallback_text is not None,
+            })
+        except Exception as e:
+            print(f"Error streaming chat request: {e}")
+            yield sse_event("error", {"detail": f"Internal server error: {str(e)}"})
+        finally:
+            # Client disconnects and failures leave no stage running
+            await graph.cancel()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/chat/followup/{followup_id}")
+async def chat_followup_endpoint(followup_id: str):
+    """
+    Gemini's reply for a /api/chat request answered locally after missing the
+    reply budget, over Server-Sent Events: `reply` once it is ready (or
+    `unavailable` with the reason if Gemini failed), then `done`.
+    """
+    task = pending_followups.get(followup_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired follow-up")
+    
+    async def events():
+        try:
+            # Shielded: a client that disconnects does not cancel the reply for a retry
+            ai_text, web_enabled = await asyncio.shield(task)
+            yield sse_event("reply", {"reply": ai_text.strip(), "web_enabled": web_enabled})
+            yield sse_event("done", {})
+        except ReplyUnavailable as e:
+            # The local reply already sent stands
+            yield sse_event("unavailable", {"reason": e.reason})
+            yield sse_event("done", {})
+        except Exception as e:
+            print(f"Error delivering follow-up reply: {e}")
+            yield sse_event("error", {"detail": f"Internal server error: {str(e)}"})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/stats")
+async def stats_endpoint(window: Optional[str] = None):
+    """
+    Analytics rollups served from running aggregates (O(1) per query).
+    Optional `window` query param limits rollups to "minute", "hour" or "day".
+    """
+    if harassment_logger is None:
+        raise HTTPException(status_code=503, detail="Analytics logger not initialized")
+    if window is not None and window not in ("minute", "hour", "day"):
+        raise HTTPException(status_code=400, detail="window must be one of: minute, hour, day")
+    
+    rollups = harassment_logger.get_rollups(window)
+    rollups["incidents"] = harassment_logger.get_stats()
+    return rollups
+
+
 @app.post("/api/reset")
 async def reset_session(request: Request):
     """Reset conversation history for a specific user/session."""
     body = await request.json()
     user_id = body.get("user_id") or "anonymous"
     
-    if user_id in conversation_history:
-        conversation_history[user_id] = []
+    if await run_store(conversation_store.reset, user_id):
         return {"status": "success", "message": f"Conversation history reset for user {user_id}"}
     else:
         return {"status": "success", "message": f"No conversation history found for user {user_id}"}
@@ -406,80 +1059,208 @@ async def trigger_support_notification(request: Request):
             detail="Message cannot be empty"
         )
     
+    check_rate_limit(request, "trigger-support")
+    if admission.inference_overloaded(inference_queue_depth()):
+        if admission.rejects:
+            reject_overloaded("trigger-support", "inference_queue")
+        # The caller's severity is enough for the fallback message; skip the queued classifiers
+        SHED.inc(endpoint="trigger-support", reason="inference_queue", action="fallback")
+        return fallback_triage_result(severity)
+    if admission.rejects and admission.llm_saturated():
+        reject_overloaded("trigger-support", "llm_in_flight")
+    
     try:
         # Detect emotion and harassment for the notification message
-        emotion_result = emotion_model.detect(message)
-        detected_emotion = emotion_result.get("emotion", "distress")
-        
-        harassment_result = harassment_model.detect(message)
-        harassment_score = harassment_result.get("score", 0.0)
-        detected_severity = harassment_result.get("label", severity)
-        
-        # Use the higher severity (from detection or provided)
-        severity_map = {"Low": 1, "Medium": 2, "High": 3}
-        final_severity = severity
-        if severity_map.get(detected_severity, 0) > severity_map.get(severity, 0):
-            final_severity = detected_severity
-        
-        # Generate supportive response using Gemini
-        supportive_text = ""
-        if response_generator is not None:
-            try:
-                # Generate empathetic response
-                ai_text, _ = response_generator.generate(
-                    user_message=f"I received a notification that says: {message}",
-                    emotion=detected_emotion,
-                    is_harassment=True,
-                    harassment_score=max(harassment_score, 0.6),
-                    conversation_history=None,
-                    enable_web=False
-                )
-                supportive_text = ai_text
-            except Exception as e:
-                print(f"⚠️ Gemini generation failed, using fallback: {e}")
-                supportive_text = get_fallback_support_message(final_severity)
-        else:
-            supportive_text = get_fallback_support_message(final_severity)
-        
-        print(f"📢 Triggered supportive message ({final_severity}): {supportive_text[:100]}...")
-        
-        return {
-            "reply": supportive_text,
-            "severity": final_severity,
-            "emotion": detected_emotion,
-            "harassment_score": round(harassment_score, 3)
-        }
+        analysis = await analyze_text(message)
+        return await triage_notification(message, severity, analysis)
         
     except Exception as e:
         print(f"❌ Error in trigger-support: {e}")
         # Return fallback message even on error
-        return {
-            "reply": get_fallback_support_message(severity),
-            "severity": severity,
-            "emotion": "distress",
-            "harassment_score": 0.0
-        }
+        return fallback_triage_result(severity)
 
 
-def get_fallback_support_message(severity: str) -> str:
-    """Get fallback supportive message based on severity."""
-    if severity == "High":
-        return (
-            "This sounds extremely serious, and I'm deeply sorry you're going through this. "
-            "Please prioritize your safety. You can reach out to authorities or trusted friends immediately. "
-            "I'm here with you 💜"
-        )
-    elif severity == "Medium":
-        return (
-            "That message sounds really hurtful. I'm here to support you. "
-            "You might want to report or block the person involved. "
-            "You deserve to feel safe and respected 💜"
+def fallback_triage_result(severity: str) -> dict:
+    """Trigger-support response used when analysis or generation fails."""
+    return {
+        "reply": get_fallback_support_message(severity),
+        "severity": severity,
+        "emotion": "distress",
+        "harassment_score": 0.0
+    }
+
+
+# Batch triage only asks Gemini for items at or above this severity
+TRIAGE_GEMINI_MIN_SEVERITY = os.getenv("TRIAGE_GEMINI_MIN_SEVERITY", "Medium")
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 256))
+
+
+async def triage_notification(message: str, severity: str, analysis, use_gemini: bool = True) -> dict:
+    """Supportive reply for one analyzed notification (fallback text when Gemini is skipped or fails)."""
+    detected_emotion = analysis.emotion or "distress"
+    harassment_score = analysis.harassment_score
+    detected_severity = analysis.harassment_label
+    
+    # Use the higher severity (from detection or provided)
+    final_severity = severity
+    if SEVERITY_RANK.get(detected_severity, 0) > SEVERITY_RANK.get(severity, 0):
+        final_severity = detected_severity
+    
+    # Generate supportive response using Gemini
+    supportive_text = ""
+    if response_generator is not None and use_gemini:
+        with admission.llm_slot("trigger-support") as admitted:
+            if admitted:
+                try:
+                    # Generate empathetic response (within the reply budget, if set)
+                    ai_text, _ = await asyncio.wait_for(response_generator.agenerate(
+                        user_message=f"I received a notification that says: {message}",
+                        emotion=detected_emotion,
+                        is_harassment=True,
+                        harassment_score=max(harassment_score, 0.6),
+                        conversation_history=None,
+                        enable_web=False
+                    ), REPLY_BUDGET_S or None)
+                    supportive_text = ai_text
+                except asyncio.TimeoutError:
+                    DEGRADED_REPLIES.inc(endpoint="trigger-support", reason="budget")
+                except ReplyUnavailable as e:
+                    DEGRADED_REPLIES.inc(endpoint="trigger-support", reason=e.reason)
+                except Exception as e:
+                    print(f"⚠️ Gemini generation failed, using fallback: {e}")
+    if not supportive_text:
+        supportive_text = get_fallback_support_message(final_severity)
+    
+    print(f"📢 Triggered supportive message ({final_severity}): {supportive_text[:100]}...")
+    
+    return {
+        "reply": supportive_text,
+        "severity": final_severity,
+        "emotion": detected_emotion,
+        "harassment_score": round(harassment_score, 3)
+    }
+
+
+async def read_batch(request: Request, endpoint: str) -> list:
+    """
+    Validate a batch body: {"messages": [...]} with strings or {"message", "severity"} objects.
+    Charges the rate limit one token per item.
+    """
+    if emotion_model is None or harassment_model is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Models not loaded. Please wait for initialization."
         )
+    
+    body = await request.json()
+    items = body.get("messages") if isinstance(body, dict) else None
+    if not isinstance(items, list) or not items:
+        raise HTTPException(status_code=400, detail="'messages' must be a non-empty array")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} messages per batch")
+    
+    default_severity = body.get("severity", "Low")
+    if not isinstance(default_severity, str):
+        raise HTTPException(status_code=400, detail="'severity' must be a string")
+    batch = []
+    for i, item in enumerate(items):
+        if isinstance(item, dict):
+            message, severity = item.get("message"), item.get("severity", default_severity)
+        else:
+            message, severity = item, default_severity
+        # null counts as an empty message (reported in its slot); other non-strings are malformed
+        if not isinstance(message, (str, type(None))) or not isinstance(severity, str):
+            raise HTTPException(
+                status_code=400,
+                detail=f"messages[{i}] must be a string or an object with string 'message' and 'severity'"
+            )
+        batch.append(((message or "").strip(), severity))
+    
+    check_rate_limit(request, endpoint, body.get("user_id"), items=len(items))
+    return batch
+
+
+async def analyze_texts(texts: list) -> list:
+    """Analyze several messages; the batchers run them as shared batched forward passes."""
+    return list(await asyncio.gather(*(analyze_text(text) for text in texts)))
+
+
+@app.post("/api/analyze/batch")
+async def analyze_batch(request: Request):
+    """Classify an array of messages (emotion + harassment) and return per-item results in order."""
+    batch = await read_batch(request, "analyze-batch")
+    # Classification has no fallback, so an overloaded inference queue always rejects
+    if admission.inference_overloaded(inference_queue_depth()):
+        reject_overloaded("analyze-batch", "inference_queue")
+    texts = [message for message, _ in batch if message]
+    analyses = iter(await analyze_texts(texts))
+    
+    results = []
+    for message, _ in batch:
+        if not message:
+            results.append({"error": "Message cannot be empty"})
+            continue
+        analysis = next(analyses)
+        results.append({
+            "emotion": analysis.emotion,
+            "confidence": round(analysis.emotion_confidence, 3),
+            "harassment": analysis.is_harassment,
+            "harassment_score": round(analysis.harassment_score, 3),
+            "severity": analysis.harassment_label,
+            "keywords": list(analysis.keywords)
+        })
+    return {"count": len(results), "results": results}
+
+
+@app.post("/api/trigger-support/batch")
+async def trigger_support_batch(request: Request):
+    """
+    Batched /api/trigger-support for notification floods.
+    Classifies all messages together and calls Gemini only for items at or above
+    TRIAGE_GEMINI_MIN_SEVERITY; the rest get the fallback support message.
+    """
+    batch = await read_batch(request, "trigger-support-batch")
+    texts = [message for message, _ in batch if message]
+    analyses = None
+    if admission.inference_overloaded(inference_queue_depth()):
+        if admission.rejects:
+            reject_overloaded("trigger-support-batch", "inference_queue")
+        # Every item gets the fallback message for its given severity, as on /api/trigger-support
+        SHED.inc(endpoint="trigger-support-batch", reason="inference_queue", action="fallback")
     else:
-        return (
-            "I noticed something that might be bothering you. "
-            "Please remember, you're not alone — I'm here to listen 💜"
-        )
+        if admission.rejects and admission.llm_saturated():
+            reject_overloaded("trigger-support-batch", "llm_in_flight")
+        try:
+            analyses = iter(await analyze_texts(texts))
+        except Exception as e:
+            print(f"❌ Error in trigger-support batch: {e}")
+    
+    min_rank = SEVERITY_RANK.get(TRIAGE_GEMINI_MIN_SEVERITY, 2)
+    results = [None] * len(batch)
+    jobs = []
+    for i, (message, severity) in enumerate(batch):
+        if not message:
+            results[i] = {"error": "Message cannot be empty"}
+        elif analyses is None:
+            results[i] = fallback_triage_result(severity)
+        else:
+            analysis = next(analyses)
+            rank = max(SEVERITY_RANK.get(severity, 0), SEVERITY_RANK.get(analysis.harassment_label, 0))
+            jobs.append((i, triage_notification(message, severity, analysis, use_gemini=rank >= min_rank)))
+    
+    # Gemini calls run concurrently (bounded by GEMINI_MAX_CONCURRENCY)
+    replies = await asyncio.gather(*(job for _, job in jobs), return_exceptions=True)
+    for (i, _), reply in zip(jobs, replies):
+        if isinstance(reply, BaseException):
+            print(f"⚠️ Trigger-support batch item failed: {reply}")
+            reply = fallback_triage_result(batch[i][1])
+        results[i] = reply
+    return {"count": len(results), "results": results}
+
+
+def get_fallback_support_message(severity: str) -> str:
+    """Get fallback supportive message based on severity."""
+    return support_message(severity)
 
 
 if __name__ == "__main__":
@@ -488,7 +1269,8 @@ if __name__ == "__main__":
         "app:app",
         host="0.0.0.0",
         port=port,
-        reload=True,
+        # Auto-reload re-imports everything on each change; keep it for development only
+        reload=os.getenv("RELOAD", "0") == "1",
         log_level="info"
     )
 
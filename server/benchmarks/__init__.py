@@ -0,0 +1 @@
+"""Benchmarks for the EmpathAI backend."""
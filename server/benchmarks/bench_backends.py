@@ -0,0 +1,129 @@
+"""
+Inference Backend Parity Benchmark
+Loads both classifiers with the fp32 PyTorch reference and each candidate
+backend, checks the candidates' outputs against the reference on the fixture
+messages, and reports per-batch latency and resident memory growth.
+
+Exits non-zero when a candidate breaks the parity limits.
+
+Usage (from server/):
+    python -m benchmarks.bench_backends [--backends torch-int8 onnx] [--repeat 20]
+        [--fixtures benchmarks/fixtures/classifier_messages.json]
+        [--max-prob-diff 0.05] [--min-agreement 0.95] [--output results.json]
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+import torch
+
+from benchmarks.report import emit
+from models.emotion_model import EmotionModel
+from models.harassment_model import HarassmentModel
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "classifier_messages.json")
+
+
+def rss_mb():
+    """Resident set size of this process in MB (Linux only, else None)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+def probabilities(model, texts):
+    """Softmax rows from the model's backend, bypassing keyword post-processing."""
+    return torch.stack(model.tokenization.predict(texts, model.backend))
+
+
+def compare(reference, candidate, texts, label_key):
+    """Max probability difference and agreement of the final labels."""
+    prob_diff = (probabilities(reference, texts) - probabilities(candidate, texts)).abs().max().item()
+    ref_results = reference.detect_batch(texts)
+    cand_results = candidate.detect_batch(texts)
+    agree = sum(r[label_key] == c[label_key] for r, c in zip(ref_results, cand_results))
+    disagreements = [text for text, r, c in zip(texts, ref_results, cand_results) if r[label_key] != c[label_key]]
+    return {
+        "max_prob_diff": round(prob_diff, 5),
+        "label_agreement": round(agree / len(texts), 4),
+        "disagreements": disagreements,
+    }
+
+
+def latency_ms(model, texts, repeat):
+    """Mean wall time of one batched forward pass over the fixtures, plus single-message latency."""
+    model.detect_batch(texts)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        model.detect_batch(texts)
+    batch = (time.perf_counter() - start) / repeat * 1000
+    start = time.perf_counter()
+    for _ in range(repeat):
+        model.detect(texts[0])
+    single = (time.perf_counter() - start) / repeat * 1000
+    return {"batch_ms": round(batch, 2), "single_ms": round(single, 2)}
+
+
+def load(model_cls, backend):
+    gc.collect()
+    before = rss_mb()
+    start = time.perf_counter()
+    model = model_cls(backend=backend)
+    load_s = time.perf_counter() - start
+    after = rss_mb()
+    growth = round(after - before, 1) if before is not None and after is not None else None
+    return model, {"load_s": round(load_s, 2), "rss_growth_mb": growth}
+
+
+def run(backends, texts, repeat, max_prob_diff, min_agreement):
+    report = {"benchmark": "backends", "messages": len(texts), "repeat": repeat, "models": {}}
+    passed = True
+    for model_cls, label_key in ((EmotionModel, "emotion"), (HarassmentModel, "is_harassment")):
+        reference, ref_load = load(model_cls, "torch")
+        entry = {"torch": {**ref_load, **latency_ms(reference, texts, repeat)}}
+        for backend in backends:
+            try:
+                candidate, cand_load = load(model_cls, backend)
+            except Exception as e:
+                entry[backend] = {"error": str(e)}
+                passed = False
+                continue
+            parity = compare(reference, candidate, texts, label_key)
+            parity["ok"] = parity["max_prob_diff"] <= max_prob_diff and parity["label_agreement"] >= min_agreement
+            passed = passed and parity["ok"]
+            entry[candidate.backend.name] = {**cand_load, **latency_ms(candidate, texts, repeat), "parity": parity}
+            del candidate
+        report["models"][model_cls.__name__] = entry
+        del reference
+    report["passed"] = passed
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch-int8", "onnx"])
+    parser.add_argument("--fixtures", default=FIXTURES)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--max-prob-diff", type=float, default=0.05)
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    with open(args.fixtures, "r", encoding="utf-8") as f:
+        texts = json.load(f)
+
+    report = run(args.backends, texts, args.repeat, args.max_prob_diff, args.min_agreement)
+    emit(report, args.output)
+    sys.exit(0 if report["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Keyword Matching Benchmark
+Compares the shared precompiled KeywordMatcher against the per-consumer
+`any(kw in text_lower for kw in ...)` loops it replaced, on short chat
+messages and long pasted threads (around and beyond the 512-token limit).
+
+Usage (from server/):
+    python -m benchmarks.bench_keywords [--repeat 200] [--output results.json]
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.report import emit
+from utils.keywords import KEYWORD_MATCHER, KEYWORD_TABLES
+
+FILLER = (
+    "i told them about the meeting and they said we could talk later about the project "
+    "but then the messages kept coming late at night and i did not know what to do "
+).split()
+
+
+def legacy_scan(text: str) -> dict:
+    """One request's worth of the old keyword loops (each lowercases and rescans the text)."""
+    text_lower = text.lower()
+    anxiety = any(kw in text_lower for kw in KEYWORD_TABLES["anxiety"])
+    text_lower = text.lower()
+    explicit = any(kw in text_lower for kw in KEYWORD_TABLES["explicit"])
+    text_lower = text.lower()
+    strong = [kw for kw in KEYWORD_TABLES["strong_harassment"] if kw in text_lower]
+    text_lower = text.lower()
+    keywords = [kw for kw in KEYWORD_TABLES["harassment"] if kw in text_lower]
+    text_lower = text.lower()
+    web = any(kw in text_lower for kw in KEYWORD_TABLES["web"])
+    return {"anxiety": anxiety, "explicit": explicit, "strong": strong, "keywords": keywords, "web": web}
+
+
+def matcher_scan(text: str) -> dict:
+    """The same answers from one pass of the shared matcher (cache bypassed)."""
+    hits = KEYWORD_MATCHER._scan(text)
+    return {
+        "anxiety": hits.any("anxiety"),
+        "explicit": hits.any("explicit"),
+        "strong": hits.matches("strong_harassment"),
+        "keywords": hits.matches("harassment"),
+        "web": hits.any("web"),
+    }
+
+
+def make_text(n_words: int, rng: random.Random) -> str:
+    """Filler text with a few keywords sprinkled in (~1.3 tokens per word)."""
+    keywords = KEYWORD_MATCHER.keywords
+    words = [rng.choice(keywords) if rng.random() < 0.03 else rng.choice(FILLER) for _ in range(n_words)]
+    return " ".join(words)
+
+
+def time_fn(fn, texts, repeat: int) -> float:
+    """Mean microseconds per call."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            fn(text)
+    return (time.perf_counter() - start) / (repeat * len(texts)) * 1e6
+
+
+def run(repeat: int = 200, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    cases = {
+        "short_chat_12w": 12,
+        "paragraph_100w": 100,
+        "limit_512tok_400w": 400,
+        "long_thread_2000w": 2000,
+    }
+    results = {}
+    for name, n_words in cases.items():
+        texts = [make_text(n_words, rng) for _ in range(20)]
+        for text in texts:
+            assert legacy_scan(text) == matcher_scan(text), "matcher disagrees with legacy loops"
+        legacy_us = time_fn(legacy_scan, texts, repeat)
+        matcher_us = time_fn(matcher_scan, texts, repeat)
+        results[name] = {
+            "chars": sum(len(t) for t in texts) // len(texts),
+            "legacy_us": round(legacy_us, 2),
+            "matcher_us": round(matcher_us, 2),
+            "speedup": round(legacy_us / matcher_us, 2) if matcher_us else None,
+        }
+    return {"benchmark": "keywords", "repeat": repeat, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    report = run(args.repeat)
+    emit(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Analytics Logging Benchmark
+Per-call latency of the `HarassmentLogger` calls made on the request path
+(`log_analytics`, `log_incident`) and of the stats queries, against a
+temporary log directory, plus how long the final flush takes.
+
+Usage (from server/):
+    python -m benchmarks.bench_logging [--entries 20000] [--output results.json]
+"""
+
+import argparse
+import random
+import tempfile
+import time
+
+from benchmarks.report import emit, latency_summary
+from utils.logger import HarassmentLogger
+
+EMOTIONS = ("sad", "angry", "fear", "anxiety", "happy", "calm", "neutral")
+
+
+def timed(fn, *args, **kwargs) -> float:
+    """Wall time of one call in ms."""
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000
+
+
+def run(entries: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory(prefix="empathai-bench-") as log_dir:
+        logger = HarassmentLogger(log_dir=log_dir)
+        analytics_ms, incident_ms, stats_ms, rollups_ms = [], [], [], []
+        for i in range(entries):
+            score = rng.random()
+            emotion = rng.choice(EMOTIONS)
+            response_ms = rng.uniform(80, 3000)
+            analytics_ms.append(timed(
+                logger.log_analytics,
+                emotion=emotion,
+                harassment_detected=score >= 0.55,
+                harassment_confidence=score,
+                response_time_ms=response_ms
+            ))
+            if score >= 0.55:
+                incident_ms.append(timed(
+                    logger.log_incident,
+                    severity=score,
+                    emotion=emotion,
+                    response_time_ms=response_ms,
+                    harassment_detected=True
+                ))
+            if i % 100 == 0:
+                stats_ms.append(timed(logger.get_stats))
+                rollups_ms.append(timed(logger.get_rollups))
+        close_ms = timed(logger.close)
+
+    return {
+        "benchmark": "logging",
+        "entries": entries,
+        "results": {
+            "log_analytics": latency_summary(analytics_ms),
+            "log_incident": latency_summary(incident_ms),
+            "get_stats": latency_summary(stats_ms),
+            "get_rollups": latency_summary(rollups_ms),
+            "close_flush_ms": round(close_ms, 3),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+    emit(run(args.entries), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Classifier Micro-benchmark
+Per-call latency of `EmotionModel.detect` and `HarassmentModel.detect` on the
+chat and notification fixtures, plus one batched `detect_batch` pass over all
+of them. The classifier result cache is disabled so every call runs the model.
+
+Usage (from server/):
+    python -m benchmarks.bench_models [--repeat 5] [--backend torch] [--output results.json]
+"""
+
+import argparse
+import os
+import time
+
+# Measure the models, not the result cache
+os.environ.setdefault("CLASSIFIER_CACHE_SIZE", "0")
+
+from benchmarks.report import emit, latency_summary, load_fixture
+from models.emotion_model import EmotionModel
+from models.harassment_model import HarassmentModel
+
+
+def fixture_texts() -> list:
+    """Chat messages followed by notification messages."""
+    chat = [item["message"] for item in load_fixture("chat_messages.json")]
+    notifications = [item["message"] for item in load_fixture("notification_messages.json")]
+    return chat + notifications
+
+
+def bench_model(model, texts, repeat: int) -> dict:
+    """Single-message latency distribution and batched throughput."""
+    model.detect(texts[0])  # warm-up
+    samples = []
+    for _ in range(repeat):
+        for text in texts:
+            # Tokenizer cache would hide tokenization cost after the first pass
+            model.tokenization.cache.clear()
+            start = time.perf_counter()
+            model.detect(text)
+            samples.append((time.perf_counter() - start) * 1000)
+
+    model.tokenization.cache.clear()
+    start = time.perf_counter()
+    model.detect_batch(texts)
+    batch_ms = (time.perf_counter() - start) * 1000
+    return {
+        "detect": latency_summary(samples),
+        "detect_batch": {
+            "messages": len(texts),
+            "total_ms": round(batch_ms, 3),
+            "messages_per_s": round(len(texts) / batch_ms * 1000, 1),
+        },
+    }
+
+
+def run(repeat: int, backend: str) -> dict:
+    texts = fixture_texts()
+    results = {}
+    for model_cls in (EmotionModel, HarassmentModel):
+        start = time.perf_counter()
+        model = model_cls(backend=backend)
+        load_s = time.perf_counter() - start
+        results[model_cls.__name__] = {"load_s": round(load_s, 2), **bench_model(model, texts, repeat)}
+        del model
+    return {"benchmark": "models", "backend": backend, "messages": len(texts), "repeat": repeat, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--backend", default=os.getenv("INFERENCE_BACKEND", "torch"))
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+    emit(run(args.repeat, args.backend), args.output)
+
+
+if __name__ == "__main__":
+    main()
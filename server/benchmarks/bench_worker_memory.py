@@ -0,0 +1,92 @@
+"""
+Worker Memory Benchmark
+Reports per-process memory for a running multi-worker server: RSS, PSS
+(shared pages split evenly between the processes mapping them), and shared vs
+private pages, read from /proc/<pid>/smaps_rollup (Linux only).
+
+PSS is the number to size hosts with: summed over the launcher and its
+workers it is the real memory footprint, while RSS counts shared weights once
+per worker.
+
+Usage (from server/), with the server already running and warmed up:
+    python serve.py --workers 4 &
+    python -m benchmarks.bench_worker_memory --pid <launcher pid> [--output results.json]
+
+Compare against `uvicorn app:app --workers 4` by passing uvicorn's parent pid.
+"""
+
+import argparse
+import os
+import sys
+
+from benchmarks.report import emit
+
+FIELDS = {
+    "Rss": "rss_mb",
+    "Pss": "pss_mb",
+    "Shared_Clean": "shared_clean_mb",
+    "Shared_Dirty": "shared_dirty_mb",
+    "Private_Clean": "private_clean_mb",
+    "Private_Dirty": "private_dirty_mb",
+}
+
+
+def read_rollup(pid: int) -> dict:
+    """Memory fields of one process in MB."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in FIELDS:
+                values[FIELDS[name]] = round(int(rest.split()[0]) / 1024, 1)
+    return values
+
+
+def child_pids(pid: int) -> list:
+    """Direct children of a process."""
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return sorted(set(children))
+
+
+def run(pid: int) -> dict:
+    parent = read_rollup(pid)
+    workers = {}
+    for child in child_pids(pid):
+        try:
+            workers[child] = read_rollup(child)
+        except OSError:
+            # Exited between listing and reading (e.g. a restarting worker)
+            continue
+    total_pss = parent.get("pss_mb", 0) + sum(w.get("pss_mb", 0) for w in workers.values())
+    return {
+        "benchmark": "worker_memory",
+        "launcher_pid": pid,
+        "launcher": parent,
+        "workers": workers,
+        "worker_count": len(workers),
+        "total_pss_mb": round(total_pss, 1),
+        "pss_per_worker_mb": round(total_pss / len(workers), 1) if workers else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pid", type=int, required=True, help="Launcher (or uvicorn parent) process id")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    if not os.path.exists(f"/proc/{args.pid}/smaps_rollup"):
+        sys.exit("Needs Linux /proc/<pid>/smaps_rollup for the given pid")
+
+    report = run(args.pid)
+    emit(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Fake Gemini Server
+Minimal local stand-in for the Gemini REST API (`generateContent` and
+`streamGenerateContent?alt=sse`) with configurable latency, latency spikes and
+error rate, for exercising the client's deadlines, hedging and circuit
+breaker without calling Google.
+
+Usage (from server/):
+    python -m benchmarks.fake_gemini [--port 8089] [--latency-ms 300]
+        [--spike-rate 0.05] [--spike-ms 4000] [--error-rate 0.0] [--error-status 503]
+
+Then start the backend against it:
+    GEMINI_TRANSPORT=rest GEMINI_API_ENDPOINT=http://localhost:8089 python app.py
+
+GET /stats on the fake server returns its request and error counters.
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = (
+    "I'm really sorry you're going through this. What you're feeling makes sense, "
+    "and you don't have to handle it alone. Would you like to talk about what happened? 💙"
+)
+
+ROUTE = re.compile(r"^/v1(?:beta)?/models/[^/:]+:(generateContent|streamGenerateContent)")
+
+
+def candidate(text: str, finish: bool = True) -> dict:
+    """One generateContent response body."""
+    body = {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "index": 0,
+        }]
+    }
+    if finish:
+        body["candidates"][0]["finishReason"] = "STOP"
+        body["usageMetadata"] = {"promptTokenCount": 0, "candidatesTokenCount": len(REPLY.split())}
+    return body
+
+
+class FakeGemini(BaseHTTPRequestHandler):
+    """Request handler; behaviour comes from the server's `options`."""
+
+    protocol_version = "HTTP/1.1"
+    counters = {"requests": 0, "errors": 0, "spikes": 0}
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _count(self, name: str):
+        with self.lock:
+            self.counters[name] += 1
+
+    def _send_json(self, status: int, body: dict):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            with self.lock:
+                self._send_json(200, dict(self.counters))
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "not found"}})
+
+    def do_POST(self):
+        options = self.server.options
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        match = ROUTE.match(self.path)
+        if not match:
+            self._send_json(404, {"error": {"code": 404, "message": "not found"}})
+            return
+        self._count("requests")
+
+        delay = options.latency_ms
+        if random.random() < options.spike_rate:
+            self._count("spikes")
+            delay = options.spike_ms
+        time.sleep(delay / 1000)
+
+        if random.random() < options.error_rate:
+            self._count("errors")
+            self._send_json(options.error_status, {
+                "error": {"code": options.error_status, "message": "fake upstream error", "status": "UNAVAILABLE"}
+            })
+            return
+
+        if match.group(1) == "generateContent":
+            self._send_json(200, candidate(REPLY))
+            return
+
+        # Server-sent events, a few words per chunk
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        words = REPLY.split(" ")
+        for i in range(0, len(words), 4):
+            last = i + 4 >= len(words)
+            text = " ".join(words[i:i + 4]) + ("" if last else " ")
+            self.wfile.write(f"data: {json.dumps(candidate(text, finish=last))}\r\n\r\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(options.chunk_ms / 1000)
+        self.close_connection = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--spike-rate", type=float, default=0.0, help="Fraction of requests delayed by --spike-ms")
+    parser.add_argument("--spike-ms", type=float, default=4000)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--chunk-ms", type=float, default=40, help="Delay between streamed chunks")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), FakeGemini)
+    server.options = args
+    print(f"Fake Gemini listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
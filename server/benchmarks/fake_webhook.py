@@ -0,0 +1,95 @@
+"""
+Fake Alert Webhook
+Local stand-in for an alerting webhook: accepts the `{"events": [...]}`
+batches posted by the alert event bus, with configurable latency and error
+rate, so webhook delivery (batching, dropped events, sink errors) can be
+exercised without a real endpoint.
+
+Usage (from server/):
+    python -m benchmarks.fake_webhook [--port 8090] [--latency-ms 200] [--error-rate 0.0] [--print]
+
+Then start the backend against it:
+    ALERT_WEBHOOK_URL=http://localhost:8090/alerts python app.py
+
+GET /stats on the fake server returns its batch, event and error counters.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeWebhook(BaseHTTPRequestHandler):
+    """Request handler; behaviour comes from the server's `options`."""
+
+    protocol_version = "HTTP/1.1"
+    counters = {"batches": 0, "events": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            with self.lock:
+                self._send_json(200, dict(self.counters))
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        options = self.server.options
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            events = json.loads(self.rfile.read(length) or b"{}").get("events", [])
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+
+        time.sleep(options.latency_ms / 1000)
+        if random.random() < options.error_rate:
+            with self.lock:
+                self.counters["errors"] += 1
+            self._send_json(options.error_status, {"error": "injected failure"})
+            return
+
+        with self.lock:
+            self.counters["batches"] += 1
+            self.counters["events"] += len(events)
+        if options.print:
+            for event in events:
+                print(f"📨 {event.get('kind')} user={event.get('user_id')} severity={event.get('severity')}")
+        self._send_json(200, {"received": len(events)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--print", action="store_true", help="Print every received event")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), FakeWebhook)
+    server.options = args
+    print(f"Fake webhook listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+End-to-end Load Generator
+Drives a running backend with concurrent POSTs to /api/chat and
+/api/trigger-support built from the fixture corpus, one keep-alive
+connection per virtual user, and reports throughput, errors and
+p50/p95/p99 latency per endpoint and concurrency level.
+
+Run the backend against the fake Gemini server so the numbers measure this
+service rather than Google, with the per-client rate limits off (each virtual
+user would otherwise be throttled to RATE_LIMIT_PER_MIN, and all of them share
+one client address):
+
+    python -m benchmarks.fake_gemini --latency-ms 400 &
+    RATE_LIMIT_PER_MIN=0 RATE_LIMIT_IP_PER_MIN=0 GEMINI_TRANSPORT=rest GEMINI_API_ENDPOINT=http://localhost:8089 python app.py &
+
+Usage (from server/):
+    python -m benchmarks.load_test [--url http://localhost:8000]
+        [--endpoints chat trigger-support] [--concurrency 1 8 32]
+        [--duration 30] [--warmup 5] [--output results.json]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import urlsplit
+
+from benchmarks.report import emit, latency_summary, load_fixture
+
+
+class HttpConnection:
+    """Minimal HTTP/1.1 keep-alive client for JSON POSTs (stdlib only)."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def post(self, path: str, payload: dict) -> Tuple[int, bytes]:
+        """Send one POST and return (status, body); reconnects once if the connection was dropped."""
+        body = json.dumps(payload).encode("utf-8")
+        request = (
+            f"POST {path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        ).encode("ascii") + body
+        for attempt in range(2):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                self.writer.write(request)
+                await self.writer.drain()
+                return await self._read_response()
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self.close()
+                if attempt:
+                    raise
+
+    async def _read_response(self) -> Tuple[int, bytes]:
+        status_line = await self.reader.readuntil(b"\r\n")
+        if not status_line:
+            raise ConnectionError("connection closed")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                data = await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(data[:-2])
+            body = b"".join(chunks)
+        else:
+            body = await self.reader.readexactly(int(headers.get("content-length", 0)))
+
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, body
+
+
+def chat_payloads() -> List[Callable[[int], dict]]:
+    """Chat request bodies; user ids are suffixed per virtual user so histories stay independent."""
+    items = load_fixture("chat_messages.json")
+    return [
+        (lambda worker, item=item: {
+            "message": item["message"],
+            "user_id": f"{item.get('user_id', 'bench')}-w{worker}",
+            "enable_web": item.get("enable_web", False),
+        })
+        for item in items
+    ]
+
+
+def notification_payloads() -> List[Callable[[int], dict]]:
+    items = load_fixture("notification_messages.json")
+    return [(lambda worker, item=item: {"message": item["message"], "severity": item["severity"]}) for item in items]
+
+
+ENDPOINTS: Dict[str, Tuple[str, Callable[[], list]]] = {
+    "chat": ("/api/chat", chat_payloads),
+    "trigger-support": ("/api/trigger-support", notification_payloads),
+}
+
+
+async def run_level(host: str, port: int, path: str, payloads: list, concurrency: int, duration_s: float, warmup_s: float) -> dict:
+    """Closed-loop load at one concurrency level; only requests finished after the warm-up are measured."""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    measure_from = started + warmup_s
+    stop_at = measure_from + duration_s
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    errors: Counter = Counter()
+    counter = itertools.count()
+
+    async def user(worker: int):
+        conn = HttpConnection(host, port)
+        try:
+            while loop.time() < stop_at:
+                payload = payloads[next(counter) % len(payloads)](worker)
+                sent = time.perf_counter()
+                try:
+                    status, _ = await conn.post(path, payload)
+                except Exception as e:
+                    if loop.time() >= measure_from:
+                        errors[type(e).__name__] += 1
+                    await conn.close()
+                    continue
+                elapsed_ms = (time.perf_counter() - sent) * 1000
+                if loop.time() >= measure_from:
+                    statuses[status] += 1
+                    if 200 <= status < 300:
+                        latencies.append(elapsed_ms)
+        finally:
+            await conn.close()
+
+    await asyncio.gather(*(user(i) for i in range(concurrency)))
+    completed = sum(statuses.values())
+    ok = len(latencies)
+    return {
+        "concurrency": concurrency,
+        "duration_s": duration_s,
+        "requests": completed,
+        "ok": ok,
+        "throughput_rps": round(ok / duration_s, 2),
+        "error_rate": round(1 - ok / completed, 4) if completed else None,
+        "status_counts": {str(code): count for code, count in sorted(statuses.items())},
+        "client_errors": dict(errors),
+        "latency": latency_summary(latencies),
+    }
+
+
+async def run(url: str, endpoints: List[str], levels: List[int], duration_s: float, warmup_s: float) -> dict:
+    parts = urlsplit(url)
+    host, port = parts.hostname or "localhost", parts.port or 80
+    results = {}
+    for name in endpoints:
+        path, make_payloads = ENDPOINTS[name]
+        payloads = make_payloads()
+        results[name] = []
+        for concurrency in levels:
+            print(f"… {name} at concurrency {concurrency} for {duration_s}s")
+            results[name].append(await run_level(host, port, path, payloads, concurrency, duration_s, warmup_s))
+    return {
+        "benchmark": "load",
+        "url": url,
+        "duration_s": duration_s,
+        "warmup_s": warmup_s,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--endpoints", nargs="+", choices=sorted(ENDPOINTS), default=["chat", "trigger-support"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds before each level")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+    report = asyncio.run(run(args.url, args.endpoints, args.concurrency, args.duration, args.warmup))
+    emit(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark Reports
+Shared helpers for the benchmark scripts: latency percentiles, fixture
+loading, and JSON output stamped with the run's time, git revision and
+platform so results can be compared across runs.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import List, Optional, Sequence
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixture(name: str):
+    """Parsed JSON fixture from benchmarks/fixtures."""
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> Optional[float]:
+    """Nearest-rank q-th percentile of already sorted values."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(samples_ms: List[float]) -> dict:
+    """Count, mean and p50/p95/p99/max of latency samples in ms."""
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {"count": 0}
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 3),
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def git_revision() -> Optional[str]:
+    """Short commit hash of the working tree, or None outside git."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5, check=True
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def emit(report: dict, output: Optional[str] = None) -> str:
+    """Stamp the report with run metadata, print it, and write it to `output` if given."""
+    report = {
+        **report,
+        "run": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_rev": git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+    }
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text)
+    print(text)
+    return text
@@ -0,0 +1,107 @@
+"""
+Message Analysis
+Runs the emotion and harassment classifiers once per message and bundles the
+results, so logging, legal matching, alerting and keyword extraction all read
+the same values instead of re-running the models.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from models.batching import MicroBatcher
+
+# Score at or above which a message is treated as harassment by the chat flow
+HARASSMENT_THRESHOLD = 0.55
+
+
+@dataclass(frozen=True)
+class MessageAnalysis:
+    """Immutable classifier output for a single message."""
+
+    emotion: str
+    raw_emotion: str
+    emotion_confidence: float
+    harassment_score: float
+    harassment_label: str
+    keywords: Tuple[str, ...] = ()
+
+    @property
+    def is_harassment(self) -> bool:
+        """Whether the harassment score crosses the chat threshold."""
+        return self.harassment_score >= HARASSMENT_THRESHOLD
+
+    @property
+    def is_escalated(self) -> bool:
+        """Whether severity warrants legal matching and alerting (Medium/High)."""
+        return self.harassment_label.lower() in ("medium", "high")
+
+    @property
+    def emotion_label(self) -> str:
+        """Capitalized emotion, matching `EmotionModel.predict`."""
+        return self.emotion.capitalize()
+
+    @classmethod
+    def from_results(
+        cls,
+        emotion_result: Dict[str, any],
+        harassment_result: Dict[str, any],
+        keywords=()
+    ) -> "MessageAnalysis":
+        """Build an analysis from raw `detect` result dicts."""
+        score = float(harassment_result.get("score", 0.0))
+        return cls(
+            emotion=emotion_result.get("emotion", "neutral"),
+            raw_emotion=emotion_result.get("raw_emotion", "neutral"),
+            emotion_confidence=float(emotion_result.get("confidence", 0.0)),
+            harassment_score=score,
+            harassment_label=harassment_result.get("label", "Low"),
+            keywords=tuple(keywords),
+        )
+
+
+def analyze_message(text: str, emotion_model, harassment_model) -> MessageAnalysis:
+    """
+    Analyze a message with exactly one forward pass per model.
+
+    Args:
+        text: Message to analyze
+        emotion_model: Loaded EmotionModel
+        harassment_model: Loaded HarassmentModel
+
+    Returns:
+        MessageAnalysis shared by every downstream consumer
+    """
+    emotion_result = emotion_model.detect(text)
+    harassment_result = harassment_model.detect(text)
+    keywords = harassment_model.extract_keywords(text)
+    return MessageAnalysis.from_results(emotion_result, harassment_result, keywords)
+
+
+def analyze_messages(texts: List[str], emotion_model, harassment_model) -> List[MessageAnalysis]:
+    """Analyze several messages with one batched forward pass per model."""
+    emotion_results = emotion_model.detect_batch(texts)
+    harassment_results = harassment_model.detect_batch(texts)
+    return [
+        MessageAnalysis.from_results(emotion_result, harassment_result, harassment_model.extract_keywords(text))
+        for text, emotion_result, harassment_result in zip(texts, emotion_results, harassment_results)
+    ]
+
+
+async def analyze_message_batched(
+    text: str,
+    emotion_batcher: MicroBatcher,
+    harassment_batcher: MicroBatcher,
+    harassment_model
+) -> MessageAnalysis:
+    """
+    Analyze a message through the shared micro-batchers.
+
+    Both classifiers are queued together so concurrent requests share forward passes.
+    """
+    emotion_result, harassment_result = await asyncio.gather(
+        emotion_batcher.submit(text),
+        harassment_batcher.submit(text)
+    )
+    keywords = harassment_model.extract_keywords(text)
+    return MessageAnalysis.from_results(emotion_result, harassment_result, keywords)
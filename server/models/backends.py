@@ -0,0 +1,185 @@
+"""
+Inference Backends
+Selectable runtimes for the finetuned sequence classifiers: fp32 PyTorch,
+dynamically quantized int8 PyTorch, and ONNX Runtime (exported on first use).
+"""
+
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+import torch
+from transformers import AutoModelForSequenceClassification
+
+BACKENDS = ("torch", "torch-int8", "onnx")
+
+# INFERENCE_BACKEND picks the runtime for both classifiers
+DEFAULT_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+# Also quantize the exported ONNX graph to int8 weights
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "0") == "1"
+# Threads per ONNX Runtime session (0 = runtime default)
+ONNX_NUM_THREADS = int(os.getenv("ONNX_NUM_THREADS", 0))
+# Load checkpoints from memory-mapped safetensors without a random-init copy
+MODEL_MMAP_WEIGHTS = os.getenv("MODEL_MMAP_WEIGHTS", "0") == "1"
+
+
+def load_pretrained(model_dir: str):
+    """
+    from_pretrained for a finetuned classifier, in eval mode.
+
+    With MODEL_MMAP_WEIGHTS=1 the weights are read from model.safetensors (memory-mapped,
+    so pages are shared with other processes and loaded on demand), converting a .bin
+    checkpoint once on first load.
+    """
+    safetensors_path = os.path.join(model_dir, "model.safetensors")
+    if not MODEL_MMAP_WEIGHTS:
+        model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    elif os.path.exists(safetensors_path):
+        model = AutoModelForSequenceClassification.from_pretrained(
+            model_dir, use_safetensors=True, low_cpu_mem_usage=True
+        )
+    else:
+        model = AutoModelForSequenceClassification.from_pretrained(model_dir, low_cpu_mem_usage=True)
+        from safetensors.torch import save_model
+        tmp_path = f"{safetensors_path}.{os.getpid()}.tmp"
+        save_model(model, tmp_path, metadata={"format": "pt"})
+        os.replace(tmp_path, safetensors_path)
+        print(f"✅ Converted {os.path.basename(model_dir)} weights to {safetensors_path}")
+    model.eval()
+    return model
+
+
+class ClassifierBackend(ABC):
+    """Maps tokenizer output (PyTorch tensors) to a logits tensor."""
+
+    name = "base"
+    device = torch.device("cpu")
+
+    @abstractmethod
+    def __call__(self, inputs: Dict[str, torch.Tensor]) -> torch.Tensor:
+        """Logits for one padded batch."""
+
+
+class TorchBackend(ClassifierBackend):
+    """Full-precision PyTorch model (GPU when available)."""
+
+    name = "torch"
+
+    def __init__(self, model_dir: str):
+        self.model = load_pretrained(model_dir)
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.model.to(self.device)
+
+    def __call__(self, inputs: Dict[str, torch.Tensor]) -> torch.Tensor:
+        with torch.no_grad():
+            return self.model(**{name: tensor.to(self.device) for name, tensor in inputs.items()}).logits
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """PyTorch model with Linear layers dynamically quantized to int8 (CPU only)."""
+
+    name = "torch-int8"
+
+    def __init__(self, model_dir: str):
+        model = load_pretrained(model_dir)
+        self.model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.device = torch.device("cpu")
+
+
+class _LogitsOnly(torch.nn.Module):
+    """Export wrapper: positional inputs in tokenizer order -> logits."""
+
+    def __init__(self, model, input_names):
+        super().__init__()
+        self.model = model
+        self.input_names = input_names
+
+    def forward(self, *args):
+        return self.model(**dict(zip(self.input_names, args))).logits
+
+
+def export_onnx(model_dir: str, output_path: str, tokenizer, opset: int = 14) -> str:
+    """Export the classifier in model_dir to ONNX with dynamic batch and sequence axes."""
+    model = load_pretrained(model_dir)
+    sample = tokenizer(["onnx export sample"], return_tensors="pt")
+    input_names = list(sample.keys())
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    # Write next to the target and rename, so concurrent workers never load a partial file
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            _LogitsOnly(model, input_names),
+            tuple(sample[name] for name in input_names),
+            tmp_path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset
+        )
+    os.replace(tmp_path, output_path)
+    print(f"✅ Exported {os.path.basename(model_dir)} to {output_path}")
+    return output_path
+
+
+def _is_stale(path: str, model_dir: str) -> bool:
+    """Whether an exported graph is missing or older than the checkpoint it came from."""
+    if not os.path.exists(path):
+        return True
+    exported_at = os.path.getmtime(path)
+    return any(
+        os.path.getmtime(os.path.join(model_dir, name)) > exported_at
+        for name in os.listdir(model_dir)
+        if not name.endswith((".onnx", ".tmp"))
+    )
+
+
+class OnnxBackend(ClassifierBackend):
+    """ONNX Runtime CPU session over an exported (optionally int8) graph."""
+
+    name = "onnx"
+
+    def __init__(self, model_dir: str, tokenizer, quantize: bool = ONNX_QUANTIZE):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("INFERENCE_BACKEND=onnx requires the onnxruntime package") from e
+
+        path = os.path.join(model_dir, "model.onnx")
+        if _is_stale(path, model_dir):
+            export_onnx(model_dir, path, tokenizer)
+        if quantize:
+            quantized_path = os.path.join(model_dir, "model.int8.onnx")
+            if _is_stale(quantized_path, model_dir) or os.path.getmtime(quantized_path) < os.path.getmtime(path):
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+                tmp_path = f"{quantized_path}.{os.getpid()}.tmp"
+                quantize_dynamic(path, tmp_path, weight_type=QuantType.QInt8)
+                os.replace(tmp_path, quantized_path)
+            path = quantized_path
+            self.name = "onnx-int8"
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if ONNX_NUM_THREADS > 0:
+            options.intra_op_num_threads = ONNX_NUM_THREADS
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [node.name for node in self.session.get_inputs()]
+        self.path = path
+
+    def __call__(self, inputs: Dict[str, torch.Tensor]) -> torch.Tensor:
+        feed = {name: inputs[name].cpu().numpy() for name in self.input_names}
+        logits = self.session.run(["logits"], feed)[0]
+        return torch.from_numpy(logits)
+
+
+def load_backend(model_dir: str, tokenizer, backend: Optional[str] = None) -> ClassifierBackend:
+    """Build the requested backend (INFERENCE_BACKEND by default) for a finetuned classifier."""
+    backend = (backend or DEFAULT_BACKEND).lower()
+    if backend == "torch":
+        return TorchBackend(model_dir)
+    if backend == "torch-int8":
+        return QuantizedTorchBackend(model_dir)
+    if backend == "onnx":
+        return OnnxBackend(model_dir, tokenizer)
+    raise ValueError(f"Unknown INFERENCE_BACKEND: {backend} (expected one of {', '.join(BACKENDS)})")
@@ -0,0 +1,149 @@
+"""
+Micro-batching Scheduler
+Collects concurrent inference requests for a short window and runs them as one
+batched forward pass, fanning results back to each awaiting caller.
+"""
+
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Callable, List, Optional, Sequence
+
+
+class MicroBatcher:
+    """Coalesces concurrent `submit` calls into calls to a batch function."""
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        executor: Optional[Executor] = None,
+        name: str = "batcher"
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            batch_fn: Blocking function mapping a list of items to a list of results
+                      (e.g. `EmotionModel.detect_batch`)
+            max_batch_size: Maximum number of items per forward pass
+            max_wait_ms: How long to wait for more items after the first one arrives
+            executor: Executor used to run batch_fn (None = loop default executor)
+            name: Label used in log messages
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.0
+        self.executor = executor
+        self.name = name
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        # Counters for monitoring batch efficiency
+        self.batches_run = 0
+        self.items_processed = 0
+
+    @property
+    def average_batch_size(self) -> float:
+        """Mean number of items per forward pass so far."""
+        if not self.batches_run:
+            return 0.0
+        return self.items_processed / self.batches_run
+
+    @property
+    def queue_size(self) -> int:
+        """Items waiting for the next batch."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        """Start the background batching task on the running event loop."""
+        if self._worker is not None and not self._worker.done():
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task, failing any requests still queued."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError(f"{self.name} stopped"))
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result from the next batch."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def submit_many(self, items: Sequence[Any]) -> List[Any]:
+        """Queue several items at once; results are returned in input order."""
+        return list(await asyncio.gather(*(self.submit(item) for item in items)))
+
+    async def _collect(self) -> list:
+        """Wait for a first item, then gather more until the batch fills or the window closes."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Drain whatever is already queued without waiting
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        """Background loop: collect a batch, run one forward pass, resolve futures."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+
+            # Drop callers that gave up (e.g. client disconnected) before running
+            batch = [(item, future) for item, future in batch if not future.cancelled()]
+            if not batch:
+                continue
+
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.batch_fn, items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"{self.name}: batch function returned {len(results)} results for {len(items)} items"
+                    )
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError(f"{self.name} stopped"))
+                raise
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches_run += 1
+            self.items_processed += len(items)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
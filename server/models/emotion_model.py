@@ -3,9 +3,14 @@ Emotion Detection Model
 Uses j-hartmann/emotion-english-distilroberta-base for emotion classification.
 """
 
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from transformers import AutoTokenizer
 import torch
-from typing import Dict
+from typing import Dict, List, Optional
+
+from utils.keywords import KEYWORD_MATCHER
+from models.backends import load_backend
+from models.result_cache import create_result_cache
+from models.tokenization import TokenizationLayer, mean_probabilities
 
 
 class EmotionModel:
@@ -35,24 +40,24 @@ class EmotionModel:
         "neutral": "neutral"
     }
     
-    def __init__(self):
-        """Initialize the emotion detection model."""
+    def __init__(self, backend: Optional[str] = None):
+        """
+        Initialize the emotion detection model.
+
+        Args:
+            backend: "torch", "torch-int8" or "onnx" (defaults to INFERENCE_BACKEND)
+        """
         print(f"Loading emotion model: {self.MODEL_NAME}")
         
-        # Load tokenizer and model
+        # Load tokenizer and the selected inference runtime
         self.tokenizer = AutoTokenizer.from_pretrained(self.MODEL_NAME)
-        self.model = AutoModelForSequenceClassification.from_pretrained(
-            self.MODEL_NAME
-        )
+        self.backend = load_backend(self.MODEL_NAME, self.tokenizer, backend)
+        self.device = self.backend.device
+        self.tokenization = TokenizationLayer(self.tokenizer, name="emotion")
+        # Results for repeated messages (keyed by text hash + model version)
+        self.result_cache = create_result_cache("emotion", self.MODEL_NAME, self.backend.name)
         
-        # Set to evaluation mode
-        self.model.eval()
-        
-        # Use GPU if available, otherwise CPU
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.model.to(self.device)
-        
-        print(f"Emotion model loaded on {self.device}")
+        print(f"Emotion model loaded on {self.device} ({self.backend.name})")
     
     def detect(self, text: str) -> Dict[str, any]:
         """
@@ -64,39 +69,65 @@ class EmotionModel:
         Returns:
             Dictionary with 'emotion' and 'confidence' keys
         """
-        if not text or not text.strip():
-            return {
-                "emotion": "neutral",
-                "confidence": 0.0
-            }
+        return self.detect_batch([text])[0]
+
+    def detect_batch(self, texts: List[str]) -> List[Dict[str, any]]:
+        """
+        Detect emotion for several texts with a single forward pass.
+
+        Repeated messages are served from the result cache.
+
+        Args:
+            texts: Input texts to analyze
+
+        Returns:
+            One result dict per text, in input order (same shape as `detect`)
+        """
+        results: List[Optional[Dict[str, any]]] = [None] * len(texts)
+        pending = []
+        for i, text in enumerate(texts):
+            if not text or not text.strip():
+                results[i] = {
+                    "emotion": "neutral",
+                    "confidence": 0.0
+                }
+            else:
+                pending.append(i)
         
-        # Check for anxiety keywords (since model doesn't have anxiety label)
-        text_lower = text.lower()
-        anxiety_keywords = ["anxious", "anxiety", "worried", "worry", "nervous", "panic", "stressed", "stress"]
-        has_anxiety_keywords = any(keyword in text_lower for keyword in anxiety_keywords)
+        if not pending:
+            return results
         
-        # Tokenize input
-        inputs = self.tokenizer(
-            text,
-            return_tensors="pt",
-            truncation=True,
-            max_length=512,
-            padding=True
-        ).to(self.device)
+        pending_texts = [texts[i] for i in pending]
+        if self.result_cache is not None:
+            computed = self.result_cache.detect_batch(pending_texts, self._detect_uncached)
+        else:
+            computed = self._detect_uncached(pending_texts)
+        
+        for i, result in zip(pending, computed):
+            results[i] = result
+        return results
+
+    def _detect_uncached(self, texts: List[str]) -> List[Dict[str, any]]:
+        """Run the model on non-empty texts."""
+        # Cached token IDs and length-bucketed batches; texts over the model limit
+        # are split into overlapping windows whose probabilities are averaged
+        predictions = self.tokenization.predict(texts, self.backend, mean_probabilities)
         
-        # Get predictions
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
+        return [self._build_result(text, probs) for text, probs in zip(texts, predictions)]
+
+    def _build_result(self, text: str, probabilities) -> Dict[str, any]:
+        """Turn one row of softmax probabilities into a result dict."""
+        # Check for anxiety keywords (since model doesn't have anxiety label)
+        has_anxiety_keywords = KEYWORD_MATCHER.scan(text).any("anxiety")
         
-        top_prediction = torch.argmax(predictions, dim=-1).item()
+        top_prediction = torch.argmax(probabilities, dim=-1).item()
         
         # ✅ SAFETY PATCH (no behavior change)
         if top_prediction < len(self.EMOTION_LABELS):
-            confidence = predictions[0][top_prediction].item()
+            confidence = probabilities[top_prediction].item()
             detected_emotion_label = self.EMOTION_LABELS[top_prediction]
         else:
-            confidence = float(torch.max(predictions).item())
+            confidence = float(torch.max(probabilities).item())
             detected_emotion_label = "neutral"
         
         # Map to our emotion system
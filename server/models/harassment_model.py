@@ -3,9 +3,14 @@ Harassment/Toxicity Detection Model
 Uses unitary/toxic-bert for detecting toxic, harassing, or harmful content.
 """
 
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
-from typing import Dict, List, Tuple
+from transformers import AutoTokenizer
+from typing import Dict, List, Optional, Tuple
+
+from utils.keywords import KEYWORD_MATCHER
+from utils.severity import severity_for_score
+from models.backends import load_backend
+from models.result_cache import create_result_cache
+from models.tokenization import TokenizationLayer, max_column
 
 
 class HarassmentModel:
@@ -13,71 +18,80 @@ class HarassmentModel:
     
     MODEL_NAME = "./models/harassment_finetuned"
     
-    def __init__(self):
-        """Initialize the harassment detection model."""
+    def __init__(self, backend: Optional[str] = None):
+        """
+        Initialize the harassment detection model.
+
+        Args:
+            backend: "torch", "torch-int8" or "onnx" (defaults to INFERENCE_BACKEND)
+        """
         print(f"Loading harassment model: {self.MODEL_NAME}")
         
-        # Load tokenizer and model
+        # Load tokenizer and the selected inference runtime
         self.tokenizer = AutoTokenizer.from_pretrained(self.MODEL_NAME)
-        self.model = AutoModelForSequenceClassification.from_pretrained(
-            self.MODEL_NAME
-        )
-        
-        # Set to evaluation mode
-        self.model.eval()
-        
-        # Use GPU if available, otherwise CPU
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.model.to(self.device)
-        
-        # Enhanced keyword list for better detection
-        self._harassment_keywords = [
-            "abuse", "abusive", "threat", "threaten", "harass", "harassment",
-            "violence", "stalk", "stalking", "blackmail", "insult", "touch",
-            "sex", "sexual", "explicit", "remarks", "favour", "woman", "modesty",
-            "unwanted", "coworker", "colleague", "stop", "intimidat", "forced"
-        ]
+        self.backend = load_backend(self.MODEL_NAME, self.tokenizer, backend)
+        self.device = self.backend.device
+        self.tokenization = TokenizationLayer(self.tokenizer, name="harassment")
+        # Results for repeated messages (keyed by text hash + model version)
+        self.result_cache = create_result_cache("harassment", self.MODEL_NAME, self.backend.name)
         
-        print(f"Harassment model loaded on {self.device}")
+        print(f"Harassment model loaded on {self.device} ({self.backend.name})")
     
     def detect(self, text: str) -> Dict[str, any]:
         """
         Detect harassment/toxicity in text.
         Returns a probability score (0..1) and boolean flag using threshold 0.6.
         """
-        if not text or not text.strip():
-            return {
-                "score": 0.0,
-                "is_harassment": False
-            }
-        
-        inputs = self.tokenizer(
-            text,
-            return_tensors="pt",
-            truncation=True,
-            max_length=512,
-            padding=True
-        ).to(self.device)
+        return self.detect_batch([text])[0]
+
+    def detect_batch(self, texts: List[str]) -> List[Dict[str, any]]:
+        """
+        Detect harassment/toxicity for several texts with a single forward pass.
+        Repeated messages are served from the result cache; results keep input order.
+        """
+        results: List[Optional[Dict[str, any]]] = [None] * len(texts)
+        pending = []
+        for i, text in enumerate(texts):
+            if not text or not text.strip():
+                results[i] = {
+                    "score": 0.0,
+                    "is_harassment": False
+                }
+            else:
+                pending.append(i)
+        
+        if not pending:
+            return results
+        
+        pending_texts = [texts[i] for i in pending]
+        if self.result_cache is not None:
+            computed = self.result_cache.detect_batch(pending_texts, self._detect_uncached)
+        else:
+            computed = self._detect_uncached(pending_texts)
         
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
+        for i, result in zip(pending, computed):
+            results[i] = result
+        return results
+
+    def _detect_uncached(self, texts: List[str]) -> List[Dict[str, any]]:
+        """Run the model on non-empty texts."""
+        # Cached token IDs and length-bucketed batches; texts over the model limit
+        # are split into overlapping windows and the most toxic window is kept
+        predictions = self.tokenization.predict(texts, self.backend, max_column(1))
         
+        return [self._build_result(text, probs) for text, probs in zip(texts, predictions)]
+
+    def _build_result(self, text: str, probabilities) -> Dict[str, any]:
+        """Turn one row of softmax probabilities into a result dict."""
         # ✅ SAFETY PATCH (no behavior change)
-        if predictions.shape[1] > 1:
-            toxic_score = predictions[0][1].item()
+        if probabilities.shape[0] > 1:
+            toxic_score = probabilities[1].item()
         else:
-            toxic_score = predictions[0][0].item()
+            toxic_score = probabilities[0].item()
         
-        # Add rule-based heuristic boost for explicit keywords
-        text_lower = text.lower()
-        explicit_keywords = [
-            "sex", "sexual", "harass", "harassment", "molest",
-            "explicit", "rape", "stalking", "abuse", "inappropriate", "touch"
-        ]
-        
-        # If any keyword appears, increase the score baseline
-        if any(word in text_lower for word in explicit_keywords):
+        # Add rule-based heuristic boost for explicit keywords:
+        # if any keyword appears, increase the score baseline
+        if KEYWORD_MATCHER.scan(text).any("explicit"):
             toxic_score = max(toxic_score, 0.75)
         
         is_harassment = toxic_score > 0.6
@@ -85,21 +99,29 @@ class HarassmentModel:
         return {
             "score": float(toxic_score),
             "is_harassment": is_harassment,
-            "label": "Low" if toxic_score < 0.3 else ("Medium" if toxic_score < 0.6 else "High")
+            "label": self.severity_label(toxic_score)
         }
 
+    @staticmethod
+    def severity_label(score: float) -> str:
+        """Map a harassment score to its Low/Medium/High severity label."""
+        return severity_for_score(score)
+
+    def extract_keywords(self, text: str) -> List[str]:
+        """Return the harassment keywords found in text, in table order, without duplicates."""
+        return KEYWORD_MATCHER.scan(text).matches("harassment")
+
     
-    def detect_with_keywords(self, text: str) -> dict:
-        """Enhanced detection with keyword fallback for obvious cases."""
-        model_result = self.detect(text)
-        
-        strong_harassment_keywords = [
-            'sexual', 'explicit', 'harass', 'unwanted', 'coworker', 
-            'stop', 'stalking', 'threat', 'intimidat', 'abuse', 'forced'
-        ]
+    def detect_with_keywords(self, text: str, model_result: Optional[dict] = None) -> dict:
+        """
+        Enhanced detection with keyword fallback for obvious cases.
+
+        Pass a previous `detect` result as model_result to skip the forward pass.
+        """
+        if model_result is None:
+            model_result = self.detect(text)
         
-        message_lower = text.lower()
-        keyword_matches = [kw for kw in strong_harassment_keywords if kw in message_lower]
+        keyword_matches = KEYWORD_MATCHER.scan(text).matches("strong_harassment")
         
         if keyword_matches and model_result["score"] < 0.5:
             return {
@@ -110,26 +132,12 @@ class HarassmentModel:
         
         return model_result
     
-    def analyze(self, text: str) -> Tuple[str, List[str]]:
+    def analyze(self, text: str, detection_result: Optional[dict] = None) -> Tuple[str, List[str]]:
         """
         Analyze the text and return (severity_level, keywords).
+
+        Pass a previous `detect` result as detection_result to skip the forward pass.
         """
-        detection_result = self.detect_with_keywords(text)
-        score = detection_result["score"]
-        
-        if score < 0.3:
-            level = "Low"
-        elif score < 0.6:
-            level = "Medium"
-        else:
-            level = "High"
-        
-        text_lower = (text or "").lower()
-        keywords: List[str] = []
-        for w in self._harassment_keywords:
-            if w in text_lower:
-                keywords.append(w)
-        
-        seen = set()
-        keywords = [k for k in keywords if not (k in seen or seen.add(k))]
-        return level, keywords
+        detection_result = self.detect_with_keywords(text, detection_result)
+        level = self.severity_label(detection_result["score"])
+        return level, self.extract_keywords(text)
@@ -0,0 +1,232 @@
+"""
+Classifier Result Cache
+Caches detect() result dicts keyed by a hash of the normalized message and the
+model version, in memory (LRU) and optionally in a shared SQLite file.
+Only hashes and result dicts are stored - never the message text.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from typing import Callable, Dict, List, Optional, Sequence
+
+from utils.cache import LRUCache
+
+CLASSIFIER_CACHE_SIZE = int(os.getenv("CLASSIFIER_CACHE_SIZE", 10000))
+CLASSIFIER_CACHE_TTL_S = float(os.getenv("CLASSIFIER_CACHE_TTL_S", 3600))
+# SQLite path for the shared tier (empty = memory only)
+CLASSIFIER_CACHE_DISK = os.getenv("CLASSIFIER_CACHE_DISK", "")
+# Mixed into every key so hashes cannot be matched against guessed messages
+CLASSIFIER_CACHE_SALT = os.getenv("CLASSIFIER_CACHE_SALT", "")
+# How often the model directory is re-checked for changes
+MODEL_CHECK_INTERVAL_S = 30.0
+
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalized text with collapsed whitespace (case is kept; the models are cased)."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def model_fingerprint(model_dir: str) -> str:
+    """Short hash of the files (name, size, mtime) in a model directory."""
+    digest = hashlib.sha256()
+    try:
+        for name in sorted(os.listdir(model_dir)):
+            if name.endswith(".tmp"):
+                continue
+            stat = os.stat(os.path.join(model_dir, name))
+            digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode("utf-8"))
+    except OSError:
+        digest.update(b"missing")
+    return digest.hexdigest()[:16]
+
+
+class _DiskTier:
+    """SQLite table of key hash -> result JSON, shared by the workers on one host."""
+
+    def __init__(self, path: str, ttl_s: float):
+        self.path = path
+        self.ttl_s = ttl_s
+        # Models are built before serve.py forks its workers; SQLite connections must not
+        # cross fork, so each process opens its own on first use
+        self._conn_obj: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """This process's connection (call with the lock held)."""
+        if self._conn_obj is None or self._conn_pid != os.getpid():
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=1.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS classifier_cache ("
+                "key TEXT PRIMARY KEY, version TEXT NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn_obj, self._conn_pid = conn, os.getpid()
+        return self._conn_obj
+
+    def close(self):
+        """Close this process's connection; the next call reopens it."""
+        with self._lock:
+            if self._conn_obj is not None and self._conn_pid == os.getpid():
+                self._conn_obj.close()
+            self._conn_obj = None
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM classifier_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_s:
+            return None
+        return json.loads(row[0])
+
+    def put(self, key: str, version: str, value: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO classifier_cache (key, version, value, created_at) VALUES (?, ?, ?, ?)",
+                (key, version, json.dumps(value), time.time())
+            )
+
+    def purge(self, namespace_version_prefix: str, keep_version: str) -> int:
+        """Delete expired rows and rows written by other versions of this model."""
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM classifier_cache WHERE (version LIKE ? AND version != ?) OR created_at < ?",
+                (namespace_version_prefix + "%", keep_version, time.time() - self.ttl_s)
+            )
+            return cur.rowcount
+
+
+class ClassifierResultCache:
+    """Per-model cache of detect results with hit/miss counters."""
+
+    def __init__(
+        self,
+        namespace: str,
+        model_dir: str,
+        variant: str = "",
+        max_entries: int = CLASSIFIER_CACHE_SIZE,
+        ttl_s: float = CLASSIFIER_CACHE_TTL_S,
+        disk_path: str = CLASSIFIER_CACHE_DISK
+    ):
+        """
+        Args:
+            namespace: Model name used in keys ("emotion", "harassment")
+            model_dir: Directory of the loaded checkpoint (its fingerprint at load time versions the keys)
+            variant: Extra version component, e.g. the inference backend
+            max_entries: In-memory LRU size
+            ttl_s: Seconds a result stays valid
+            disk_path: SQLite file for the shared tier ("" = memory only)
+        """
+        self.namespace = namespace
+        self.model_dir = model_dir
+        self.variant = variant
+        self.memory = LRUCache(max_entries=max_entries, ttl_s=ttl_s)
+        self._fingerprint = model_fingerprint(model_dir)
+        self._last_check = time.monotonic()
+        # Set once the files on disk no longer match the loaded model
+        self._stale = False
+        self.disk_hits = 0
+
+        self.disk: Optional[_DiskTier] = None
+        if disk_path:
+            try:
+                self.disk = _DiskTier(disk_path, ttl_s)
+                self.disk.purge(f"{namespace}:", self.version)
+                # Don't hold a connection open in a process that may fork workers
+                self.disk.close()
+            except Exception as e:
+                print(f"⚠️  Classifier disk cache unavailable ({e}); using memory only")
+                self.disk = None
+
+    @property
+    def version(self) -> str:
+        return f"{self.namespace}:{self._fingerprint}:{self.variant}"
+
+    def _check_model_dir(self):
+        """
+        Warn once if the model directory changed on disk. The loaded weights do
+        not change until restart, so the key version is kept until then.
+        """
+        if self._stale:
+            return
+        now = time.monotonic()
+        if now - self._last_check < MODEL_CHECK_INTERVAL_S:
+            return
+        self._last_check = now
+        if model_fingerprint(self.model_dir) != self._fingerprint:
+            self._stale = True
+            print(
+                f"⚠️  {self.namespace} model directory changed on disk; the loaded model and its cached "
+                f"results stay in use until the server restarts"
+            )
+
+    def key(self, text: str) -> str:
+        payload = f"{CLASSIFIER_CACHE_SALT}\0{self.version}\0{normalize_text(text)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[dict]:
+        return self._get(self.key(text))
+
+    def put(self, text: str, value: dict):
+        self._put(self.key(text), value)
+
+    def _get(self, key: str) -> Optional[dict]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            try:
+                value = self.disk.get(key)
+            except sqlite3.Error:
+                value = None
+            if value is not None:
+                self.disk_hits += 1
+                self.memory.put(key, value)
+        return dict(value) if value is not None else None
+
+    def _put(self, key: str, value: dict):
+        self.memory.put(key, dict(value))
+        if self.disk is not None:
+            try:
+                self.disk.put(key, self.version, value)
+            except sqlite3.Error as e:
+                print(f"⚠️  Classifier disk cache write failed: {e}")
+
+    def detect_batch(self, texts: Sequence[str], compute: Callable[[List[str]], List[Dict[str, any]]]) -> List[Dict[str, any]]:
+        """Results for texts, running compute only on the uncached ones (duplicates computed once)."""
+        self._check_model_dir()
+        keys = [self.key(text) for text in texts]
+        results: List[Optional[dict]] = [self._get(key) for key in keys]
+        # key -> (first text, positions waiting for it)
+        missing: Dict[str, tuple] = {}
+        for i, result in enumerate(results):
+            if result is None:
+                missing.setdefault(keys[i], (texts[i], []))[1].append(i)
+        if missing:
+            pending = list(missing.items())
+            computed = compute([text for _, (text, _) in pending])
+            for (key, (_, positions)), result in zip(pending, computed):
+                self._put(key, result)
+                for i in positions:
+                    results[i] = dict(result)
+        return results
+
+    def stats(self) -> dict:
+        return {
+            **self.memory.stats(),
+            "disk_hits": self.disk_hits,
+            "model_changed_on_disk": self._stale,
+            "version": self.version,
+        }
+
+
+def create_result_cache(namespace: str, model_dir: str, variant: str = "") -> Optional[ClassifierResultCache]:
+    """Cache configured from the environment, or None when CLASSIFIER_CACHE_SIZE is 0."""
+    if CLASSIFIER_CACHE_SIZE <= 0:
+        return None
+    return ClassifierResultCache(namespace, model_dir, variant)
@@ -0,0 +1,165 @@
+"""
+Length-aware Tokenization
+Caches token IDs per message, groups batch rows into length buckets so short
+chat messages are not padded to the longest one, and splits texts longer than
+the model limit into overlapping windows whose scores are aggregated per text.
+"""
+
+import os
+import threading
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import torch
+
+from utils.cache import LRUCache
+from utils.metrics import span
+
+TOKENIZER_CACHE_SIZE = int(os.getenv("TOKENIZER_CACHE_SIZE", 4096))
+# Tokens shared by consecutive windows of a long text
+TOKENIZER_STRIDE = int(os.getenv("TOKENIZER_STRIDE", 128))
+# Max windows scored per text (the first window plus the last ones)
+TOKENIZER_MAX_CHUNKS = int(os.getenv("TOKENIZER_MAX_CHUNKS", 8))
+TOKENIZER_PAD_MULTIPLE = int(os.getenv("TOKENIZER_PAD_MULTIPLE", 8))
+
+
+def mean_probabilities(probs: torch.Tensor) -> torch.Tensor:
+    """Aggregate window probabilities [windows, labels] by averaging."""
+    return probs.mean(dim=0)
+
+
+def max_column(column: int) -> Callable[[torch.Tensor], torch.Tensor]:
+    """Aggregate by taking the window with the highest probability in `column`."""
+    def reduce(probs: torch.Tensor) -> torch.Tensor:
+        col = column if probs.shape[1] > column else 0
+        return probs[probs[:, col].argmax()]
+    return reduce
+
+
+class TokenizationLayer:
+    """Wraps a Hugging Face tokenizer for batched, chunked classification."""
+
+    def __init__(
+        self,
+        tokenizer,
+        max_length: int = 512,
+        stride: int = TOKENIZER_STRIDE,
+        max_chunks: int = TOKENIZER_MAX_CHUNKS,
+        pad_to_multiple_of: int = TOKENIZER_PAD_MULTIPLE,
+        cache_size: int = TOKENIZER_CACHE_SIZE,
+        name: str = "model"
+    ):
+        """
+        Args:
+            tokenizer: Hugging Face tokenizer of the model
+            max_length: Model input limit including special tokens
+            stride: Overlap in tokens between consecutive windows
+            max_chunks: Cap on windows per text (keeps the head and the tail)
+            pad_to_multiple_of: Padded lengths are rounded up to this multiple
+            cache_size: Messages whose token IDs are cached
+            name: Model label on the tokenize/forward spans
+        """
+        self.tokenizer = tokenizer
+        self.name = name
+        self.max_length = max_length
+        self.window = max_length - tokenizer.num_special_tokens_to_add(pair=False)
+        self.stride = min(max(stride, 0), self.window // 2)
+        self.max_chunks = max(max_chunks, 1)
+        self.pad_to_multiple_of = max(pad_to_multiple_of, 1)
+        self.pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else 0
+        self.with_token_types = "token_type_ids" in tokenizer.model_input_names
+        self.cache = LRUCache(max_entries=cache_size)
+        # Fast tokenizers are not safe to call from several threads at once
+        self._lock = threading.Lock()
+
+        self.chunked_texts = 0
+
+    def token_ids(self, text: str) -> Tuple[int, ...]:
+        """Token IDs of the full text (no special tokens, no truncation), cached per text."""
+        ids = self.cache.get(text)
+        if ids is None:
+            with self._lock:
+                ids = tuple(self.tokenizer(text, add_special_tokens=False, truncation=False, verbose=False)["input_ids"])
+            self.cache.put(text, ids)
+        return ids
+
+    def chunks(self, text: str) -> List[List[int]]:
+        """Model-ready windows (special tokens included) covering the text."""
+        ids = self.token_ids(text)
+        if len(ids) <= self.window:
+            return [self.tokenizer.build_inputs_with_special_tokens(list(ids))]
+
+        step = self.window - self.stride
+        starts = list(range(0, len(ids) - self.stride, step))
+        if starts[-1] + self.window < len(ids):
+            starts.append(len(ids) - self.window)
+        if len(starts) > self.max_chunks:
+            # Keep the opening and the most recent part of long threads
+            starts = starts[:1] + starts[-(self.max_chunks - 1):] if self.max_chunks > 1 else starts[:1]
+        self.chunked_texts += 1
+        return [self.tokenizer.build_inputs_with_special_tokens(list(ids[s:s + self.window])) for s in starts]
+
+    def _bucket(self, length: int) -> int:
+        """Power-of-two length bucket, so rows of similar length share a forward pass."""
+        bucket = self.pad_to_multiple_of
+        while bucket < length:
+            bucket *= 2
+        return min(bucket, self.max_length)
+
+    def _pad(self, rows: List[List[int]]) -> Dict[str, torch.Tensor]:
+        longest = max(len(row) for row in rows)
+        length = -(-longest // self.pad_to_multiple_of) * self.pad_to_multiple_of
+        input_ids = torch.full((len(rows), length), self.pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(rows), length), dtype=torch.long)
+        for i, row in enumerate(rows):
+            input_ids[i, :len(row)] = torch.tensor(row, dtype=torch.long)
+            attention_mask[i, :len(row)] = 1
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if self.with_token_types:
+            inputs["token_type_ids"] = torch.zeros_like(input_ids)
+        return inputs
+
+    def predict(
+        self,
+        texts: Sequence[str],
+        forward: Callable[[Dict[str, torch.Tensor]], torch.Tensor],
+        reduce: Callable[[torch.Tensor], torch.Tensor] = mean_probabilities
+    ) -> List[torch.Tensor]:
+        """
+        Softmax probabilities per text.
+
+        Rows (one per window) are grouped by length bucket and each group runs
+        as one forward pass; windows of the same text are combined with reduce.
+        """
+        rows: List[List[int]] = []
+        owners: List[int] = []
+        with span("tokenize", model=self.name):
+            for i, text in enumerate(texts):
+                for chunk in self.chunks(text):
+                    rows.append(chunk)
+                    owners.append(i)
+
+            buckets: Dict[int, List[int]] = {}
+            for r, row in enumerate(rows):
+                buckets.setdefault(self._bucket(len(row)), []).append(r)
+            padded = [(members, self._pad([rows[r] for r in members])) for members in buckets.values()]
+
+        probs: List[torch.Tensor] = [None] * len(rows)
+        for members, inputs in padded:
+            with span("forward", model=self.name):
+                logits = forward(inputs)
+                # .cpu() waits for the device, so the span covers the whole pass
+                group_probs = torch.nn.functional.softmax(logits.float(), dim=-1).cpu()
+            for r, p in zip(members, group_probs):
+                probs[r] = p
+
+        per_text: List[List[torch.Tensor]] = [[] for _ in texts]
+        for r, owner in enumerate(owners):
+            per_text[owner].append(probs[r])
+        return [
+            windows[0] if len(windows) == 1 else reduce(torch.stack(windows))
+            for windows in per_text
+        ]
+
+    def stats(self) -> dict:
+        """Token cache counters and how many texts needed more than one window."""
+        return {**self.cache.stats(), "chunked_texts": self.chunked_texts}
@@ -0,0 +1,142 @@
+"""
+EmpathAI Production Launcher
+Loads both classifiers once in a parent process, then forks uvicorn workers
+that share the model weights copy-on-write and accept connections on one
+listening socket. Workers that exit unexpectedly are restarted; SIGTERM or
+SIGINT stops every worker.
+
+Linux/macOS only (needs os.fork). CPU inference only: CUDA cannot be used
+across fork, so run GPU hosts with --no-preload or a single worker.
+
+Usage (from server/):
+    python serve.py [--workers 4] [--host 0.0.0.0] [--port 8000] [--no-preload]
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+import uvicorn
+
+# Minimum seconds between restarts of a crashed worker, so a crash loop does not spin
+RESTART_BACKOFF_S = 1.0
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Listening socket created before forking and shared by every worker."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, log_level: str):
+    """Serve the app on the shared socket until uvicorn exits (runs in the child)."""
+    # uvicorn installs its own SIGINT/SIGTERM handlers for a graceful shutdown
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    config = uvicorn.Config(app, log_level=log_level, lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def spawn_worker(app, sock: socket.socket, log_level: str, worker_id: int) -> int:
+    """Fork one worker and return its pid. `worker_id` is the stable slot a restart reuses."""
+    pid = os.fork()
+    if pid == 0:
+        # Names this worker's log segments and stats snapshot (see HarassmentLogger)
+        os.environ["WORKER_ID"] = str(worker_id)
+        code = 0
+        try:
+            run_worker(app, sock, log_level)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+    print(f"👷 Started worker {worker_id} (pid {pid})")
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", 2)))
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument(
+        "--no-preload", action="store_true",
+        help="Let each worker load its own models (no weight sharing)"
+    )
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs os.fork; use `uvicorn app:app` on this platform")
+
+    # Fast tokenizers' thread pool does not survive fork
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+    import app as app_module
+
+    if not args.no_preload:
+        started = time.perf_counter()
+        models = app_module.preload_models()
+        if any(model.device.type != "cpu" for model in models):
+            sys.exit("Models were loaded on a GPU, which cannot be shared across fork; use --no-preload")
+        print(f"✅ Preloaded models in {round((time.perf_counter() - started) * 1000)} ms")
+
+    # Move everything allocated so far out of the collector's generations, so GC
+    # passes in the workers never write to (and so copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+    sock = bind_socket(args.host, args.port)
+    print(f"🚀 Serving on {args.host}:{args.port} with {args.workers} workers (launcher pid {os.getpid()})")
+
+    # pid -> worker slot
+    workers = {spawn_worker(app_module.app, sock, args.log_level, slot): slot for slot in range(args.workers)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    last_restart = 0.0
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = workers.pop(pid, None)
+        if stopping or slot is None:
+            continue
+        print(f"⚠️ Worker {slot} (pid {pid}) exited ({os.waitstatus_to_exitcode(status)}); restarting")
+        wait = RESTART_BACKOFF_S - (time.monotonic() - last_restart)
+        if wait > 0:
+            time.sleep(wait)
+        last_restart = time.monotonic()
+        workers[spawn_worker(app_module.app, sock, args.log_level, slot)] = slot
+
+    sock.close()
+    print("👋 All workers stopped")
+
+
+if __name__ == "__main__":
+    main()
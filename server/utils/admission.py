@@ -0,0 +1,230 @@
+"""
+Rate Limiting and Admission Control
+Per-client token buckets for the expensive endpoints, plus a global admission
+controller that caps in-flight Gemini calls and queued classifier work. When
+the server is saturated, work is shed instead of queued: Gemini steps degrade
+to local fallback text, or the request is rejected with a Retry-After.
+"""
+
+import os
+import time
+import ipaddress
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple, Union
+
+from utils.cache import LRUCache
+from utils.metrics import REGISTRY
+
+RATE_LIMITED = REGISTRY.counter("empathai_rate_limited_total", "Requests rejected by the per-client rate limiter")
+SHED = REGISTRY.counter("empathai_shed_total", "Work shed by admission control, by reason and action")
+
+SHED_MODES = ("fallback", "reject")
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `burst`."""
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+
+
+class RateLimiter:
+    """Token bucket per key (user ID or client address); idle keys are evicted LRU."""
+
+    def __init__(self, rate_per_min: float, burst: int, max_keys: int = 100000):
+        """
+        Args:
+            rate_per_min: Sustained requests per minute per key (0 disables limiting)
+            burst: Requests a fresh or idle key may make back to back
+            max_keys: Buckets kept before the least recently used is dropped
+        """
+        self.rate = rate_per_min / 60
+        self.burst = max(1, burst)
+        self.buckets = LRUCache(max_entries=max_keys)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def allow(self, key: str, cost: float = 1.0) -> Tuple[bool, float]:
+        """
+        Take `cost` tokens for `key`. Returns (allowed, seconds until enough tokens refill).
+
+        A cost above the burst (a large batch) is admitted from a full bucket and
+        leaves it in debt, so the key waits until the whole cost has refilled.
+        """
+        if not self.enabled:
+            return True, 0.0
+        needed = min(cost, self.burst)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self.burst, now)
+                self.buckets.put(key, bucket)
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+            if bucket.tokens >= needed:
+                bucket.tokens -= cost
+                return True, 0.0
+            return False, (needed - bucket.tokens) / self.rate
+
+    def refund(self, key: str, cost: float = 1.0):
+        """Return tokens taken by `allow` for a request that was refused by a later check."""
+        if not self.enabled:
+            return
+        with self._lock:
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.tokens = min(self.burst, bucket.tokens + cost)
+
+
+class AdmissionController:
+    """Global caps on concurrent Gemini calls and queued inference, with a shedding policy."""
+
+    def __init__(self, max_llm_in_flight: int, max_inference_queue: int, shed_mode: str = "fallback"):
+        """
+        Args:
+            max_llm_in_flight: Gemini calls allowed at once; further calls are shed (0 = unlimited)
+            max_inference_queue: Queued classifier inputs beyond which new requests are shed (0 = unlimited)
+            shed_mode: "fallback" answers with local fallback text, "reject" returns 503 + Retry-After
+        """
+        if shed_mode not in SHED_MODES:
+            print(f"⚠️ Unknown ADMISSION_SHED_MODE '{shed_mode}', using 'fallback'")
+            shed_mode = "fallback"
+        self.max_llm_in_flight = max_llm_in_flight
+        self.max_inference_queue = max_inference_queue
+        self.shed_mode = shed_mode
+        self.llm_in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def rejects(self) -> bool:
+        return self.shed_mode == "reject"
+
+    def llm_saturated(self) -> bool:
+        return 0 < self.max_llm_in_flight <= self.llm_in_flight
+
+    def inference_overloaded(self, queued: int) -> bool:
+        return 0 < self.max_inference_queue <= queued
+
+    def try_acquire_llm(self) -> bool:
+        """Claim a Gemini slot without waiting."""
+        with self._lock:
+            if self.llm_saturated():
+                return False
+            self.llm_in_flight += 1
+            return True
+
+    def release_llm(self):
+        with self._lock:
+            self.llm_in_flight -= 1
+
+    @contextmanager
+    def llm_slot(self, endpoint: str) -> Iterator[bool]:
+        """Yields whether a Gemini slot was granted; shed calls are counted and must use a fallback."""
+        admitted = self.try_acquire_llm()
+        if not admitted:
+            SHED.inc(endpoint=endpoint, reason="llm_in_flight", action="fallback")
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self.release_llm()
+
+    def stats(self) -> dict:
+        return {
+            "shed_mode": self.shed_mode,
+            "llm_in_flight": self.llm_in_flight,
+            "max_llm_in_flight": self.max_llm_in_flight,
+            "max_inference_queue": self.max_inference_queue,
+        }
+
+
+def create_rate_limiter() -> RateLimiter:
+    return RateLimiter(
+        rate_per_min=float(os.getenv("RATE_LIMIT_PER_MIN", 30)),
+        burst=int(os.getenv("RATE_LIMIT_BURST", 10)),
+    )
+
+
+def create_address_rate_limiter() -> RateLimiter:
+    """Opt-in per client address limiter, so rotating user IDs cannot bypass the per-user limit."""
+    return RateLimiter(
+        rate_per_min=float(os.getenv("RATE_LIMIT_IP_PER_MIN", 0)),
+        burst=int(os.getenv("RATE_LIMIT_IP_BURST", 40)),
+    )
+
+
+def create_batch_rate_limiter() -> RateLimiter:
+    """Per-client limiter for the batch endpoints, charged per item and kept apart from the chat buckets."""
+    return RateLimiter(
+        rate_per_min=float(os.getenv("RATE_LIMIT_BATCH_PER_MIN", 600)),
+        burst=int(os.getenv("RATE_LIMIT_BATCH_BURST", 256)),
+    )
+
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def parse_trusted_proxies(value: str) -> List[Network]:
+    """Parse a comma-separated list of proxy addresses or CIDR ranges."""
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in value.split(",") if part.strip()]
+
+
+TRUSTED_PROXIES = parse_trusted_proxies(os.getenv("TRUSTED_PROXIES", ""))
+
+
+def _is_trusted(address: str, trusted: List[Network]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted)
+
+
+def client_address(
+    peer: Optional[str],
+    forwarded_for: Optional[str] = None,
+    real_ip: Optional[str] = None,
+    trusted: Optional[List[Network]] = None,
+) -> str:
+    """
+    Address of the client behind any trusted proxies.
+
+    X-Forwarded-For and X-Real-IP are only believed when the connecting peer is
+    a trusted proxy; otherwise a client could pick its own rate limit key. The
+    forwarded chain is read right to left and the first untrusted hop wins.
+    """
+    trusted = TRUSTED_PROXIES if trusted is None else trusted
+    peer = peer or "unknown"
+    if not trusted or not _is_trusted(peer, trusted):
+        return peer
+    if forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if not _is_trusted(hop, trusted):
+                return hop
+        if hops:
+            return hops[0]
+    if real_ip and real_ip.strip():
+        return real_ip.strip()
+    return peer
+
+
+def create_admission_controller() -> AdmissionController:
+    return AdmissionController(
+        max_llm_in_flight=int(os.getenv("ADMISSION_MAX_LLM_IN_FLIGHT", 32)),
+        max_inference_queue=int(os.getenv("ADMISSION_MAX_INFERENCE_QUEUE", 256)),
+        shed_mode=os.getenv("ADMISSION_SHED_MODE", "fallback").lower(),
+    )
+
+
+def retry_after_header(seconds: Optional[float]) -> dict:
+    """Retry-After header (whole seconds, at least 1)."""
+    return {"Retry-After": str(max(1, int(-(-(seconds or 1) // 1))))}
@@ -0,0 +1,345 @@
+"""
+Conversation Memory Store
+Per-user chat history with bounded memory. The in-process backend evicts by
+TTL, user count and total bytes; the KV backend keeps history in the shared
+`kv_store_638221b2` table so several workers/nodes see the same conversation.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+# Table and key layout shared with the Supabase edge functions (see DATABASE)
+KV_TABLE = "kv_store_638221b2"
+KEY_PREFIX = "conversation:"
+
+# Rough per-user bookkeeping overhead counted against the byte cap
+_ENTRY_OVERHEAD_BYTES = 128
+
+
+class ConversationStore(ABC):
+    """Stores the most recent conversation lines per user."""
+
+    # Whether calls do blocking I/O and should run off the event loop
+    blocking = False
+
+    def __init__(self, max_turns: int = 20, ttl_s: float = 24 * 3600):
+        """
+        Args:
+            max_turns: Lines kept per user (a user message and a reply are two lines)
+            ttl_s: Idle time after which a user's history expires
+        """
+        self.max_turns = max_turns
+        self.ttl_s = ttl_s
+
+    @abstractmethod
+    def get_history(self, user_id: str, limit: Optional[int] = None) -> List[str]:
+        """Return the user's history lines, oldest first (last `limit` lines if given)."""
+
+    @abstractmethod
+    def append(self, user_id: str, *lines: str) -> None:
+        """Append lines to the user's history, trimming to `max_turns`."""
+
+    @abstractmethod
+    def reset(self, user_id: str) -> bool:
+        """Clear the user's history. Returns whether any history existed."""
+
+
+class InMemoryConversationStore(ConversationStore):
+    """Process-local LRU store with TTL, user-count and byte caps."""
+
+    def __init__(
+        self,
+        max_turns: int = 20,
+        ttl_s: float = 24 * 3600,
+        max_users: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024
+    ):
+        """
+        Args:
+            max_turns: Lines kept per user
+            ttl_s: Idle time after which a user's history expires
+            max_users: Max users held; least recently used are evicted first
+            max_bytes: Approximate cap on the UTF-8 size of all stored lines
+        """
+        super().__init__(max_turns, ttl_s)
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        # user_id -> (last_access, lines, size_bytes); ordered oldest access first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_history(self, user_id: str, limit: Optional[int] = None) -> List[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return []
+            if now - entry[0] > self.ttl_s:
+                self._remove(user_id)
+                return []
+            _, lines, size = entry
+            self._entries[user_id] = (now, lines, size)
+            self._entries.move_to_end(user_id)
+        return list(lines[-limit:] if limit else lines)
+
+    def append(self, user_id: str, *lines: str) -> None:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            history = list(entry[1]) if entry is not None and now - entry[0] <= self.ttl_s else []
+            history.extend(lines)
+            history = history[-self.max_turns:]
+
+            if entry is not None:
+                self._remove(user_id)
+            size = _ENTRY_OVERHEAD_BYTES + sum(len(line.encode("utf-8")) for line in history)
+            self._entries[user_id] = (now, history, size)
+            self._bytes += size
+            self._evict(now)
+
+    def reset(self, user_id: str) -> bool:
+        with self._lock:
+            if user_id not in self._entries:
+                return False
+            self._remove(user_id)
+            return True
+
+    def _remove(self, user_id: str):
+        _, _, size = self._entries.pop(user_id)
+        self._bytes -= size
+
+    def _evict(self, now: float):
+        """Drop expired users, then least recently used ones until under both caps."""
+        while self._entries:
+            oldest_id, (last_access, _, _) = next(iter(self._entries.items()))
+            expired = now - last_access > self.ttl_s
+            over_cap = len(self._entries) > self.max_users or self._bytes > self.max_bytes
+            if not (expired or over_cap):
+                break
+            self._remove(oldest_id)
+            self.evictions += 1
+
+
+class KVConversationStore(ConversationStore):
+    """
+    History stored as JSON rows in the `kv_store_638221b2` key/value table.
+
+    Works against Postgres (the production schema in DATABASE) or SQLite as a
+    local stand-in. Keys are `conversation:<user_id>`; values hold the lines
+    and the last update time used for TTL expiry.
+    """
+
+    blocking = True
+
+    def __init__(
+        self,
+        connect: Callable[[], object],
+        dialect: str = "sqlite",
+        max_turns: int = 20,
+        ttl_s: float = 24 * 3600,
+        create_schema: bool = True
+    ):
+        """
+        Args:
+            connect: Zero-arg callable returning a DB-API connection
+            dialect: "sqlite" or "postgres"
+            max_turns: Lines kept per user
+            ttl_s: Idle time after which a user's history expires
+            create_schema: Create the table/index if they do not exist (on each process's first connection)
+        """
+        super().__init__(max_turns, ttl_s)
+        if dialect not in ("sqlite", "postgres"):
+            raise ValueError(f"Unsupported dialect: {dialect}")
+        self.dialect = dialect
+        self._connect = connect
+        self.create_schema = create_schema
+        # Opened on first use in each process, so forked workers (serve.py) never share a connection
+        self._conn_obj = None
+        self._conn_pid = None
+        self._lock = threading.Lock()
+
+        p = "?" if dialect == "sqlite" else "%s"
+        value_param = p if dialect == "sqlite" else f"CAST({p} AS jsonb)"
+        self._select_sql = f"SELECT value FROM {KV_TABLE} WHERE key = {p}"
+        self._select_for_update_sql = self._select_sql + (" FOR UPDATE" if dialect == "postgres" else "")
+        self._upsert_sql = (
+            f"INSERT INTO {KV_TABLE} (key, value) VALUES ({p}, {value_param}) "
+            f"ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value"
+        )
+        self._delete_sql = f"DELETE FROM {KV_TABLE} WHERE key = {p}"
+
+    @property
+    def _conn(self):
+        """This process's connection, opened on first use and after it was closed (call with the lock held)."""
+        # psycopg2 sets `closed` once the server connection is gone; sqlite3 has no such flag
+        if self._conn_obj is None or self._conn_pid != os.getpid() or getattr(self._conn_obj, "closed", 0):
+            self._conn_obj = self._connect()
+            self._conn_pid = os.getpid()
+            if self.create_schema:
+                self._ensure_schema(self._conn_obj)
+        return self._conn_obj
+
+    def _ensure_schema(self, conn):
+        value_type = "jsonb" if self.dialect == "postgres" else "text"
+        index_ops = " text_pattern_ops" if self.dialect == "postgres" else ""
+        cur = conn.cursor()
+        cur.execute(
+            f"CREATE TABLE IF NOT EXISTS {KV_TABLE} ("
+            f"key text NOT NULL PRIMARY KEY, value {value_type} NOT NULL)"
+        )
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {KV_TABLE}_key_idx ON {KV_TABLE} (key{index_ops})")
+        conn.commit()
+
+    def _rollback(self):
+        """
+        End a failed transaction, so a Postgres connection is not left aborted
+        for every later call. A connection that cannot roll back is dropped and
+        reopened on next use.
+        """
+        try:
+            self._conn_obj.rollback()
+        except Exception:
+            try:
+                self._conn_obj.close()
+            except Exception:
+                pass
+            self._conn_obj = None
+
+    @staticmethod
+    def _decode(raw) -> dict:
+        # psycopg2 returns jsonb as dict; sqlite returns the stored text
+        if isinstance(raw, (bytes, str)):
+            return json.loads(raw)
+        return raw or {}
+
+    def _read(self, cur, sql: str, key: str) -> Optional[dict]:
+        cur.execute(sql, (key,))
+        row = cur.fetchone()
+        return self._decode(row[0]) if row else None
+
+    def get_history(self, user_id: str, limit: Optional[int] = None) -> List[str]:
+        key = KEY_PREFIX + user_id
+        with self._lock:
+            cur = self._conn.cursor()
+            try:
+                value = self._read(cur, self._select_sql, key)
+                self._conn.commit()
+            except Exception:
+                self._rollback()
+                raise
+        if value is None or time.time() - value.get("updated_at", 0) > self.ttl_s:
+            return []
+        lines = value.get("turns", [])
+        return list(lines[-limit:] if limit else lines)
+
+    def append(self, user_id: str, *lines: str) -> None:
+        key = KEY_PREFIX + user_id
+        now = time.time()
+        with self._lock:
+            cur = self._conn.cursor()
+            try:
+                if self.dialect == "sqlite":
+                    cur.execute("BEGIN IMMEDIATE")
+                value = self._read(cur, self._select_for_update_sql, key)
+                history = []
+                if value is not None and now - value.get("updated_at", 0) <= self.ttl_s:
+                    history = value.get("turns", [])
+                history = (history + list(lines))[-self.max_turns:]
+                cur.execute(self._upsert_sql, (key, json.dumps({"turns": history, "updated_at": now})))
+                self._conn.commit()
+            except Exception:
+                self._rollback()
+                raise
+
+    def reset(self, user_id: str) -> bool:
+        with self._lock:
+            cur = self._conn.cursor()
+            try:
+                cur.execute(self._delete_sql, (KEY_PREFIX + user_id,))
+                existed = cur.rowcount > 0
+                self._conn.commit()
+            except Exception:
+                self._rollback()
+                raise
+        return existed
+
+    def purge_expired(self) -> int:
+        """Delete expired conversations. Returns how many rows were removed."""
+        p = "?" if self.dialect == "sqlite" else "%s"
+        cutoff = time.time() - self.ttl_s
+        removed = 0
+        with self._lock:
+            cur = self._conn.cursor()
+            try:
+                cur.execute(f"SELECT key, value FROM {KV_TABLE} WHERE key LIKE {p}", (KEY_PREFIX + "%",))
+                stale = [key for key, raw in cur.fetchall() if self._decode(raw).get("updated_at", 0) < cutoff]
+                for key in stale:
+                    cur.execute(self._delete_sql, (key,))
+                    removed += 1
+                self._conn.commit()
+            except Exception:
+                self._rollback()
+                raise
+        return removed
+
+
+def create_conversation_store() -> ConversationStore:
+    """
+    Build the conversation store selected by environment variables.
+
+    CONVERSATION_STORE: "memory" (default), "sqlite" or "postgres"
+    CONVERSATION_DB: SQLite file path or Postgres DSN (defaults to DATABASE_URL for postgres)
+    """
+    backend = os.getenv("CONVERSATION_STORE", "memory").lower()
+    max_turns = int(os.getenv("CONVERSATION_MAX_TURNS", 20))
+    ttl_s = float(os.getenv("CONVERSATION_TTL_S", 24 * 3600))
+
+    if backend == "memory":
+        return InMemoryConversationStore(
+            max_turns=max_turns,
+            ttl_s=ttl_s,
+            max_users=int(os.getenv("CONVERSATION_MAX_USERS", 10000)),
+            max_bytes=int(os.getenv("CONVERSATION_MAX_BYTES", 64 * 1024 * 1024))
+        )
+
+    if backend == "sqlite":
+        path = os.getenv("CONVERSATION_DB", "conversations.db")
+        return KVConversationStore(
+            # Autocommit mode; append() opens its own BEGIN IMMEDIATE transaction
+            lambda: sqlite3.connect(path, check_same_thread=False, isolation_level=None),
+            dialect="sqlite",
+            max_turns=max_turns,
+            ttl_s=ttl_s
+        )
+
+    if backend == "postgres":
+        try:
+            import psycopg2
+        except ImportError as e:
+            raise RuntimeError("CONVERSATION_STORE=postgres requires the psycopg2 package") from e
+        dsn = os.getenv("CONVERSATION_DB") or os.getenv("DATABASE_URL")
+        if not dsn:
+            raise ValueError("CONVERSATION_STORE=postgres requires CONVERSATION_DB or DATABASE_URL")
+        return KVConversationStore(
+            lambda: psycopg2.connect(dsn),
+            dialect="postgres",
+            max_turns=max_turns,
+            ttl_s=ttl_s
+        )
+
+    raise ValueError(f"Unknown CONVERSATION_STORE backend: {backend}")
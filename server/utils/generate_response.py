@@ -5,14 +5,36 @@ Uses ONLY Google Gemini API without any rule-based fallbacks.
 
 import os
 import time
+import asyncio
+import hashlib
 from typing import Optional
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 import logging
 import requests
+from requests.adapters import HTTPAdapter
+
+from utils.cache import LRUCache
+from utils.llm_client import CircuitBreaker, CircuitOpenError, ReplyUnavailable, ResilientClient
+from utils.metrics import observe_span, span
+from utils.prompt_builder import PromptBudget, PromptBuilder, PromptStats
+from utils.keywords import KEYWORD_MATCHER
+from utils.severity import severity_for_score
 
 logger = logging.getLogger(__name__)
 
+SAFETY_SETTINGS = {
+    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+}
+
+# Speaker prefixes Gemini sometimes puts before a reply
+REPLY_PREFIXES = ("EmpathAI:", "AI:", "Response:")
+# Streamed text held back before the first chunk is sent, so prefixes can be stripped
+STREAM_PREFIX_HOLD_CHARS = max(len(prefix) for prefix in REPLY_PREFIXES) + 2
+
 class ResponseGenerator:
     """Generates empathetic AI responses using ONLY Google Gemini API."""
     
@@ -24,8 +46,53 @@ class ResponseGenerator:
         if not self.gemini_api_key or not self.gemini_api_key.strip():
             raise ValueError("❌ GEMINI_API_KEY is required but not found in environment variables!")
         
+        # Caps concurrent Gemini calls made through the async path
+        self.max_concurrency = int(os.getenv("GEMINI_MAX_CONCURRENCY", 8))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        # Opt-in reply cache for repeated stateless prompts (e.g. forwarded notifications)
+        self.cache = None
+        if os.getenv("GEMINI_RESPONSE_CACHE", "0").lower() in ("1", "true", "yes"):
+            self.cache = LRUCache(
+                max_entries=int(os.getenv("GEMINI_RESPONSE_CACHE_SIZE", 1024)),
+                ttl_s=float(os.getenv("GEMINI_RESPONSE_CACHE_TTL_S", 3600))
+            )
+            self.cache_with_history = os.getenv("GEMINI_RESPONSE_CACHE_WITH_HISTORY", "0").lower() in ("1", "true", "yes")
+        
+        # Token-budgeted prompts (history compaction) and per-request prompt sizes
+        self.prompts = PromptBuilder(PromptBudget.from_env())
+        self.prompt_stats = PromptStats()
+        
+        # Deadline / retry / hedging / circuit-breaker policy for every Gemini call
+        self.llm = ResilientClient(
+            name="gemini",
+            deadline_s=float(os.getenv("GEMINI_DEADLINE_S", 15)),
+            max_attempts=int(os.getenv("GEMINI_MAX_ATTEMPTS", 3)),
+            hedge=os.getenv("GEMINI_HEDGE", "1").lower() in ("1", "true", "yes"),
+            hedge_percentile=float(os.getenv("GEMINI_HEDGE_PERCENTILE", 95)),
+            hedge_min_ms=float(os.getenv("GEMINI_HEDGE_MIN_MS", 500)),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("GEMINI_BREAKER_FAILURES", 5)),
+                reset_timeout_s=float(os.getenv("GEMINI_BREAKER_RESET_S", 30))
+            )
+        )
+        
+        # Pooled keep-alive connections for web search
+        self.http = requests.Session()
+        self.http.mount("https://", HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=int(os.getenv("WEB_SEARCH_POOL_SIZE", 8))
+        ))
+        
         try:
-            genai.configure(api_key=self.gemini_api_key)
+            # One client (and connection channel) reused for every call; GEMINI_API_ENDPOINT
+            # with GEMINI_TRANSPORT=rest points it at another server, e.g. a local fake
+            configure_kwargs = {"api_key": self.gemini_api_key}
+            if os.getenv("GEMINI_TRANSPORT"):
+                configure_kwargs["transport"] = os.getenv("GEMINI_TRANSPORT")
+            if os.getenv("GEMINI_API_ENDPOINT"):
+                configure_kwargs["client_options"] = {"api_endpoint": os.getenv("GEMINI_API_ENDPOINT")}
+            genai.configure(**configure_kwargs)
             self.model = genai.GenerativeModel(self.model_name)
             print(f"✅ Google Gemini API configured → using {self.model_name}")
             self.available = True
@@ -52,11 +119,208 @@ class ResponseGenerator:
         
         Returns:
             Tuple of (response_text, web_enabled)
+        
+        Raises:
+            ReplyUnavailable: The circuit is open or every attempt failed
         """
+        cache_key = self._cache_key(user_message, emotion, harassment_score, conversation_history, enable_web)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return (cached, False)
         return self._generate_with_retry(
-            user_message, emotion, is_harassment, harassment_score, conversation_history, enable_web
+            user_message, emotion, is_harassment, harassment_score, conversation_history, enable_web,
+            cache_key=cache_key
         )
     
+    async def agenerate(
+        self,
+        user_message: str,
+        emotion: str,
+        is_harassment: bool,
+        harassment_score: float,
+        conversation_history: Optional[list] = None,
+        enable_web: bool = False,
+        web_context: Optional[str] = None
+    ) -> tuple[str, bool]:
+        """
+        Async variant of `generate` for use inside request handlers.
+        Uses Gemini's native async client and non-blocking backoff, so retries
+        never stall the event loop.
+        
+        Args:
+            web_context: Snippets already fetched with `afetch_web_context`; when given,
+                         no search is made here (lets callers run the search in parallel)
+        
+        Returns:
+            Tuple of (response_text, web_enabled)
+        
+        Raises:
+            ReplyUnavailable: The circuit is open or every attempt failed; the
+                caller answers locally and can report the reason
+        """
+        cache_key = None
+        if not web_context:
+            cache_key = self._cache_key(user_message, emotion, harassment_score, conversation_history, enable_web)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return (cached, False)
+        return await self._agenerate_with_retry(
+            user_message, emotion, is_harassment, harassment_score, conversation_history, enable_web,
+            cache_key=cache_key, web_context=web_context
+        )
+    
+    async def astream(
+        self,
+        user_message: str,
+        emotion: str,
+        is_harassment: bool,
+        harassment_score: float,
+        conversation_history: Optional[list] = None,
+        web_context: str = ""
+    ):
+        """
+        Async generator yielding the reply in chunks as Gemini produces them.
+        
+        A failure before any text arrives raises ReplyUnavailable, like
+        `agenerate`; a failure mid-stream ends the reply with the text already
+        sent. Complete replies are cached like `agenerate`, and a cache hit is
+        yielded whole.
+        """
+        cache_key = None
+        if not web_context:
+            cache_key = self._cache_key(user_message, emotion, harassment_score, conversation_history, False)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        try:
+            self.llm.admit()
+        except CircuitOpenError:
+            print("⚡ Gemini circuit open, no reply generated")
+            raise ReplyUnavailable("circuit_open")
+        
+        prompt = self._build_prompt(user_message, emotion, harassment_score, conversation_history, web_context)
+        parts = []
+        # Leading text is held back until speaker prefixes can be stripped
+        pending = ""
+        last_chunk = None
+        started = time.perf_counter()
+        try:
+            async with self._semaphore:
+                response = await self.model.generate_content_async(
+                    prompt,
+                    generation_config=self._generation_config(),
+                    safety_settings=SAFETY_SETTINGS,
+                    stream=True
+                )
+                async for chunk in response:
+                    last_chunk = chunk
+                    try:
+                        text = chunk.text
+                    except ValueError:
+                        # Chunk without text parts (e.g. only a finish reason)
+                        continue
+                    if not parts:
+                        pending += text
+                        if len(pending) < STREAM_PREFIX_HOLD_CHARS:
+                            continue
+                        text = self._strip_prefix(pending)
+                        if not text:
+                            continue
+                    parts.append(text)
+                    yield text
+            if not parts and pending:
+                text = self._strip_prefix(pending)
+                if text:
+                    parts.append(text)
+                    yield text
+            if not parts:
+                raise ValueError("Gemini returned empty response")
+        except (GeneratorExit, asyncio.CancelledError):
+            # Client went away mid-stream: no verdict on the upstream
+            self.llm.breaker.release_probe()
+            raise
+        except Exception as e:
+            self.llm.record_failure(e)
+            if parts:
+                logger.warning(f"Gemini stream interrupted: {e}")
+                return
+            logger.warning(f"Gemini stream failed: {e}")
+            print("❌ Gemini stream failed, no reply generated")
+            raise ReplyUnavailable("llm_error") from e
+        finally:
+            # Covers the whole stream, including time spent sending chunks to the client
+            observe_span("gemini.stream", (time.perf_counter() - started) * 1000)
+        
+        # Usage metadata arrives with the final chunk
+        self._record_usage(last_chunk)
+        # Stream duration is not comparable to unary call latency, so it is not sampled for hedging
+        self.llm.record_success()
+        if cache_key is not None:
+            self.cache.put(cache_key, "".join(parts).strip())
+    
+    async def afetch_web_context(self, user_message: str) -> str:
+        """Fetch web snippets for factual/recent queries (empty string otherwise)."""
+        if not self._needs_web_search(user_message):
+            return ""
+        # requests is blocking; keep it off the event loop
+        return await asyncio.to_thread(self._fetch_web_context, user_message)
+    
+    def _cache_key(
+        self,
+        user_message: str,
+        emotion: str,
+        harassment_score: float,
+        conversation_history: Optional[list],
+        enable_web: bool
+    ) -> Optional[str]:
+        """
+        Cache key for a reply, or None when the request must bypass the cache.
+        
+        Keyed on (normalized message, emotion, severity bucket, history digest) and
+        hashed so raw message text is never held as a key.
+        """
+        if self.cache is None:
+            return None
+        if conversation_history and not self.cache_with_history:
+            return None
+        if enable_web and self._needs_web_search(user_message):
+            return None
+        
+        normalized = " ".join(user_message.lower().split())
+        severity = severity_for_score(harassment_score)
+        history_digest = hashlib.sha256("\n".join(conversation_history or []).encode("utf-8")).hexdigest()
+        raw_key = "\x1f".join([normalized, emotion, severity, history_digest])
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+    
+    def cache_stats(self) -> Optional[dict]:
+        """Hit/miss counters for the reply cache, or None when it is disabled."""
+        return self.cache.stats() if self.cache is not None else None
+    
+    def circuit_open(self) -> bool:
+        """Whether Gemini calls are currently being short-circuited."""
+        return self.llm.breaker.state == CircuitBreaker.OPEN
+    
+    def client_stats(self) -> dict:
+        """Gemini call counters, circuit state and latency percentiles."""
+        return self.llm.stats()
+    
+    def prompt_token_stats(self) -> dict:
+        """Prompt sizes: estimated tokens per section and Gemini-reported counts."""
+        return self.prompt_stats.stats()
+    
+    async def acomplete(self, prompt: str) -> str:
+        """Send a plain prompt to Gemini asynchronously and return the stripped text."""
+        async def call():
+            async with self._semaphore:
+                return await self.model.generate_content_async(prompt)
+        response = await self.llm.call(call)
+        return (response.text or "").strip()
+    
     def _generate_with_retry(
         self,
         user_message: str,
@@ -65,25 +329,65 @@ class ResponseGenerator:
         harassment_score: float,
         conversation_history: Optional[list] = None,
         enable_web: bool = False,
-        max_retries: int = 3
+        cache_key: Optional[str] = None
     ) -> tuple[str, bool]:
-        """Generate response with retry logic for reliability."""
+        """Generate response under the client policy (transient errors retried, circuit breaker)."""
         
-        for attempt in range(max_retries):
-            try:
-                return self._generate_gemini_response(
+        try:
+            reply, web_enabled = self.llm.call_sync(
+                lambda: self._generate_gemini_response(
                     user_message, emotion, is_harassment, harassment_score, conversation_history, enable_web
                 )
-            except Exception as e:
-                logger.warning(f"Gemini attempt {attempt + 1} failed: {e}")
-                if attempt < max_retries - 1:
-                    wait_time = 2 ** attempt  # Exponential backoff: 1, 2, 4 seconds
-                    print(f"🔄 Retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)
-                else:
-                    # Last attempt failed - return a simple generative-style message
-                    print("❌ All Gemini attempts failed, using emergency generative response")
-                    return (self._get_emergency_response(user_message, is_harassment), False)
+            )
+        except CircuitOpenError:
+            print("⚡ Gemini circuit open, no reply generated")
+            raise ReplyUnavailable("circuit_open")
+        except Exception as e:
+            logger.warning(f"Gemini call failed: {e}")
+            print("❌ All Gemini attempts failed, no reply generated")
+            raise ReplyUnavailable("llm_error") from e
+        if cache_key is not None and not web_enabled:
+            self.cache.put(cache_key, reply)
+        return (reply, web_enabled)
+    
+    async def _agenerate_with_retry(
+        self,
+        user_message: str,
+        emotion: str,
+        is_harassment: bool,
+        harassment_score: float,
+        conversation_history: Optional[list] = None,
+        enable_web: bool = False,
+        cache_key: Optional[str] = None,
+        web_context: Optional[str] = None
+    ) -> tuple[str, bool]:
+        """
+        Async call under the client policy: per-call deadline, retries on transient
+        errors only, a hedged duplicate request past the p95 latency, and
+        ReplyUnavailable (without calling) while the circuit is open.
+        """
+        # Fetched once up front so retries and hedges do not repeat the search
+        if web_context is None:
+            web_context = await self.afetch_web_context(user_message) if enable_web else ""
+        
+        try:
+            reply, web_enabled = await self.llm.call(
+                lambda: self._agenerate_gemini_response(
+                    user_message, emotion, is_harassment, harassment_score, conversation_history, enable_web,
+                    web_context
+                )
+            )
+        except CircuitOpenError:
+            print("⚡ Gemini circuit open, no reply generated")
+            raise ReplyUnavailable("circuit_open")
+        except Exception as e:
+            logger.warning(f"Gemini call failed: {e}")
+            print("❌ All Gemini attempts failed, no reply generated")
+            raise ReplyUnavailable("llm_error") from e
+        # Only successful, non-web replies are cached
+        if cache_key is not None and not web_enabled:
+            self.cache.put(cache_key, reply)
+        return (reply, web_enabled)
     
     def _generate_gemini_response(
         self,
@@ -97,92 +401,22 @@ class ResponseGenerator:
         """Generate response using Google Gemini API with optimized settings."""
         
         # Check if web search is needed (factual/recent queries)
-        web_enabled = False
         web_context = ""
-        
-        if enable_web:
-            # Keywords that suggest need for web search
-            web_keywords = ["today", "latest", "who won", "news", "update", "recent", "current", 
-                          "2024", "2025", "now", "happening", "trending", "what is", "when did"]
-            message_lower = user_message.lower()
-            
-            if any(keyword in message_lower for keyword in web_keywords):
-                web_context = self._fetch_web_context(user_message)
-                web_enabled = bool(web_context)
-        
-        # Classify harassment severity
-        if harassment_score < 0.3:
-            severity = "Low"
-        elif harassment_score < 0.6:
-            severity = "Medium"
-        else:
-            severity = "High"
-        
+        if enable_web and self._needs_web_search(user_message):
+            web_context = self._fetch_web_context(user_message)
+        web_enabled = bool(web_context)
         is_harassment = harassment_score >= 0.55
         
-        # Build conversation history context
-        history_context = ""
-        if conversation_history and len(conversation_history) > 0:
-            # Keep last 6 turns for context
-            recent_history = conversation_history[-6:]
-            history_context = "\n\nPrevious conversation:\n" + "\n".join(recent_history) + "\n"
-        
-        # Build optimized prompt with memory and optional web context
-        web_section = f"\n\n[Live Web Context: {web_context}]" if web_context else ""
-        
-        prompt = f"""You are EmpathAI, a compassionate AI assistant for emotional support and harassment guidance.
-You remember previous conversations and can reference them naturally.
-{web_section}
-
-{history_context}Current USER MESSAGE: "{user_message}"
-
-CONTEXT:
-- Emotion: {emotion}
-- Harassment Detected: {is_harassment}
-- Severity: {severity}
-- Confidence Score: {harassment_score:.2f}
-{'- Web Search Enabled: Using live information' if web_enabled else ''}
-
-RESPONSE GUIDELINES:
-1. Provide warm, empathetic, psychologically safe support
-2. Keep response conversational (3-5 sentences)
-3. Reference previous conversation naturally if relevant
-4. If web context is provided, incorporate factual information naturally
-5. If harassment is detected, offer specific guidance on:
-   - Legal rights (mention relevant Indian IPC sections if applicable)
-   - Mental health resources
-   - Safety measures
-6. Use natural language - avoid robotic phrases
-7. Include one supportive emoji if appropriate
-8. Focus on user's wellbeing and validation
-
-Generate your response:"""
+        prompt = self._build_prompt(user_message, emotion, harassment_score, conversation_history, web_context)
 
         try:
             response = self.model.generate_content(
                 prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.8,
-                    max_output_tokens=800,  # Increased from 300 to prevent MAX_TOKENS
-                    top_p=0.9,
-                ),
-                safety_settings={
-                    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-                    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-                    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-                    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-                }
+                generation_config=self._generation_config(),
+                safety_settings=SAFETY_SETTINGS
             )
-            
-            if response.text:
-                reply_text = response.text.strip()
-                # Clean up any prefixes if Gemini adds them
-                for prefix in ["EmpathAI:", "AI:", "Response:"]:
-                    if reply_text.startswith(prefix):
-                        reply_text = reply_text[len(prefix):].strip()
-                return (reply_text, web_enabled)
-            else:
-                raise ValueError("Gemini returned empty response")
+            self._record_usage(response)
+            return (self._extract_reply(response), web_enabled)
                 
         except Exception as e:
             error_msg = str(e)
@@ -193,6 +427,91 @@ Generate your response:"""
                 )
             raise
     
+    async def _agenerate_gemini_response(
+        self,
+        user_message: str,
+        emotion: str,
+        is_harassment: bool,
+        harassment_score: float,
+        conversation_history: Optional[list] = None,
+        enable_web: bool = False,
+        web_context: Optional[str] = None
+    ) -> tuple[str, bool]:
+        """Async counterpart of `_generate_gemini_response`."""
+        
+        if web_context is None:
+            web_context = await self.afetch_web_context(user_message) if enable_web else ""
+        web_enabled = bool(web_context)
+        is_harassment = harassment_score >= 0.55
+        
+        prompt = self._build_prompt(user_message, emotion, harassment_score, conversation_history, web_context)
+
+        try:
+            async with self._semaphore:
+                response = await self.model.generate_content_async(
+                    prompt,
+                    generation_config=self._generation_config(),
+                    safety_settings=SAFETY_SETTINGS
+                )
+            self._record_usage(response)
+            return (self._extract_reply(response), web_enabled)
+                
+        except Exception as e:
+            if "MAX_TOKENS" in str(e):
+                logger.warning("MAX_TOKENS hit, retrying with shorter prompt...")
+                return await self._agenerate_gemini_response_fallback(
+                    user_message, emotion, is_harassment, harassment_score, web_enabled
+                )
+            raise
+    
+    @staticmethod
+    def _needs_web_search(user_message: str) -> bool:
+        """Whether the message looks like a factual/recent query worth a web search."""
+        return KEYWORD_MATCHER.scan(user_message).any("web")
+    
+    @staticmethod
+    def _generation_config():
+        """Generation settings for full empathetic replies."""
+        return genai.types.GenerationConfig(
+            temperature=0.8,
+            max_output_tokens=800,  # Increased from 300 to prevent MAX_TOKENS
+            top_p=0.9,
+        )
+    
+    @staticmethod
+    def _extract_reply(response) -> str:
+        """Pull the reply text out of a Gemini response and strip speaker prefixes."""
+        if not response.text:
+            raise ValueError("Gemini returned empty response")
+        return ResponseGenerator._strip_prefix(response.text).strip()
+    
+    @staticmethod
+    def _strip_prefix(text: str) -> str:
+        """Drop leading whitespace and any speaker prefix Gemini adds."""
+        text = text.lstrip()
+        for prefix in REPLY_PREFIXES:
+            if text.startswith(prefix):
+                text = text[len(prefix):].lstrip()
+        return text
+    
+    def _build_prompt(
+        self,
+        user_message: str,
+        emotion: str,
+        harassment_score: float,
+        conversation_history: Optional[list] = None,
+        web_context: str = ""
+    ) -> str:
+        """Build the budgeted Gemini prompt with memory and optional web context, recording its size."""
+        prompt = self.prompts.build(user_message, emotion, harassment_score, conversation_history, web_context)
+        self.prompt_stats.record_built(prompt)
+        return prompt.text
+    
+    def _record_usage(self, response):
+        """Record the prompt token count Gemini reports for a response, when present."""
+        usage = getattr(response, "usage_metadata", None)
+        self.prompt_stats.record_usage(getattr(usage, "prompt_token_count", None))
+    
     def _fetch_web_context(self, query: str) -> str:
         """Fetch web context using Google Custom Search API."""
         try:
@@ -211,7 +530,8 @@ Generate your response:"""
                 "num": 3  # Get top 3 results
             }
             
-            response = requests.get(search_url, params=params, timeout=5)
+            with span("web_search"):
+                response = self.http.get(search_url, params=params, timeout=5)
             response.raise_for_status()
             data = response.json()
             
@@ -234,27 +554,46 @@ Generate your response:"""
         web_enabled: bool = False
     ) -> tuple[str, bool]:
         """Simplified prompt for when MAX_TOKENS occurs."""
-        simple_prompt = f"""Provide empathetic support for this message: "{user_message}"
-        
-Emotion: {emotion}. Harassment: {is_harassment}.
-Respond with warm, supportive 2-3 sentences."""
-
         response = self.model.generate_content(
-            simple_prompt,
+            self._fallback_prompt(user_message, emotion, is_harassment),
             generation_config=genai.types.GenerationConfig(
                 temperature=0.7,
                 max_output_tokens=300,
             )
         )
-        reply = response.text.strip() if response.text else "I'm here to support you through this. Your feelings are valid and important. 💙"
-        return (reply, web_enabled)
+        return (self._fallback_reply(response), web_enabled)
+    
+    async def _agenerate_gemini_response_fallback(
+        self,
+        user_message: str,
+        emotion: str,
+        is_harassment: bool,
+        harassment_score: float,
+        web_enabled: bool = False
+    ) -> tuple[str, bool]:
+        """Async counterpart of `_generate_gemini_response_fallback`."""
+        async with self._semaphore:
+            response = await self.model.generate_content_async(
+                self._fallback_prompt(user_message, emotion, is_harassment),
+                generation_config=genai.types.GenerationConfig(
+                    temperature=0.7,
+                    max_output_tokens=300,
+                )
+            )
+        return (self._fallback_reply(response), web_enabled)
+    
+    @staticmethod
+    def _fallback_prompt(user_message: str, emotion: str, is_harassment: bool) -> str:
+        """Short prompt used after a MAX_TOKENS failure."""
+        return f"""Provide empathetic support for this message: "{user_message}"
+        
+Emotion: {emotion}. Harassment: {is_harassment}.
+Respond with warm, supportive 2-3 sentences."""
     
-    def _get_emergency_response(self, user_message: str, is_harassment: bool) -> str:
-        """Final fallback that still feels generative (not rule-based)."""
-        if is_harassment:
-            return "I hear you and I want you to know this is completely unacceptable. You deserve to feel safe and respected. Please consider reaching out to trusted support resources - you don't have to face this alone. 💙"
-        else:
-            return "Thank you for sharing this with me. I'm here to listen and support you through whatever you're experiencing. Your feelings matter and you're not alone in this. 🌟"
+    @staticmethod
+    def _fallback_reply(response) -> str:
+        """Reply text from the short-prompt call, with a gentle default."""
+        return response.text.strip() if response.text else "I'm here to support you through this. Your feelings are valid and important. 💙"
     
     def test_connection(self):
         """Test Gemini connectivity."""
@@ -0,0 +1,225 @@
+"""
+Keyword Matcher
+All keyword tables used by the server, compiled once at startup into a shared
+matcher so every consumer of a message reuses the same scan.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from utils.metrics import span
+
+# Anxiety cues (the emotion model has no anxiety label)
+ANXIETY_KEYWORDS = ["anxious", "anxiety", "worried", "worry", "nervous", "panic", "stressed", "stress"]
+
+# Explicit terms that raise the harassment score baseline
+EXPLICIT_KEYWORDS = [
+    "sex", "sexual", "harass", "harassment", "molest",
+    "explicit", "rape", "stalking", "abuse", "inappropriate", "touch"
+]
+
+# Obvious cases that override a low model score in detect_with_keywords
+STRONG_HARASSMENT_KEYWORDS = [
+    "sexual", "explicit", "harass", "unwanted", "coworker",
+    "stop", "stalking", "threat", "intimidat", "abuse", "forced"
+]
+
+# Keywords reported back to clients
+HARASSMENT_KEYWORDS = [
+    "abuse", "abusive", "threat", "threaten", "harass", "harassment",
+    "violence", "stalk", "stalking", "blackmail", "insult", "touch",
+    "sex", "sexual", "explicit", "remarks", "favour", "woman", "modesty",
+    "unwanted", "coworker", "colleague", "stop", "intimidat", "forced"
+]
+
+# Queries that suggest need for web search
+WEB_KEYWORDS = ["today", "latest", "who won", "news", "update", "recent", "current",
+                "2024", "2025", "now", "happening", "trending", "what is", "when did"]
+
+# IPC section keywords mapping (default tables for utils/legal_index.py)
+IPC_KEYWORDS = {
+    "354A": ["sexual", "harassment", "unwelcome", "advances", "favours", "explicit"],
+    "354D": ["stalk", "stalking", "follow", "following", "repeatedly"],
+    "499": ["defame", "defamation", "reputation", "false", "statement"],
+    "503": ["threat", "threaten", "intimidate", "injury", "alarm"],
+    "504": ["insult", "provoke", "breach", "peace", "intentionally"],
+    "506": ["criminal", "intimidation", "punishment"],
+    "509": ["modesty", "woman", "word", "gesture", "insult"]
+}
+
+KEYWORD_TABLES: Dict[str, List[str]] = {
+    "anxiety": ANXIETY_KEYWORDS,
+    "explicit": EXPLICIT_KEYWORDS,
+    "strong_harassment": STRONG_HARASSMENT_KEYWORDS,
+    "harassment": HARASSMENT_KEYWORDS,
+    "web": WEB_KEYWORDS,
+}
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Compile words into a nested-alternation regex that prefers the longest match.
+
+    e.g. ["abuse", "abusive", "sex", "sexual"] -> "abus(?:ive|e)|sex(?:ual)?"
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node: dict) -> str:
+        terminal = "" in node
+        branches = []
+        # Longer continuations first so the greedy match is the longest keyword
+        for ch in sorted((k for k in node if k), key=lambda k: -_depth(node[k])):
+            branches.append(re.escape(ch) + build(node[ch]))
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            if len(branches) == 1 and not body.startswith("(?:"):
+                body = "(?:" + body + ")"
+            return body + "?"
+        return body
+
+    return build(trie)
+
+
+def _depth(node: dict) -> int:
+    children = [_depth(child) for key, child in node.items() if key]
+    return 1 + max(children) if children else 0
+
+
+class KeywordHits:
+    """
+    Keyword hits for one text, queryable per category in table order.
+
+    In substring mode each keyword is tested lazily and at most once per text,
+    so category checks keep the short-circuiting of `any(...)` while every
+    consumer of the same message shares the results.
+    """
+
+    __slots__ = ("_text", "_matcher", "_known", "_complete")
+
+    def __init__(self, text_lower: str, matcher: "KeywordMatcher", found: Optional[Set[str]] = None):
+        self._text = text_lower
+        self._matcher = matcher
+        # keyword -> present? (fully populated up front when `found` is given)
+        self._known: Dict[str, bool] = {}
+        self._complete = found is not None
+        if found is not None:
+            self._known = dict.fromkeys(matcher.keywords, False)
+            self._known.update(dict.fromkeys(found, True))
+
+    def has(self, keyword: str) -> bool:
+        """Whether a single keyword occurs."""
+        present = self._known.get(keyword)
+        if present is None:
+            # A keyword can only occur if the shorter keyword it contains does
+            required = self._matcher.requires.get(keyword)
+            present = (required is None or self.has(required)) and keyword in self._text
+            self._known[keyword] = present
+        return present
+
+    def any(self, category: str) -> bool:
+        """Whether any keyword of the category occurs."""
+        table = self._matcher.tables.get(category, ())
+        if self._complete:
+            return any(map(self._known.__getitem__, table))
+        return any(self.has(keyword) for keyword in table)
+
+    def matches(self, category: str) -> List[str]:
+        """Keywords of the category that occur, in table order without duplicates."""
+        table = self._matcher.tables.get(category, ())
+        has = self._known.__getitem__ if self._complete else self.has
+        seen = set()
+        return [
+            keyword for keyword in table
+            if has(keyword) and not (keyword in seen or seen.add(keyword))
+        ]
+
+    @property
+    def found(self) -> Set[str]:
+        """Every keyword that occurs, across all categories."""
+        return {keyword for keyword in self._matcher.keywords if self.has(keyword)}
+
+    def by_category(self) -> Dict[str, List[str]]:
+        """Every hit grouped by category (categories without hits are omitted)."""
+        result = {}
+        for category in self._matcher.tables:
+            hits = self.matches(category)
+            if hits:
+                result[category] = hits
+        return result
+
+
+class KeywordMatcher:
+    """
+    Precompiled multi-pattern matcher over named keyword tables.
+
+    By default keywords match as substrings of the lowercased text (the
+    historical `kw in text_lower` semantics). Containment checks use CPython's
+    memchr-accelerated substring search, which benchmarks faster than a
+    regex scan here (see benchmarks/bench_keywords.py); the matcher adds
+    de-duplication across tables, pruning via contained keywords and
+    memoization per message.
+
+    With word_boundary=True keywords must start and end on word boundaries and
+    all of them are found in a single pass of one compiled trie regex.
+    """
+
+    # Texts up to this length are resolved eagerly instead of lazily per keyword
+    EAGER_MAX_CHARS = 512
+
+    def __init__(self, tables: Dict[str, Sequence[str]], word_boundary: bool = False, cache_size: int = 256):
+        """
+        Args:
+            tables: Category name -> keywords (lowercase)
+            word_boundary: Require whole-word matches
+            cache_size: Recent texts whose hits are memoized, so the several
+                        consumers of one message share the same scan
+        """
+        self.tables = {category: [kw.lower() for kw in keywords] for category, keywords in tables.items()}
+        self.word_boundary = word_boundary
+        self.keywords = sorted({kw for keywords in self.tables.values() for kw in keywords})
+
+        # keyword -> longest other keyword it contains (checked first for pruning)
+        self.requires: Dict[str, Optional[str]] = {}
+        for keyword in self.keywords:
+            contained = [other for other in self.keywords if other != keyword and other in keyword]
+            self.requires[keyword] = max(contained, key=len) if contained else None
+
+        self._regex = None
+        if word_boundary:
+            self._regex = re.compile(rf"(?=\b({_trie_pattern(self.keywords)})\b)")
+        self._scan_cached = lru_cache(maxsize=cache_size)(self._scan)
+
+    def scan(self, text: str) -> KeywordHits:
+        """Hits for text; repeated calls for the same text share one result."""
+        return self._scan_cached(text or "")
+
+    def find(self, text: str) -> Set[str]:
+        """Set of all keywords occurring in text."""
+        return self.scan(text).found
+
+    def _scan(self, text: str) -> KeywordHits:
+        with span("keyword_scan"):
+            return self._scan_uncached(text)
+
+    def _scan_uncached(self, text: str) -> KeywordHits:
+        text_lower = text.lower()
+        if self._regex is not None:
+            found = {match.group(1) for match in self._regex.finditer(text_lower)}
+        elif len(text_lower) <= self.EAGER_MAX_CHARS:
+            # Short texts: every containment check is nearly free, so resolve all at once
+            found = {keyword for keyword in self.keywords if keyword in text_lower}
+        else:
+            return KeywordHits(text_lower, self)
+        return KeywordHits(text_lower, self, found)
+
+
+# Shared matcher built once at import (server startup)
+KEYWORD_MATCHER = KeywordMatcher(KEYWORD_TABLES)
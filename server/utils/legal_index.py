@@ -0,0 +1,162 @@
+"""
+Legal Section Index
+Loads legal/indian_laws.json once into a section-keyed map, an inverted
+keyword -> sections index and preformatted citation strings, and reloads
+them when the file changes on disk.
+"""
+
+import os
+import json
+import time
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from utils.keywords import IPC_KEYWORDS, KeywordMatcher
+
+DEFAULT_LEGAL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "legal", "indian_laws.json")
+
+
+@dataclass
+class _IndexData:
+    """One immutable build of the index (swapped atomically on reload)."""
+
+    sections: Dict[str, dict] = field(default_factory=dict)
+    citations: Dict[str, str] = field(default_factory=dict)
+    by_keyword: Dict[str, List[str]] = field(default_factory=dict)
+    # section -> position in match output
+    rank: Dict[str, int] = field(default_factory=dict)
+    matcher: Optional[KeywordMatcher] = None
+    mtime: Optional[float] = None
+
+
+class LegalIndex:
+    """
+    Section lookup and keyword matching over the legal sections file.
+
+    The file may be a dict keyed by section number or a list of objects with a
+    "section" field. Each entry may carry its own "keywords" list and an "act"
+    label (e.g. "BNS"); entries without keywords fall back to IPC_KEYWORDS.
+    """
+
+    def __init__(self, path: str = DEFAULT_LEGAL_PATH, reload_interval_s: float = 5.0):
+        """
+        Args:
+            path: JSON file with the legal sections
+            reload_interval_s: Min seconds between checks for a changed file (0 = never reload)
+        """
+        self.path = path
+        self.reload_interval_s = reload_interval_s
+        self._data = _IndexData()
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self.reloads = 0
+
+    def __len__(self) -> int:
+        return len(self._data.sections)
+
+    def load(self) -> int:
+        """(Re)build the index from disk. Returns the number of sections loaded."""
+        with self._lock:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            self._data = self._build(raw, mtime)
+            self._last_check = time.monotonic()
+            self.reloads += 1
+        return len(self._data.sections)
+
+    @staticmethod
+    def _build(raw, mtime: Optional[float] = None) -> _IndexData:
+        if isinstance(raw, dict):
+            entries = [{"section": key, **value} for key, value in raw.items() if isinstance(value, dict)]
+        elif isinstance(raw, list):
+            entries = [entry for entry in raw if isinstance(entry, dict) and entry.get("section")]
+        else:
+            raise ValueError("Legal sections file must be a JSON object or list")
+
+        sections = {str(entry["section"]): entry for entry in entries}
+        citations = {
+            section: f"⚖️ {entry.get('act', 'IPC')} Section {section}: {entry.get('title', '')} — {entry.get('description', '')}"
+            for section, entry in sections.items()
+        }
+
+        # Default tables first so built-in sections keep their historical order
+        keyword_tables = {section: kws for section, kws in IPC_KEYWORDS.items() if section in sections}
+        for section, entry in sections.items():
+            if entry.get("keywords"):
+                keyword_tables[section] = [kw.lower() for kw in entry["keywords"]]
+
+        by_keyword: Dict[str, List[str]] = {}
+        for section, keywords in keyword_tables.items():
+            for keyword in dict.fromkeys(keywords):
+                by_keyword.setdefault(keyword, []).append(section)
+
+        return _IndexData(
+            sections=sections,
+            citations=citations,
+            by_keyword=by_keyword,
+            rank={section: i for i, section in enumerate(keyword_tables)},
+            matcher=KeywordMatcher(keyword_tables) if keyword_tables else None,
+            mtime=mtime
+        )
+
+    def _maybe_reload(self):
+        """Reload if the file changed since the last build (checked at most every reload_interval_s)."""
+        if not self.reload_interval_s:
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.reload_interval_s:
+            return
+        self._last_check = now
+        try:
+            if os.path.getmtime(self.path) == self._data.mtime:
+                return
+            count = self.load()
+            print(f"🔄 Reloaded {count} legal sections from {os.path.basename(self.path)}")
+        except Exception as e:
+            # Keep serving the previous build until the file is valid again
+            print(f"⚠️  Legal index reload failed: {e}")
+
+    @property
+    def version(self) -> int:
+        """Increments on every (re)load, so derived data can tell when to rebuild."""
+        return self.reloads
+
+    def entries(self) -> Dict[str, dict]:
+        """Snapshot of section -> entry, in file order."""
+        self._maybe_reload()
+        return dict(self._data.sections)
+
+    def get(self, section: str) -> Optional[dict]:
+        """Section entry by number, or None."""
+        self._maybe_reload()
+        return self._data.sections.get(str(section))
+
+    def citation(self, section: str) -> Optional[str]:
+        """Preformatted citation line for a section, or None."""
+        self._maybe_reload()
+        return self._data.citations.get(str(section))
+
+    def sections_for(self, keyword: str) -> List[str]:
+        """Sections tagged with a keyword."""
+        self._maybe_reload()
+        return list(self._data.by_keyword.get(keyword.lower(), ()))
+
+    def match(self, text: str) -> List[str]:
+        """Sections whose keywords occur in text, in index order."""
+        self._maybe_reload()
+        return self._match(self._data, text)
+
+    def match_citations(self, text: str) -> List[str]:
+        """Citation lines for every section matching text."""
+        self._maybe_reload()
+        data = self._data
+        return [data.citations[section] for section in self._match(data, text)]
+
+    @staticmethod
+    def _match(data: _IndexData, text: str) -> List[str]:
+        if data.matcher is None:
+            return []
+        matched = {section for keyword in data.matcher.find(text) for section in data.by_keyword[keyword]}
+        return sorted(matched, key=data.rank.__getitem__)
@@ -0,0 +1,150 @@
+"""
+Semantic Legal Retrieval
+Embeds every legal section once with sentence-transformers, caches the matrix
+on disk as a .npy file (memory-mapped on later starts) and ranks sections for
+a message by cosine similarity.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from utils.legal_index import LegalIndex
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+class LegalRetriever:
+    """Top-k legal sections for a message by embedding similarity."""
+
+    def __init__(
+        self,
+        index: LegalIndex,
+        model_name: str = DEFAULT_EMBEDDING_MODEL,
+        cache_dir: Optional[str] = None,
+        top_k: int = 2,
+        threshold: float = 0.35
+    ):
+        """
+        Args:
+            index: Loaded LegalIndex whose sections are embedded
+            model_name: sentence-transformers model name or local path
+            cache_dir: Where section embeddings are cached (default: legal/.embeddings)
+            top_k: Max sections returned per message
+            threshold: Min cosine similarity for a section to be returned
+        """
+        self.index = index
+        self.model_name = model_name
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(index.path), ".embeddings")
+        self.top_k = top_k
+        self.threshold = threshold
+
+        self._model = None
+        # (matrix, section ids) swapped together so readers never see a torn pair
+        self._state: Tuple[Optional[np.ndarray], List[str]] = (None, [])
+        self._built_version = None
+        self._lock = threading.Lock()
+
+    def _load_model(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            print(f"Loading embedding model: {self.model_name}")
+            self._model = SentenceTransformer(self.model_name, device="cpu")
+        return self._model
+
+    @staticmethod
+    def _section_text(entry: dict) -> str:
+        return f"{entry.get('title', '')}. {entry.get('description', '')}".strip()
+
+    def _cache_path(self, sections: List[str], texts: List[str]) -> str:
+        # Keyed by model and section contents, so edits to the corpus never reuse stale vectors
+        digest = hashlib.sha256()
+        digest.update(self.model_name.encode("utf-8"))
+        for section, text in zip(sections, texts):
+            digest.update(b"\0" + section.encode("utf-8") + b"\0" + text.encode("utf-8"))
+        return os.path.join(self.cache_dir, f"legal_{digest.hexdigest()[:16]}.npy")
+
+    def build(self) -> int:
+        """Load (or compute and cache) the section embedding matrix. Returns the number of rows."""
+        with self._lock:
+            version = self.index.version
+            if self._built_version == version and self._state[0] is not None:
+                return len(self._state[1])
+            entries = self.index.entries()
+            sections = list(entries)
+            texts = [self._section_text(entries[section]) for section in sections]
+            path = self._cache_path(sections, texts)
+
+            if not os.path.exists(path):
+                model = self._load_model()
+                matrix = np.asarray(
+                    model.encode(texts, normalize_embeddings=True, convert_to_numpy=True),
+                    dtype=np.float32
+                ).reshape(len(texts), -1)
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    np.save(f, matrix)
+                os.replace(tmp_path, path)
+                with open(path[:-4] + ".json", "w", encoding="utf-8") as f:
+                    json.dump({"model": self.model_name, "sections": sections}, f)
+                print(f"✅ Embedded {len(sections)} legal sections -> {os.path.basename(path)}")
+
+            # Read-only memory map: pages are shared between workers and loaded on demand
+            self._state = (np.load(path, mmap_mode="r"), sections)
+            self._built_version = version
+            return len(sections)
+
+    def warmup(self):
+        """Load the encoder and run one query so the first request does not pay for it."""
+        self._load_model().encode(["warmup"], normalize_embeddings=True)
+
+    def search(self, text: str) -> List[Tuple[str, float]]:
+        """(section, similarity) pairs above the threshold, best first. Blocking (runs the encoder)."""
+        if self._built_version != self.index.version:
+            self.build()
+        matrix, sections = self._state
+        if matrix is None or not len(sections) or not text:
+            return []
+
+        query = self._load_model().encode([text], normalize_embeddings=True, convert_to_numpy=True)[0]
+        scores = matrix @ np.asarray(query, dtype=np.float32)
+
+        k = min(self.top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(sections[i], float(scores[i])) for i in top if scores[i] >= self.threshold]
+
+    def search_citations(self, text: str) -> List[str]:
+        """Citation lines for the sections returned by search()."""
+        citations = []
+        for section, _ in self.search(text):
+            citation = self.index.citation(section)
+            if citation:
+                citations.append(citation)
+        return citations
+
+
+def create_legal_retriever(index: LegalIndex) -> Optional[LegalRetriever]:
+    """
+    Build the retriever from environment variables, or None when disabled.
+
+    LEGAL_SEMANTIC_SEARCH: "1" (default) to enable
+    LEGAL_EMBEDDING_MODEL, LEGAL_EMBEDDING_CACHE_DIR, LEGAL_TOP_K, LEGAL_MIN_SIMILARITY
+    """
+    if os.getenv("LEGAL_SEMANTIC_SEARCH", "1") != "1":
+        return None
+    retriever = LegalRetriever(
+        index,
+        model_name=os.getenv("LEGAL_EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL),
+        cache_dir=os.getenv("LEGAL_EMBEDDING_CACHE_DIR") or None,
+        top_k=int(os.getenv("LEGAL_TOP_K", 2)),
+        threshold=float(os.getenv("LEGAL_MIN_SIMILARITY", 0.35))
+    )
+    retriever.build()
+    retriever.warmup()
+    return retriever
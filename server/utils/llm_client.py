@@ -0,0 +1,347 @@
+"""
+Resilient LLM Client
+Wraps upstream LLM calls (Gemini) with per-call deadlines, retries with
+jittered backoff on transient errors only, a hedged second request once a
+call runs past the recent p95 latency, and a circuit breaker that fails fast
+while the upstream is down. Transport-agnostic: it calls any coroutine (or
+blocking function) factory, so it can be exercised against a local fake server.
+"""
+
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from utils.metrics import span
+
+# HTTP status codes worth retrying (rate limits and upstream/server errors)
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """The circuit breaker is open; the call was not attempted."""
+
+
+class ReplyUnavailable(Exception):
+    """
+    No LLM reply could be produced, so the caller should answer locally.
+    `reason` is "circuit_open" (not attempted) or "llm_error" (every attempt failed).
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, connection errors and retryable HTTP/gRPC statuses; not bad requests or empty replies."""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    # google.api_core errors expose the HTTP status as `code`
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code in RETRYABLE_STATUS
+    name = type(error).__name__
+    return name in ("ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "ResourceExhausted", "TooManyRequests")
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed: calls pass through. open: calls are rejected until `reset_timeout_s`
+    has passed. half_open: one probe call is let through; its outcome closes or
+    re-opens the circuit. Thread-safe (the sync client path runs in threads).
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout_s: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout_s:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def release_probe(self):
+        """Let another half-open probe through after one ended without an outcome."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.opened += 1
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._probe_in_flight = False
+
+
+class LatencyWindow:
+    """Rolling window of recent successful call latencies (ms)."""
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, ms: float):
+        with self._lock:
+            self._samples.append(ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """q-th percentile of the window, or None until enough samples are in."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class ResilientClient:
+    """Deadline / retry / hedge / circuit-breaker policy around one upstream."""
+
+    def __init__(
+        self,
+        name: str = "llm",
+        deadline_s: float = 15.0,
+        max_attempts: int = 3,
+        backoff_base_s: float = 0.5,
+        backoff_max_s: float = 4.0,
+        hedge: bool = True,
+        hedge_percentile: float = 95.0,
+        hedge_min_ms: float = 500.0,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        """
+        Args:
+            name: Label used in logs and stats
+            deadline_s: Default total budget for one call, retries and hedges included
+            max_attempts: Attempts per call (only transient errors are retried)
+            backoff_base_s / backoff_max_s: Jittered exponential backoff between attempts
+            hedge: Send a second identical request when the first runs past the hedge delay
+            hedge_percentile: Recent latency percentile used as the hedge delay
+            hedge_min_ms: Lower bound on the hedge delay
+            breaker: Circuit breaker shared by every call (a default one if None)
+        """
+        self.name = name
+        self.deadline_s = deadline_s
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_ms = hedge_min_ms
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyWindow()
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "timeouts": 0,
+            "retries": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "short_circuited": 0,
+        }
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] += n
+
+    def _backoff(self, attempt: int) -> float:
+        """Jittered delay before attempt `attempt + 1`."""
+        return random.uniform(0.5, 1.0) * min(self.backoff_max_s, self.backoff_base_s * 2 ** (attempt - 1))
+
+    def hedge_delay_s(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while hedging is off or unwarmed."""
+        if not self.hedge:
+            return None
+        p = self.latency.percentile(self.hedge_percentile)
+        if p is None:
+            return None
+        return max(p, self.hedge_min_ms) / 1000
+
+    def admit(self):
+        """Count a call and raise CircuitOpenError if the breaker rejects it."""
+        self._count("calls")
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+    def record_success(self, latency_ms: Optional[float] = None):
+        """Record a finished call (for callers that drive the upstream themselves, e.g. streams)."""
+        if latency_ms is not None:
+            self.latency.add(latency_ms)
+        self._count("successes")
+        self.breaker.record_success()
+
+    def record_failure(self, error: BaseException):
+        """Record a failed call; only transient upstream errors count against the breaker."""
+        self._count("failures")
+        if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+            self._count("timeouts")
+        # A rejected request still means the upstream is up
+        if is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    async def call(self, factory: Callable[[], Awaitable[Any]], deadline_s: Optional[float] = None) -> Any:
+        """
+        Await `factory()` under the policy and return its result.
+
+        Raises CircuitOpenError without calling when the breaker is open, and the
+        last error once attempts or the deadline run out.
+        """
+        self.admit()
+        with span(self.name):
+            return await self._call(factory, deadline_s)
+
+    async def _call(self, factory: Callable[[], Awaitable[Any]], deadline_s: Optional[float]) -> Any:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (deadline_s or self.deadline_s)
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                with span(f"{self.name}.attempt"):
+                    result = await self._attempt(factory, deadline)
+            except asyncio.CancelledError:
+                # Caller gave up (e.g. a stage timeout): no verdict, but free a half-open probe slot
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                delay = self._backoff(attempt)
+                if not is_retryable(e) or attempt >= self.max_attempts or loop.time() + delay >= deadline:
+                    self.record_failure(e)
+                    raise
+                self._count("retries")
+                print(f"🔄 {self.name} attempt {attempt} failed ({type(e).__name__}); retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+            self.record_success()
+            return result
+
+    async def _attempt(self, factory: Callable[[], Awaitable[Any]], deadline: float) -> Any:
+        """One attempt: the request plus, if it runs long, a hedged duplicate. First success wins."""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        tasks = [asyncio.ensure_future(factory())]
+        try:
+            hedge_after = self.hedge_delay_s()
+            if hedge_after is not None and loop.time() + hedge_after < deadline:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+                if not done:
+                    self._count("hedges")
+                    tasks.append(asyncio.ensure_future(factory()))
+
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            self._count("hedge_wins")
+                        self.latency.add((time.perf_counter() - started) * 1000)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def call_sync(self, fn: Callable[[], Any]) -> Any:
+        """Blocking counterpart of `call` for the sync code path (retries and breaker, no hedging)."""
+        self.admit()
+        with span(self.name):
+            return self._call_sync(fn)
+
+    def _call_sync(self, fn: Callable[[], Any]) -> Any:
+        deadline = time.monotonic() + self.deadline_s
+        attempt = 0
+        while True:
+            attempt += 1
+            started = time.perf_counter()
+            try:
+                with span(f"{self.name}.attempt"):
+                    result = fn()
+            except Exception as e:
+                delay = self._backoff(attempt)
+                if not is_retryable(e) or attempt >= self.max_attempts or time.monotonic() + delay >= deadline:
+                    self.record_failure(e)
+                    raise
+                self._count("retries")
+                print(f"🔄 {self.name} attempt {attempt} failed ({type(e).__name__}); retrying in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+            self.record_success((time.perf_counter() - started) * 1000)
+            return result
+
+    def stats(self) -> dict:
+        """Counters, breaker state and recent latency percentiles."""
+        with self._lock:
+            counters = dict(self.counters)
+        hedge_delay = self.hedge_delay_s()
+        return {
+            **counters,
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.opened,
+            "latency_p50_ms": self.latency.percentile(50),
+            "latency_p95_ms": self.latency.percentile(95),
+            "hedge_delay_ms": round(hedge_delay * 1000, 1) if hedge_delay is not None else None,
+        }
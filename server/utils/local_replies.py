@@ -0,0 +1,66 @@
+"""
+Local Replies
+Templated replies chosen by detected emotion and harassment severity, used
+when Gemini is skipped, shed, too slow for the reply budget, or not loaded
+(classifier-only mode). No network calls, so they are always available.
+"""
+
+from typing import Optional
+
+# Opening line per system emotion (see EmotionModel.EMOTION_MAPPING, plus keyword-detected anxiety)
+EMOTION_OPENERS = {
+    "sad": "I'm really sorry you're feeling this low.",
+    "angry": "It makes sense that you're angry about this.",
+    "fear": "That sounds frightening, and your safety matters most.",
+    "anxiety": "It sounds like this is weighing on you a lot right now.",
+    "happy": "I'm glad you shared this with me.",
+    "calm": "Thank you for sharing this with me.",
+    "neutral": "Thank you for sharing this with me.",
+}
+DEFAULT_OPENER = "Thank you for telling me about this."
+
+# Follow-up per harassment severity
+SEVERITY_FOLLOWUPS = {
+    "High": (
+        "What you're describing is serious and not okay. Please prioritize your safety. "
+        "You can reach out to the authorities or someone you trust right away. "
+        "You don't have to face this alone 💜"
+    ),
+    "Medium": (
+        "Nobody should have to put up with this. You might want to report or block the person involved. "
+        "You deserve to feel safe and respected 💜"
+    ),
+    "Low": (
+        "I'm here to listen. Would you like to tell me more about what's going on? "
+        "Your feelings matter and you're not alone in this 🌟"
+    ),
+}
+
+# Notification replies per severity (the /api/trigger-support fallback)
+SUPPORT_MESSAGES = {
+    "High": (
+        "This sounds extremely serious, and I'm deeply sorry you're going through this. "
+        "Please prioritize your safety. You can reach out to authorities or trusted friends immediately. "
+        "I'm here with you 💜"
+    ),
+    "Medium": (
+        "That message sounds really hurtful. I'm here to support you. "
+        "You might want to report or block the person involved. "
+        "You deserve to feel safe and respected 💜"
+    ),
+    "Low": (
+        "I noticed something that might be bothering you. "
+        "Please remember, you're not alone — I'm here to listen 💜"
+    ),
+}
+
+
+def local_reply(emotion: Optional[str], severity: str) -> str:
+    """Chat reply for an emotion × severity pair."""
+    opener = EMOTION_OPENERS.get((emotion or "").lower(), DEFAULT_OPENER)
+    return f"{opener} {SEVERITY_FOLLOWUPS.get(severity, SEVERITY_FOLLOWUPS['Low'])}"
+
+
+def support_message(severity: str) -> str:
+    """Supportive reply for a notification of the given severity."""
+    return SUPPORT_MESSAGES.get(severity, SUPPORT_MESSAGES["Low"])
@@ -0,0 +1,237 @@
+"""
+Append-only Log Store
+JSON Lines segments fed by an in-memory queue and written in batches by a
+background thread, with size/age-based rotation and segment retention.
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+
+class JsonlLogStore:
+    """
+    Append-only JSON Lines log for one stream (e.g. "analytics" or "incidents").
+
+    The active segment is `<stream>.jsonl`; rotated segments are renamed to
+    `<stream>.<epoch_ms>.jsonl` and only the newest `max_segments` are kept.
+    Callers never touch the file: `append` enqueues and returns immediately.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        stream: str,
+        max_segment_bytes: int = 5 * 1024 * 1024,
+        max_segment_age_s: float = 24 * 3600,
+        max_segments: int = 10,
+        flush_interval_s: float = 1.0,
+        max_batch: int = 500,
+        max_queue: int = 10000
+    ):
+        """
+        Initialize the store and start its flusher thread.
+
+        Args:
+            directory: Directory holding the segments
+            stream: Stream name used as the file prefix
+            max_segment_bytes: Rotate the active segment once it exceeds this size
+            max_segment_age_s: Rotate the active segment once it is this old
+            max_segments: Rotated segments to retain (older ones are deleted)
+            flush_interval_s: Max delay before queued entries reach disk
+            max_batch: Max entries written per batch
+            max_queue: Queue capacity; entries beyond it are dropped and counted
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.stream = stream
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age_s = max_segment_age_s
+        self.max_segments = max_segments
+        self.flush_interval_s = flush_interval_s
+        self.max_batch = max_batch
+
+        self.active_path = self.directory / f"{stream}.jsonl"
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._file = None
+        self._segment_bytes = 0
+        self._segment_started = time.time()
+        self._closed = threading.Event()
+
+        # Counters for monitoring
+        self.written = 0
+        self.dropped = 0
+
+        self._open_active()
+        self._thread = threading.Thread(
+            target=self._run, name=f"log-store-{stream}", daemon=True
+        )
+        self._thread.start()
+
+    def append(self, entry: dict) -> bool:
+        """Queue an entry for writing. Returns False if the queue is full and it was dropped."""
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self):
+        """Write everything queued so far (blocking)."""
+        while True:
+            batch = self._drain(block=False)
+            if not batch:
+                break
+            self._write(batch)
+
+    def close(self):
+        """Stop the flusher thread and write any remaining entries."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._thread.join(timeout=5)
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def segments(self) -> List[Path]:
+        """All segment paths, oldest first, ending with the active segment."""
+        rotated = sorted(
+            self.directory.glob(f"{self.stream}.*.jsonl"),
+            key=self._segment_sort_key
+        )
+        if self.active_path.exists():
+            rotated.append(self.active_path)
+        return rotated
+
+    def iter_entries(self) -> Iterator[dict]:
+        """Yield every retained entry, oldest first. Corrupt lines are skipped."""
+        self.flush()
+        for path in self.segments():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            yield json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+            except FileNotFoundError:
+                # Segment rotated out while reading
+                continue
+
+    def _segment_sort_key(self, path: Path) -> int:
+        """Sort rotated segments by the epoch-ms suffix in their name."""
+        try:
+            return int(path.name[len(self.stream) + 1:-len(".jsonl")])
+        except ValueError:
+            return 0
+
+    def _open_active(self):
+        """Open (or create) the active segment in append mode."""
+        self._file = open(self.active_path, "a", encoding="utf-8")
+        self._segment_bytes = self.active_path.stat().st_size
+        if self._segment_bytes:
+            self._segment_started = os.path.getctime(self.active_path)
+        else:
+            self._segment_started = time.time()
+
+    def _should_rotate(self) -> bool:
+        if self._segment_bytes == 0:
+            return False
+        if self._segment_bytes >= self.max_segment_bytes:
+            return True
+        return time.time() - self._segment_started >= self.max_segment_age_s
+
+    def _rotate(self):
+        """Close the active segment, rename it, open a fresh one and apply retention."""
+        self._file.close()
+        suffix = int(time.time() * 1000)
+        rotated = self.directory / f"{self.stream}.{suffix}.jsonl"
+        while rotated.exists():
+            suffix += 1
+            rotated = self.directory / f"{self.stream}.{suffix}.jsonl"
+        os.replace(self.active_path, rotated)
+        self._open_active()
+
+        stale = self.segments()[:-1]
+        for path in stale[:max(len(stale) - self.max_segments, 0)]:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _drain(self, block: bool) -> List[dict]:
+        """Take up to max_batch entries from the queue."""
+        batch = []
+        try:
+            if block:
+                batch.append(self._queue.get(timeout=self.flush_interval_s))
+            while len(batch) < self.max_batch:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write(self, batch: List[dict]):
+        """Write one batch as a single append, rotating first if needed."""
+        data = "".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in batch)
+        with self._lock:
+            try:
+                if self._should_rotate():
+                    self._rotate()
+                self._file.write(data)
+                self._file.flush()
+                self._segment_bytes += len(data.encode("utf-8"))
+                self.written += len(batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                print(f"Error writing {self.stream} log batch: {e}")
+
+    def _run(self):
+        """Flusher loop: wait for entries, then write them in batches."""
+        while not self._closed.is_set():
+            batch = self._drain(block=True)
+            if batch:
+                self._write(batch)
+
+
+def migrate_legacy_json(legacy_file: str, stores: dict) -> Optional[int]:
+    """
+    Import entries from the old single-file JSON log into JSONL stores.
+
+    Args:
+        legacy_file: Path to the old `{"incidents": [...], "analytics": [...]}` file
+        stores: Mapping of key in that file -> JsonlLogStore
+
+    Returns:
+        Number of entries migrated, or None if there was nothing to migrate
+    """
+    if not os.path.exists(legacy_file):
+        return None
+    try:
+        with open(legacy_file, "r") as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"⚠️  Could not read legacy log {legacy_file}: {e}")
+        return None
+
+    migrated = 0
+    for key, store in stores.items():
+        for entry in data.get(key, []):
+            store.append(entry)
+            migrated += 1
+        store.flush()
+
+    os.replace(legacy_file, legacy_file + ".migrated")
+    return migrated
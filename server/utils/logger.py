@@ -6,39 +6,104 @@ Logs severity and emotional tone (not user text) for monitoring.
 
 import os
 import json
+import time
+import threading
 from datetime import datetime
 from typing import Optional
 from pathlib import Path
-from datetime import datetime
+
+from utils.log_store import JsonlLogStore, migrate_legacy_json
+from utils.notifier import record_interaction
+from utils.stats import AnalyticsAggregator, entry_timestamp
 
 
 class HarassmentLogger:
     """Logs emotion analysis, harassment incidents, and response metrics for analytics."""
     
-    def __init__(self, log_file: Optional[str] = None):
+    def __init__(self, log_dir: Optional[str] = None, worker_id: Optional[str] = None):
         """
         Initialize logger.
         
         Args:
-            log_file: Optional path to log file. Defaults to 'harassment_logs.json' in server directory.
+            log_dir: Optional directory for the JSONL log segments. Defaults to 'server/logs'.
+            worker_id: Worker slot under the prefork launcher (defaults to WORKER_ID). Each
+                worker writes, rotates and snapshots its own files, so stats are per worker.
         """
-        if log_file is None:
-            # Default to server/logs/analytics_logs.json
-            log_dir = Path(__file__).parent.parent / "logs"
-            log_dir.mkdir(exist_ok=True)
-            log_file = str(log_dir / "analytics_logs.json")
+        if log_dir is None:
+            log_dir = str(Path(__file__).parent.parent / "logs")
+        Path(log_dir).mkdir(parents=True, exist_ok=True)
+        self.log_dir = log_dir
+        if worker_id is None:
+            worker_id = os.getenv("WORKER_ID", "")
+        self.worker_id = worker_id
+        # "-w<slot>" rather than "." so one worker's segment glob never matches another's files
+        suffix = f"-w{worker_id}" if worker_id else ""
+        
+        store_options = {
+            "max_segment_bytes": int(os.getenv("LOG_SEGMENT_MAX_BYTES", 5 * 1024 * 1024)),
+            "max_segment_age_s": float(os.getenv("LOG_SEGMENT_MAX_AGE_S", 24 * 3600)),
+            "max_segments": int(os.getenv("LOG_MAX_SEGMENTS", 10)),
+            "flush_interval_s": float(os.getenv("LOG_FLUSH_INTERVAL_S", 1.0)),
+        }
+        self.incidents = JsonlLogStore(log_dir, "incidents" + suffix, **store_options)
+        self.analytics = JsonlLogStore(log_dir, "analytics" + suffix, **store_options)
         
-        self.log_file = log_file
-        self._ensure_log_file()
+        # One-time import of the old read-modify-write JSON file (by the first worker only)
+        if worker_id in ("", "0"):
+            migrated = migrate_legacy_json(
+                os.path.join(log_dir, "analytics_logs.json"),
+                {"incidents": self.incidents, "analytics": self.analytics}
+            )
+            if migrated:
+                print(f"✅ Migrated {migrated} entries from analytics_logs.json")
+        
+        # Running aggregates so stats queries never rescan the logs
+        self.stats = AnalyticsAggregator()
+        self.snapshot_file = os.path.join(log_dir, f"stats_snapshot{suffix}.json")
+        self.snapshot_interval_s = float(os.getenv("STATS_SNAPSHOT_INTERVAL_S", 30))
+        self._restore_stats()
+        
+        self._stop = threading.Event()
+        self._snapshot_thread = threading.Thread(
+            target=self._snapshot_loop, name="stats-snapshot", daemon=True
+        )
+        self._snapshot_thread.start()
     
-    def _ensure_log_file(self):
-        """Ensure log file exists with proper structure."""
-        if not os.path.exists(self.log_file):
-            with open(self.log_file, 'w') as f:
-                json.dump({
-                    "incidents": [],
-                    "analytics": []
-                }, f, indent=2)
+    def _restore_stats(self):
+        """Load the last snapshot, then replay log entries written after it."""
+        saved_at = None
+        try:
+            with open(self.snapshot_file, "r") as f:
+                data = json.load(f)
+            self.stats.load_snapshot(data)
+            saved_at = data.get("saved_at")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️  Could not load stats snapshot, rebuilding from logs: {e}")
+            self.stats = AnalyticsAggregator()
+        
+        for store, record in ((self.incidents, self.stats.record_incident),
+                              (self.analytics, self.stats.record_analytics)):
+            for entry in store.iter_entries():
+                if saved_at is None or entry_timestamp(entry) > saved_at:
+                    record(entry)
+    
+    def save_snapshot(self):
+        """Persist the running aggregates atomically."""
+        data = self.stats.snapshot()
+        data["saved_at"] = time.time()
+        tmp_file = self.snapshot_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_file, self.snapshot_file)
+    
+    def _snapshot_loop(self):
+        while not self._stop.wait(self.snapshot_interval_s):
+            try:
+                self.save_snapshot()
+            except Exception as e:
+                print(f"Error saving stats snapshot: {e}")
     
     def log_incident(
         self,
@@ -67,27 +132,9 @@ class HarassmentLogger:
         if response_time_ms is not None:
             incident["response_time_ms"] = round(response_time_ms, 2)
         
-        try:
-            # Read existing logs
-            with open(self.log_file, 'r') as f:
-                data = json.load(f)
-            
-            # Append new incident
-            if "incidents" not in data:
-                data["incidents"] = []
-            data["incidents"].append(incident)
-            
-            # Keep only last 1000 incidents to prevent file from growing too large
-            if len(data["incidents"]) > 1000:
-                data["incidents"] = data["incidents"][-1000:]
-            
-            # Write back
-            with open(self.log_file, 'w') as f:
-                json.dump(data, f, indent=2)
-        
-        except Exception as e:
-            print(f"Error logging incident: {e}")
-            # Non-critical error, don't fail the request
+        # Queued for the background writer; never blocks the request
+        self.incidents.append(incident)
+        self.stats.record_incident(incident)
     
     def log_analytics(
         self,
@@ -114,82 +161,51 @@ class HarassmentLogger:
             # Note: We do NOT log the user message for privacy
         }
         
+        self.analytics.append(analytics_entry)
+        self.stats.record_analytics(analytics_entry)
+    
+    def close(self):
+        """Flush queued entries, persist aggregates and stop the background writers."""
+        self._stop.set()
+        self.incidents.close()
+        self.analytics.close()
         try:
-            # Read existing logs
-            with open(self.log_file, 'r') as f:
-                data = json.load(f)
-            
-            # Append analytics entry
-            if "analytics" not in data:
-                data["analytics"] = []
-            data["analytics"].append(analytics_entry)
-            
-            # Keep only last 5000 analytics entries
-            if len(data["analytics"]) > 5000:
-                data["analytics"] = data["analytics"][-5000:]
-            
-            # Write back
-            with open(self.log_file, 'w') as f:
-                json.dump(data, f, indent=2)
-        
+            self.save_snapshot()
         except Exception as e:
-            print(f"Error logging analytics: {e}")
-            # Non-critical error, don't fail the request
+            print(f"Error saving stats snapshot: {e}")
     
     def get_stats(self) -> dict:
         """
         Get statistics about logged incidents.
         
+        Served from running aggregates, so the cost does not depend on log size.
+        
         Returns:
             Dictionary with incident statistics
         """
         try:
-            with open(self.log_file, 'r') as f:
-                data = json.load(f)
-            
-            incidents = data.get("incidents", [])
-            
-            if not incidents:
-                return {
-                    "total_incidents": 0,
-                    "average_severity": 0.0,
-                    "most_common_emotion": None
-                }
-            
-            total = len(incidents)
-            avg_severity = sum(i["severity"] for i in incidents) / total
-            
-            # Count emotions
-            emotion_counts = {}
-            for incident in incidents:
-                emotion = incident.get("emotion", "unknown")
-                emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
-            
-            most_common_emotion = max(emotion_counts.items(), key=lambda x: x[1])[0] if emotion_counts else None
-            
-            return {
-                "total_incidents": total,
-                "average_severity": round(avg_severity, 3),
-                "most_common_emotion": most_common_emotion,
-                "emotion_distribution": emotion_counts
-            }
-        
+            return self.stats.incident_stats()
         except Exception as e:
             print(f"Error getting stats: {e}")
             return {"error": str(e)}
+    
+    def get_rollups(self, window: Optional[str] = None) -> dict:
+        """
+        Get all-time totals and last minute/hour/day rollups.
+        
+        Args:
+            window: Optional single window name ("minute", "hour" or "day")
+        """
+        return self.stats.summary(window)
 
 
 def log_user_interaction(user_id: str, message: str, emotion: str, harassment_level: str) -> None:
-    """Append a single line interaction log including the original message (per requirement)."""
+    """
+    Queue a single line for the interaction log including the original message (per requirement).
+    The line is written to `interactions.log` by the event bus, off the request path.
+    """
     try:
-        log_dir = Path(__file__).parent.parent / "logs"
-        log_dir.mkdir(exist_ok=True)
-        log_file = log_dir / "interactions.log"
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(
-                f"[{timestamp}] User: {user_id} | Emotion: {emotion} | Harassment: {harassment_level} | Message: {message}\n"
-            )
+        record_interaction(user_id, message, emotion, harassment_level)
     except Exception as e:
-        print(f"Error writing interaction log: {e}")
+        print(f"Error queueing interaction log: {e}")
 
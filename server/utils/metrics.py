@@ -0,0 +1,255 @@
+"""
+Metrics and Tracing
+In-process counters, gauges and histograms rendered in the Prometheus text
+format, plus `span()` timers that feed a per-stage latency histogram and,
+inside a traced request, the request's own list of spans (used for the
+Server-Timing debug header).
+"""
+
+import math
+import time
+import threading
+import contextvars
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Histogram bucket upper bounds in seconds (sub-ms keyword scans up to slow Gemini calls)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (
+        '{}="{}"'.format(name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples())
+        return lines
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Exposition lines for every label set."""
+
+
+class Counter(_Metric):
+    """Monotonic counter per label set."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down per label set."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram per label set (values in seconds)."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., sum, count]
+        self._values: Dict[LabelKey, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {state[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {state[-1]}")
+        return lines
+
+
+class Registry:
+    """Named metrics plus collector callbacks that report other components' counters at scrape time."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        # Each collector returns (name, type, help, labels, value) samples
+        self._collectors: List[Callable[[], Iterable[tuple]]] = []
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help_text: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._get(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._get(Gauge, name, help_text)
+
+    def histogram(self, name: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    def add_collector(self, collector: Callable[[], Iterable[tuple]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Prometheus text exposition of every metric and collector sample."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        grouped: Dict[str, tuple] = {}
+        for collector in self._collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                print(f"⚠️ Metrics collector failed: {e}")
+                continue
+            for name, kind, help_text, labels, value in samples:
+                if value is None:
+                    continue
+                entry = grouped.setdefault(name, (kind, help_text, []))
+                entry[2].append(f"{name}{_format_labels(_label_key(labels))} {_format_value(value)}")
+        for name, (kind, help_text, samples) in grouped.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+SPAN_SECONDS = REGISTRY.histogram("empathai_span_duration_seconds", "Duration of traced request stages")
+SPAN_ERRORS = REGISTRY.counter("empathai_span_errors_total", "Traced stages that raised")
+
+# Spans of the request being handled: list of (name, ms), or None outside a traced request
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("empathai_trace", default=None)
+
+
+def start_trace() -> contextvars.Token:
+    """Begin collecting spans for the current request (tasks created from here inherit it)."""
+    return _current_trace.set([])
+
+
+def end_trace(token: contextvars.Token) -> List[Tuple[str, float]]:
+    """Stop collecting and return the request's spans."""
+    spans = _current_trace.get() or []
+    _current_trace.reset(token)
+    return spans
+
+
+def observe_span(name: str, ms: float, **labels):
+    """Record a duration measured elsewhere (e.g. stage timings) as a span."""
+    SPAN_SECONDS.observe(ms / 1000, span=name, **labels)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.append((name, ms))
+
+
+@contextmanager
+def span(name: str, **labels):
+    """Time a block into the span histogram and the current request trace."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        SPAN_ERRORS.inc(span=name, **labels)
+        raise
+    finally:
+        observe_span(name, (time.perf_counter() - started) * 1000, **labels)
+
+
+def server_timing(spans: List[Tuple[str, float]]) -> str:
+    """Server-Timing header value; repeated span names are numbered (e.g. forward, forward-2)."""
+    seen: Dict[str, int] = {}
+    parts = []
+    for name, ms in spans:
+        seen[name] = seen.get(name, 0) + 1
+        token = "".join(c if c.isalnum() or c in "-_" else "-" for c in name)
+        if seen[name] > 1:
+            token = f"{token}-{seen[name]}"
+        parts.append(f"{token};dur={ms:.2f}")
+    return ", ".join(parts)
@@ -1,21 +1,351 @@
+"""
+Alert and Interaction Event Bus
+Request handlers publish alert and interaction events without blocking: each
+sink (stdout, file, webhook) has its own bounded queue drained in batches by a
+background thread, so a slow sink never delays a reply or the other sinks.
+Repeated alerts for the same user are suppressed within a window unless the
+severity escalates; full queues drop events and count them.
+"""
+
+import os
+import json
+import time
+import queue
 import datetime
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from utils.metrics import REGISTRY
+from utils.severity import SEVERITY_RANK
 
-def trigger_alert(user_id: str, message: str, severity: str, score: float) -> None:
-    """Console-based alert hook for Medium/High harassment events."""
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(
-        """
+EVENTS_PUBLISHED = REGISTRY.counter("empathai_events_published_total", "Alert/interaction events accepted by the bus")
+EVENTS_DEDUPLICATED = REGISTRY.counter("empathai_events_deduplicated_total", "Repeated alerts suppressed within the dedup window")
+EVENTS_DROPPED = REGISTRY.counter("empathai_events_dropped_total", "Events dropped because a sink queue was full")
+EVENTS_DELIVERED = REGISTRY.counter("empathai_events_delivered_total", "Events delivered by each sink")
+SINK_ERRORS = REGISTRY.counter("empathai_event_sink_errors_total", "Failed sink deliveries (batches)")
+
+
+@dataclass
+class Event:
+    """One alert or interaction record."""
+
+    kind: str  # "alert" or "interaction"
+    user_id: str
+    message: str
+    severity: str
+    score: Optional[float] = None
+    emotion: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+
+    def local_time(self) -> str:
+        return datetime.datetime.fromtimestamp(self.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class Sink(ABC):
+    """Delivery target for batches of events of the given kinds."""
+
+    name = "sink"
+
+    def __init__(self, kinds: Iterable[str]):
+        self.kinds = frozenset(kinds)
+
+    @abstractmethod
+    def deliver(self, events: List[Event]):
+        """Deliver one batch; raising counts the batch as failed."""
+
+    def close(self):
+        pass
+
+
+class StdoutSink(Sink):
+    """Prints the multi-line console alert."""
+
+    name = "stdout"
+
+    def __init__(self, kinds: Iterable[str] = ("alert",)):
+        super().__init__(kinds)
+
+    def deliver(self, events: List[Event]):
+        for event in events:
+            print(
+                f"""
 🚨 ALERT: Harassment Detected!
-🧍 User: {user_id}
-🧩 Severity: {severity} ({score:.2f})
-💬 Message: {message}
-⏰ Time: {timestamp}
-""".format(
-            user_id=user_id,
-            severity=severity,
-            score=score,
-            message=message,
-            timestamp=timestamp,
+🧍 User: {event.user_id}
+🧩 Severity: {event.severity} ({(event.score or 0.0):.2f})
+💬 Message: {event.message}
+⏰ Time: {event.local_time()}
+"""
+            )
+
+
+class FileSink(Sink):
+    """
+    Appends events to a file, one batch per write. Interactions keep the
+    `interactions.log` line format; other kinds are written as JSON lines.
+    """
+
+    def __init__(self, path: str, kinds: Iterable[str], name: str = "file"):
+        super().__init__(kinds)
+        self.name = name
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    @staticmethod
+    def format(event: Event) -> str:
+        if event.kind == "interaction":
+            return (
+                f"[{event.local_time()}] User: {event.user_id} | Emotion: {event.emotion} | "
+                f"Harassment: {event.severity} | Message: {event.message}\n"
+            )
+        return json.dumps(asdict(event), ensure_ascii=False) + "\n"
+
+    def deliver(self, events: List[Event]):
+        self._file.write("".join(self.format(event) for event in events))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class WebhookSink(Sink):
+    """POSTs each batch as `{"events": [...]}` JSON to a webhook URL."""
+
+    name = "webhook"
+
+    def __init__(self, url: str, kinds: Iterable[str] = ("alert",), timeout_s: float = 5.0):
+        import requests
+
+        super().__init__(kinds)
+        self.url = url
+        self.timeout_s = timeout_s
+        self.http = requests.Session()
+
+    def deliver(self, events: List[Event]):
+        response = self.http.post(
+            self.url, json={"events": [asdict(event) for event in events]}, timeout=self.timeout_s
         )
+        response.raise_for_status()
+
+    def close(self):
+        self.http.close()
+
+
+class _SinkWorker:
+    """Bounded queue plus the thread that drains it into one sink."""
+
+    def __init__(self, sink: Sink, max_queue: int, batch_size: int, flush_interval_s: float):
+        self.sink = sink
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_s = flush_interval_s
+        self.queue: "queue.Queue[Event]" = queue.Queue(maxsize=max_queue)
+        self._closed = threading.Event()
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, name=f"event-sink-{sink.name}", daemon=True)
+        self._thread.start()
+
+    def offer(self, event: Event) -> bool:
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            EVENTS_DROPPED.inc(sink=self.sink.name)
+            return False
+
+    def _drain(self, block: bool) -> List[Event]:
+        batch = []
+        try:
+            if block:
+                batch.append(self.queue.get(timeout=self.flush_interval_s))
+            while len(batch) < self.batch_size:
+                batch.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _deliver(self, batch: List[Event]):
+        try:
+            self.sink.deliver(batch)
+        except Exception as e:
+            self.errors += 1
+            SINK_ERRORS.inc(sink=self.sink.name)
+            print(f"⚠️ Event sink '{self.sink.name}' failed to deliver {len(batch)} events: {e}")
+            return
+        self.delivered += len(batch)
+        EVENTS_DELIVERED.inc(len(batch), sink=self.sink.name)
+
+    def _run(self):
+        while not self._closed.is_set():
+            batch = self._drain(block=True)
+            if batch:
+                self._deliver(batch)
+
+    def close(self, timeout_s: float):
+        """Stop the thread, then deliver what is still queued."""
+        self._closed.set()
+        self._thread.join(timeout=timeout_s)
+        while True:
+            batch = self._drain(block=False)
+            if not batch:
+                break
+            self._deliver(batch)
+        self.sink.close()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+
+class EventBus:
+    """Fans events out to sink workers; `publish` never blocks on delivery."""
+
+    def __init__(
+        self,
+        sinks: Iterable[Sink],
+        max_queue: int = 10000,
+        batch_size: int = 100,
+        flush_interval_s: float = 0.5,
+        dedup_window_s: float = 300.0
+    ):
+        """
+        Args:
+            sinks: Delivery targets; each only receives the kinds it lists
+            max_queue: Per-sink queue capacity; events beyond it are dropped and counted
+            batch_size: Max events handed to a sink at once
+            flush_interval_s: Max delay before a queued event is delivered
+            dedup_window_s: Repeated alerts for a user within this window are suppressed
+                unless the severity is higher (`0` disables)
+        """
+        self.workers = [_SinkWorker(sink, max_queue, batch_size, flush_interval_s) for sink in sinks]
+        self.dedup_window_s = dedup_window_s
+        # user_id -> (last alert time, highest severity rank alerted in the window)
+        self._last_alert: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        self.published = 0
+        self.deduplicated = 0
+        self.pid = os.getpid()
+
+    def _is_duplicate(self, event: Event) -> bool:
+        if event.kind != "alert" or self.dedup_window_s <= 0:
+            return False
+        rank = SEVERITY_RANK.get(event.severity, 0)
+        with self._lock:
+            last = self._last_alert.get(event.user_id)
+            if last is not None and event.timestamp - last[0] < self.dedup_window_s and rank <= last[1]:
+                return True
+            self._last_alert[event.user_id] = (event.timestamp, rank)
+            if len(self._last_alert) > 10000:
+                cutoff = event.timestamp - self.dedup_window_s
+                self._last_alert = {user: seen for user, seen in self._last_alert.items() if seen[0] >= cutoff}
+        return False
+
+    def publish(self, event: Event) -> bool:
+        """Queue the event for every sink that takes its kind. False if it was suppressed."""
+        if self._is_duplicate(event):
+            self.deduplicated += 1
+            EVENTS_DEDUPLICATED.inc(kind=event.kind)
+            return False
+        self.published += 1
+        EVENTS_PUBLISHED.inc(kind=event.kind)
+        for worker in self.workers:
+            if event.kind in worker.sink.kinds:
+                worker.offer(event)
+        return True
+
+    def close(self, timeout_s: float = 5.0):
+        """Deliver queued events and stop the sink threads."""
+        for worker in self.workers:
+            worker.close(timeout_s)
+
+    def stats(self) -> dict:
+        return {
+            "published": self.published,
+            "deduplicated": self.deduplicated,
+            "sinks": {worker.sink.name: worker.stats() for worker in self.workers},
+        }
+
+
+def create_event_bus() -> EventBus:
+    """Bus configured from the environment (ALERT_SINKS, ALERT_WEBHOOK_URL, ...)."""
+    log_dir = Path(__file__).parent.parent / "logs"
+    names = {name.strip() for name in os.getenv("ALERT_SINKS", "stdout").split(",") if name.strip()}
+    webhook_url = os.getenv("ALERT_WEBHOOK_URL")
+    if webhook_url:
+        names.add("webhook")
+
+    # The interaction log is always written, as before
+    sinks: List[Sink] = [FileSink(str(log_dir / "interactions.log"), kinds=("interaction",), name="interactions")]
+    if "stdout" in names:
+        sinks.append(StdoutSink())
+    if "file" in names:
+        sinks.append(FileSink(str(log_dir / "alerts.jsonl"), kinds=("alert",), name="alerts"))
+    if "webhook" in names:
+        if webhook_url:
+            sinks.append(WebhookSink(webhook_url, timeout_s=float(os.getenv("ALERT_WEBHOOK_TIMEOUT_S", 5))))
+        else:
+            print("⚠️ ALERT_SINKS includes webhook but ALERT_WEBHOOK_URL is not set")
+
+    return EventBus(
+        sinks,
+        max_queue=int(os.getenv("ALERT_QUEUE_SIZE", 10000)),
+        batch_size=int(os.getenv("ALERT_BATCH_SIZE", 100)),
+        flush_interval_s=float(os.getenv("ALERT_FLUSH_INTERVAL_S", 0.5)),
+        dedup_window_s=float(os.getenv("ALERT_DEDUP_WINDOW_S", 300)),
+    )
+
+
+_bus: Optional[EventBus] = None
+_bus_lock = threading.Lock()
+
+
+def get_event_bus() -> EventBus:
+    """Process-wide bus, created on first use (and again in a forked worker, whose threads did not survive the fork)."""
+    global _bus
+    if _bus is None or _bus.pid != os.getpid():
+        with _bus_lock:
+            if _bus is None or _bus.pid != os.getpid():
+                _bus = create_event_bus()
+    return _bus
+
+
+def close_event_bus():
+    """Flush and stop the bus if one was created in this process."""
+    global _bus
+    with _bus_lock:
+        if _bus is not None and _bus.pid == os.getpid():
+            _bus.close()
+        _bus = None
+
+
+def trigger_alert(user_id: str, message: str, severity: str, score: float) -> bool:
+    """Queue an alert for Medium/High harassment events. False if suppressed as a repeat."""
+    return get_event_bus().publish(Event(kind="alert", user_id=user_id, message=message, severity=severity, score=score))
+
+
+def record_interaction(user_id: str, message: str, emotion: str, harassment_level: str) -> bool:
+    """Queue one line for the interaction log."""
+    return get_event_bus().publish(
+        Event(kind="interaction", user_id=user_id, message=message, severity=harassment_level, emotion=emotion)
     )
+
+
+def _collect_queue_depth():
+    bus = _bus
+    if bus is None or bus.pid != os.getpid():
+        return
+    for worker in bus.workers:
+        yield ("empathai_event_queue_depth", "gauge", "Events waiting in each sink queue",
+               {"sink": worker.sink.name}, worker.queue.qsize())
+
+
+REGISTRY.add_collector(_collect_queue_depth)
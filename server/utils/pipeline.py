@@ -0,0 +1,132 @@
+"""
+Request Stage Graph
+Runs the independent stages of a request concurrently, starting each stage as
+soon as its dependencies finish, with per-stage timeouts capped by a total
+request deadline.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from utils.metrics import REGISTRY, observe_span
+
+_NO_FALLBACK = object()
+
+STAGE_FALLBACKS = REGISTRY.counter("empathai_stage_fallbacks_total", "Stages that failed or timed out and used their fallback")
+
+
+class StageError(Exception):
+    """A required stage failed or timed out."""
+
+    def __init__(self, stage: str, cause: BaseException):
+        self.stage = stage
+        self.cause = cause
+        super().__init__(f"Stage '{stage}' failed: {cause!r}")
+
+
+@dataclass
+class Stage:
+    """One node of the graph."""
+
+    name: str
+    func: Callable[[Dict[str, Any]], Awaitable[Any]]
+    deps: Tuple[str, ...] = ()
+    timeout_s: Optional[float] = None
+    # Value (or callable taking the results so far) used when the stage fails
+    fallback: Any = _NO_FALLBACK
+
+
+@dataclass
+class StageGraph:
+    """
+    Small dependency graph of async stages.
+
+    Each stage function receives the dict of results computed so far (its
+    dependencies are guaranteed to be present) and returns an awaitable.
+    Stages must be added after the stages they depend on.
+    """
+
+    deadline_s: float
+    stages: Dict[str, Stage] = field(default_factory=dict)
+    results: Dict[str, Any] = field(default_factory=dict)
+    # name -> wall time in ms, and names of stages that fell back
+    timings: Dict[str, float] = field(default_factory=dict)
+    fallbacks: Dict[str, str] = field(default_factory=dict)
+    _tasks: Dict[str, asyncio.Task] = field(default_factory=dict, repr=False)
+
+    def add(
+        self,
+        name: str,
+        func: Callable[[Dict[str, Any]], Awaitable[Any]],
+        deps: Tuple[str, ...] = (),
+        timeout_s: Optional[float] = None,
+        fallback: Any = _NO_FALLBACK
+    ) -> "StageGraph":
+        """Register a stage. Returns self for chaining."""
+        missing = [dep for dep in deps if dep not in self.stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stage(s): {missing}")
+        self.stages[name] = Stage(name, func, tuple(deps), timeout_s, fallback)
+        return self
+
+    def start(self):
+        """Schedule every stage on the running loop (idempotent). Use `result` to await one stage."""
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline_s
+        tasks = self._tasks
+
+        async def run_stage(stage: Stage):
+            if stage.deps:
+                await asyncio.gather(*(tasks[dep] for dep in stage.deps))
+
+            remaining = deadline - loop.time()
+            timeout = remaining if stage.timeout_s is None else min(stage.timeout_s, remaining)
+            started = time.perf_counter()
+            try:
+                if timeout <= 0:
+                    raise asyncio.TimeoutError()
+                value = await asyncio.wait_for(stage.func(self.results), timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if stage.fallback is _NO_FALLBACK:
+                    raise StageError(stage.name, e) from e
+                reason = "timeout" if isinstance(e, asyncio.TimeoutError) else type(e).__name__
+                print(f"⚠️ Stage '{stage.name}' fell back ({reason})")
+                self.fallbacks[stage.name] = reason
+                STAGE_FALLBACKS.inc(stage=stage.name, reason=reason)
+                value = stage.fallback(self.results) if callable(stage.fallback) else stage.fallback
+            finally:
+                self.timings[stage.name] = round((time.perf_counter() - started) * 1000, 2)
+                observe_span(f"stage.{stage.name}", self.timings[stage.name])
+
+            self.results[stage.name] = value
+            return value
+
+        for stage in self.stages.values():
+            tasks[stage.name] = asyncio.ensure_future(run_stage(stage))
+
+    async def result(self, name: str) -> Any:
+        """Wait for one stage (starting the graph if needed) and return its value."""
+        self.start()
+        return await asyncio.shield(self._tasks[name])
+
+    async def cancel(self):
+        """Cancel every unfinished stage and wait for them to unwind."""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def run(self) -> Dict[str, Any]:
+        """Run every stage, returning the results dict. Raises StageError for failed required stages."""
+        self.start()
+        try:
+            await asyncio.gather(*self._tasks.values())
+        except BaseException:
+            await self.cancel()
+            raise
+        return self.results
@@ -0,0 +1,238 @@
+"""
+Prompt Builder
+Assembles the Gemini reply prompt under per-section token budgets. The static
+instruction text is rendered once; the newest conversation turns are kept
+(capped) while older ones are clipped to their first sentence; web snippets
+and very long messages are truncated. Token counts are estimated locally
+(about 4 characters per token), so building a prompt never calls the API.
+"""
+
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from utils.severity import severity_for_score
+
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+_INTRO = """You are EmpathAI, a compassionate AI assistant for emotional support and harassment guidance.
+You remember previous conversations and can reference them naturally."""
+
+_GUIDELINES = """RESPONSE GUIDELINES:
+1. Provide warm, empathetic, psychologically safe support
+2. Keep response conversational (3-5 sentences)
+3. Reference previous conversation naturally if relevant
+4. If web context is provided, incorporate factual information naturally
+5. If harassment is detected, offer specific guidance on:
+   - Legal rights (mention relevant Indian IPC sections if applicable)
+   - Mental health resources
+   - Safety measures
+6. Use natural language - avoid robotic phrases
+7. Include one supportive emoji if appropriate
+8. Focus on user's wellbeing and validation
+
+Generate your response:"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of text (no tokenizer round-trip)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_tokens(text: str, max_tokens: int, marker: str = " …") -> str:
+    """Text cut to about max_tokens, at a word boundary, with a marker when cut."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max(0, max_tokens * CHARS_PER_TOKEN - len(marker))]
+    if " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip() + marker
+
+
+def clip_turn(turn: str, max_tokens: int) -> str:
+    """First sentence of a "Speaker: text" history line, capped at max_tokens (speaker kept)."""
+    speaker, sep, text = turn.partition(": ")
+    if not sep:
+        speaker, text = "", turn
+    first = _SENTENCE_END.split(text.strip(), maxsplit=1)[0]
+    if first != text.strip():
+        first += " …"
+    clipped = truncate_tokens(first, max_tokens)
+    return f"{speaker}: {clipped}" if sep else clipped
+
+
+@dataclass
+class PromptBudget:
+    """Token budgets per prompt section."""
+
+    history_tokens: int = 600
+    # Newest history lines kept whole (each still capped at turn_tokens)
+    recent_turns: int = 2
+    turn_tokens: int = 250
+    # Older lines are clipped to their first sentence within this cap
+    older_turn_tokens: int = 40
+    max_turns: int = 6
+    web_tokens: int = 300
+    message_tokens: int = 1000
+
+    @classmethod
+    def from_env(cls) -> "PromptBudget":
+        """Budgets from PROMPT_* environment variables (defaults above)."""
+        return cls(
+            history_tokens=int(os.getenv("PROMPT_HISTORY_TOKENS", cls.history_tokens)),
+            recent_turns=int(os.getenv("PROMPT_RECENT_TURNS", cls.recent_turns)),
+            turn_tokens=int(os.getenv("PROMPT_TURN_TOKENS", cls.turn_tokens)),
+            older_turn_tokens=int(os.getenv("PROMPT_OLDER_TURN_TOKENS", cls.older_turn_tokens)),
+            web_tokens=int(os.getenv("PROMPT_WEB_TOKENS", cls.web_tokens)),
+            message_tokens=int(os.getenv("PROMPT_MESSAGE_TOKENS", cls.message_tokens)),
+        )
+
+
+@dataclass
+class BuiltPrompt:
+    """Prompt text with estimated tokens per section."""
+
+    text: str
+    tokens: Dict[str, int] = field(default_factory=dict)
+    # History lines dropped or clipped to fit the budget
+    turns_compacted: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+
+class PromptBuilder:
+    """Builds budgeted reply prompts."""
+
+    def __init__(self, budget: Optional[PromptBudget] = None):
+        self.budget = budget or PromptBudget()
+        # The instruction block never changes, so its size is measured once
+        self.static_tokens = estimate_tokens(_INTRO) + estimate_tokens(_GUIDELINES)
+
+    def compact_history(self, history: Optional[List[str]]) -> tuple:
+        """
+        (lines, compacted) for the history section: newest lines first get the
+        budget, the `recent_turns` newest are capped at `turn_tokens`, older ones
+        are clipped to their first sentence, and lines past the budget are dropped.
+        """
+        if not history:
+            return [], 0
+        budget = self.budget
+        recent = history[-budget.max_turns:]
+        kept = []
+        used = 0
+        compacted = len(history) - len(recent)
+        for age, turn in enumerate(reversed(recent)):
+            if age < budget.recent_turns:
+                line = truncate_tokens(turn, budget.turn_tokens)
+            else:
+                line = clip_turn(turn, budget.older_turn_tokens)
+            cost = estimate_tokens(line) + 1
+            if used + cost > budget.history_tokens:
+                compacted += len(recent) - age
+                break
+            if line != turn:
+                compacted += 1
+            kept.append(line)
+            used += cost
+        kept.reverse()
+        return kept, compacted
+
+    def build(
+        self,
+        user_message: str,
+        emotion: str,
+        harassment_score: float,
+        conversation_history: Optional[List[str]] = None,
+        web_context: str = ""
+    ) -> BuiltPrompt:
+        """Full reply prompt with memory and optional web context, within the budgets."""
+        web_context = truncate_tokens(web_context, self.budget.web_tokens) if web_context else ""
+        web_enabled = bool(web_context)
+        severity = severity_for_score(harassment_score)
+        is_harassment = harassment_score >= 0.55
+
+        lines, compacted = self.compact_history(conversation_history)
+        history_context = ""
+        if lines:
+            history_context = "\n\nPrevious conversation:\n" + "\n".join(lines) + "\n"
+
+        message = truncate_tokens(user_message, self.budget.message_tokens)
+        web_section = f"\n\n[Live Web Context: {web_context}]" if web_context else ""
+
+        text = f"""{_INTRO}
+{web_section}
+
+{history_context}Current USER MESSAGE: "{message}"
+
+CONTEXT:
+- Emotion: {emotion}
+- Harassment Detected: {is_harassment}
+- Severity: {severity}
+- Confidence Score: {harassment_score:.2f}
+{'- Web Search Enabled: Using live information' if web_enabled else ''}
+
+{_GUIDELINES}"""
+        return BuiltPrompt(
+            text=text,
+            tokens={
+                "static": self.static_tokens,
+                "history": estimate_tokens(history_context),
+                "web": estimate_tokens(web_section),
+                "message": estimate_tokens(message),
+            },
+            turns_compacted=compacted
+        )
+
+
+class PromptStats:
+    """Running prompt-size counters: local estimates per section and Gemini's reported counts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prompts = 0
+        self.estimated_total = 0
+        self.estimated_max = 0
+        self.section_totals: Dict[str, int] = {}
+        self.turns_compacted = 0
+        self.reported = 0
+        self.reported_total = 0
+        self.last: Dict[str, int] = {}
+
+    def record_built(self, prompt: BuiltPrompt):
+        total = prompt.total_tokens
+        with self._lock:
+            self.prompts += 1
+            self.estimated_total += total
+            self.estimated_max = max(self.estimated_max, total)
+            for name, tokens in prompt.tokens.items():
+                self.section_totals[name] = self.section_totals.get(name, 0) + tokens
+            self.turns_compacted += prompt.turns_compacted
+            self.last = {"estimated_tokens": total, **prompt.tokens}
+
+    def record_usage(self, prompt_token_count: Optional[int]):
+        """Prompt tokens Gemini reported for a call (usage_metadata), when present."""
+        if not prompt_token_count:
+            return
+        with self._lock:
+            self.reported += 1
+            self.reported_total += prompt_token_count
+            self.last["reported_tokens"] = prompt_token_count
+
+    def stats(self) -> dict:
+        with self._lock:
+            n = self.prompts or 1
+            return {
+                "prompts": self.prompts,
+                "estimated_tokens_avg": round(self.estimated_total / n, 1),
+                "estimated_tokens_max": self.estimated_max,
+                "section_tokens_avg": {name: round(total / n, 1) for name, total in self.section_totals.items()},
+                "history_turns_compacted": self.turns_compacted,
+                "reported_tokens_avg": round(self.reported_total / self.reported, 1) if self.reported else None,
+                "last": dict(self.last),
+            }
@@ -0,0 +1,63 @@
+"""
+Startup Readiness
+Tracks the load state and wall time of each component loaded at startup, so
+/health can report liveness (process up) separately from readiness (models
+loaded) while loads run concurrently in worker threads.
+"""
+
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+@dataclass
+class ComponentState:
+    """Load state of one startup component."""
+
+    status: str = "pending"  # pending | loading | ready | failed | skipped
+    load_ms: Optional[float] = None
+    error: Optional[str] = None
+
+
+class Readiness:
+    """Load states keyed by component name."""
+
+    def __init__(self, components: Iterable[str] = ()):
+        self.components: Dict[str, ComponentState] = {name: ComponentState() for name in components}
+        self.started_at = time.time()
+
+    async def load(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Run a blocking loader in a thread, recording its status and load time. Re-raises failures."""
+        state = self.components.setdefault(name, ComponentState())
+        state.status = "loading"
+        started = time.perf_counter()
+        try:
+            value = await asyncio.to_thread(factory)
+        except Exception as e:
+            state.status = "failed"
+            state.error = str(e)
+            raise
+        finally:
+            state.load_ms = round((time.perf_counter() - started) * 1000, 2)
+        state.status = "ready"
+        return value
+
+    def skip(self, name: str):
+        """Mark a component as deliberately not loaded (e.g. Gemini in classifier-only mode)."""
+        self.components.setdefault(name, ComponentState()).status = "skipped"
+
+    def is_ready(self, names: Optional[Iterable[str]] = None) -> bool:
+        """Whether every named component (all by default) finished loading."""
+        names = self.components if names is None else names
+        return all(
+            name in self.components and self.components[name].status == "ready"
+            for name in names
+        )
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Per-component status, load time and error for /health."""
+        return {
+            name: {"status": state.status, "load_ms": state.load_ms, "error": state.error}
+            for name, state in self.components.items()
+        }
@@ -0,0 +1,18 @@
+"""
+Harassment Severity
+The Low/Medium/High scale shared by the classifier labels, analytics
+histograms, prompts and local replies.
+"""
+
+SEVERITY_LEVELS = ("Low", "Medium", "High")
+# Low=1 .. High=3; callers rank unknown labels 0, below Low
+SEVERITY_RANK = {level: rank for rank, level in enumerate(SEVERITY_LEVELS, start=1)}
+
+
+def severity_for_score(score: float) -> str:
+    """Map a harassment score (0.0-1.0) to its Low/Medium/High severity label."""
+    if score < 0.3:
+        return "Low"
+    elif score < 0.6:
+        return "Medium"
+    return "High"
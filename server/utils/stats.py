@@ -0,0 +1,316 @@
+"""
+Running Analytics Aggregates
+Counters, distributions, a streaming response-time sketch and rolling
+minute/hour/day windows, updated as each log entry is recorded so stats
+queries never rescan the log files.
+"""
+
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from utils.severity import SEVERITY_LEVELS, severity_for_score
+
+# Severity histogram buckets, matching HarassmentModel.severity_label
+SEVERITY_BUCKETS = SEVERITY_LEVELS
+
+# name -> (span in seconds, bucket width in seconds)
+WINDOWS = {
+    "minute": (60, 1),
+    "hour": (3600, 60),
+    "day": (24 * 3600, 900),
+}
+
+
+def entry_timestamp(entry: dict) -> float:
+    """Epoch seconds for a log entry's UTC ISO timestamp (now if missing/invalid)."""
+    try:
+        return datetime.fromisoformat(entry["timestamp"]).replace(tzinfo=timezone.utc).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return time.time()
+
+
+class QuantileSketch:
+    """
+    Log-bucketed streaming quantile sketch (DDSketch-style).
+
+    Quantile estimates are within `relative_accuracy` of the true value and
+    memory depends only on the value range, not on how many values were added.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float):
+        """Record one value."""
+        self.count += 1
+        if value <= 0:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + 1
+
+    def merge(self, other: "QuantileSketch"):
+        """Fold another sketch (same accuracy) into this one."""
+        self.count += other.count
+        self.zero_count += other.zero_count
+        for index, n in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + n
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated q-quantile (0..1), or None if empty."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                return 2 * self._gamma ** index / (self._gamma + 1)
+        return 2 * self._gamma ** max(self.bins) / (self._gamma + 1)
+
+    def percentiles(self) -> dict:
+        """p50/p95/p99 rounded for display."""
+        result = {}
+        for name, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+            value = self.quantile(q)
+            result[name] = round(value, 2) if value is not None else None
+        return result
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "bins": {str(k): v for k, v in self.bins.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuantileSketch":
+        sketch = cls(data.get("relative_accuracy", 0.01))
+        sketch.zero_count = data.get("zero_count", 0)
+        sketch.count = data.get("count", 0)
+        sketch.bins = {int(k): v for k, v in data.get("bins", {}).items()}
+        return sketch
+
+
+class Aggregate:
+    """Mergeable counters for a set of analytics and incident entries."""
+
+    def __init__(self):
+        self.requests = 0
+        self.harassment_detected = 0
+        self.confidence_sum = 0.0
+        self.response_time_sum = 0.0
+        self.emotions: Dict[str, int] = {}
+        self.response_times = QuantileSketch()
+
+        self.incidents = 0
+        self.severity_sum = 0.0
+        self.incident_emotions: Dict[str, int] = {}
+        self.severity_histogram: Dict[str, int] = {bucket: 0 for bucket in SEVERITY_BUCKETS}
+
+    def add_analytics(self, entry: dict):
+        self.requests += 1
+        if entry.get("harassment_detected"):
+            self.harassment_detected += 1
+        self.confidence_sum += entry.get("harassment_confidence", 0.0)
+        response_time = entry.get("response_time_ms", 0.0)
+        self.response_time_sum += response_time
+        self.response_times.add(response_time)
+        emotion = entry.get("emotion", "unknown")
+        self.emotions[emotion] = self.emotions.get(emotion, 0) + 1
+
+    def add_incident(self, entry: dict):
+        self.incidents += 1
+        severity = entry.get("severity", 0.0)
+        self.severity_sum += severity
+        self.severity_histogram[severity_for_score(severity)] += 1
+        emotion = entry.get("emotion", "unknown")
+        self.incident_emotions[emotion] = self.incident_emotions.get(emotion, 0) + 1
+
+    def merge(self, other: "Aggregate"):
+        self.requests += other.requests
+        self.harassment_detected += other.harassment_detected
+        self.confidence_sum += other.confidence_sum
+        self.response_time_sum += other.response_time_sum
+        self.response_times.merge(other.response_times)
+        for emotion, n in other.emotions.items():
+            self.emotions[emotion] = self.emotions.get(emotion, 0) + n
+        self.incidents += other.incidents
+        self.severity_sum += other.severity_sum
+        for bucket, n in other.severity_histogram.items():
+            self.severity_histogram[bucket] = self.severity_histogram.get(bucket, 0) + n
+        for emotion, n in other.incident_emotions.items():
+            self.incident_emotions[emotion] = self.incident_emotions.get(emotion, 0) + n
+
+    def summary(self) -> dict:
+        """Display-ready rollup."""
+        return {
+            "requests": self.requests,
+            "harassment_detected": self.harassment_detected,
+            "average_harassment_confidence": round(self.confidence_sum / self.requests, 3) if self.requests else 0.0,
+            "average_response_time_ms": round(self.response_time_sum / self.requests, 2) if self.requests else 0.0,
+            "response_time_ms": self.response_times.percentiles(),
+            "emotion_distribution": dict(self.emotions),
+            "incidents": self.incidents,
+            "average_severity": round(self.severity_sum / self.incidents, 3) if self.incidents else 0.0,
+            "severity_histogram": dict(self.severity_histogram),
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "harassment_detected": self.harassment_detected,
+            "confidence_sum": self.confidence_sum,
+            "response_time_sum": self.response_time_sum,
+            "emotions": self.emotions,
+            "response_times": self.response_times.to_dict(),
+            "incidents": self.incidents,
+            "severity_sum": self.severity_sum,
+            "incident_emotions": self.incident_emotions,
+            "severity_histogram": self.severity_histogram,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Aggregate":
+        aggregate = cls()
+        aggregate.requests = data.get("requests", 0)
+        aggregate.harassment_detected = data.get("harassment_detected", 0)
+        aggregate.confidence_sum = data.get("confidence_sum", 0.0)
+        aggregate.response_time_sum = data.get("response_time_sum", 0.0)
+        aggregate.emotions = dict(data.get("emotions", {}))
+        aggregate.response_times = QuantileSketch.from_dict(data.get("response_times", {}))
+        aggregate.incidents = data.get("incidents", 0)
+        aggregate.severity_sum = data.get("severity_sum", 0.0)
+        aggregate.incident_emotions = dict(data.get("incident_emotions", {}))
+        aggregate.severity_histogram.update(data.get("severity_histogram", {}))
+        return aggregate
+
+
+class RollingWindow:
+    """Fixed ring of time buckets; a query merges at most `span / bucket` aggregates."""
+
+    def __init__(self, span_s: int, bucket_s: int):
+        self.span_s = span_s
+        self.bucket_s = bucket_s
+        self.size = span_s // bucket_s
+        # slot -> (bucket index, Aggregate)
+        self.buckets: Dict[int, tuple] = {}
+
+    def bucket(self, ts: float) -> Optional[Aggregate]:
+        """Aggregate for the bucket containing ts (None if ts is already outside the window)."""
+        index = int(ts // self.bucket_s)
+        if index <= int(time.time() // self.bucket_s) - self.size:
+            return None
+        slot = index % self.size
+        current = self.buckets.get(slot)
+        if current is None or current[0] != index:
+            if current is not None and current[0] > index:
+                # Slot already holds a newer bucket; ts is too old to count
+                return None
+            current = (index, Aggregate())
+            self.buckets[slot] = current
+        return current[1]
+
+    def summary(self, now: Optional[float] = None) -> dict:
+        now = time.time() if now is None else now
+        oldest = int(now // self.bucket_s) - self.size
+        merged = Aggregate()
+        for index, aggregate in self.buckets.values():
+            if index > oldest:
+                merged.merge(aggregate)
+        return merged.summary()
+
+    def to_dict(self) -> dict:
+        return {str(slot): [index, aggregate.to_dict()] for slot, (index, aggregate) in self.buckets.items()}
+
+    def load(self, data: dict):
+        self.buckets = {
+            int(slot): (index, Aggregate.from_dict(aggregate))
+            for slot, (index, aggregate) in data.items()
+        }
+
+
+class AnalyticsAggregator:
+    """All-time totals plus rolling windows, updated per entry in O(1)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.totals = Aggregate()
+        self.windows = {name: RollingWindow(span, width) for name, (span, width) in WINDOWS.items()}
+        self.since = datetime.utcnow().isoformat()
+
+    def record_analytics(self, entry: dict):
+        ts = entry_timestamp(entry)
+        with self._lock:
+            self.totals.add_analytics(entry)
+            for window in self.windows.values():
+                bucket = window.bucket(ts)
+                if bucket is not None:
+                    bucket.add_analytics(entry)
+
+    def record_incident(self, entry: dict):
+        ts = entry_timestamp(entry)
+        with self._lock:
+            self.totals.add_incident(entry)
+            for window in self.windows.values():
+                bucket = window.bucket(ts)
+                if bucket is not None:
+                    bucket.add_incident(entry)
+
+    def incident_stats(self) -> dict:
+        """Incident summary in the shape historically returned by `HarassmentLogger.get_stats`."""
+        with self._lock:
+            totals = self.totals
+            if not totals.incidents:
+                return {
+                    "total_incidents": 0,
+                    "average_severity": 0.0,
+                    "most_common_emotion": None
+                }
+            emotions = dict(totals.incident_emotions)
+            return {
+                "total_incidents": totals.incidents,
+                "average_severity": round(totals.severity_sum / totals.incidents, 3),
+                "most_common_emotion": max(emotions.items(), key=lambda x: x[1])[0] if emotions else None,
+                "emotion_distribution": emotions,
+                "severity_histogram": dict(totals.severity_histogram),
+            }
+
+    def summary(self, window: Optional[str] = None) -> dict:
+        """All-time totals and rollups for every window (or just the named one)."""
+        names = [window] if window else list(self.windows)
+        now = time.time()
+        with self._lock:
+            return {
+                "since": self.since,
+                "totals": self.totals.summary(),
+                "windows": {name: self.windows[name].summary(now) for name in names},
+            }
+
+    def snapshot(self) -> dict:
+        """Compact serializable state for persistence."""
+        with self._lock:
+            return {
+                "since": self.since,
+                "totals": self.totals.to_dict(),
+                "windows": {name: window.to_dict() for name, window in self.windows.items()},
+            }
+
+    def load_snapshot(self, data: dict):
+        with self._lock:
+            self.since = data.get("since", self.since)
+            self.totals = Aggregate.from_dict(data.get("totals", {}))
+            for name, window_data in data.get("windows", {}).items():
+                if name in self.windows:
+                    self.windows[name].load(window_data)